@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -86,6 +87,26 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+
+# The cached responses, the per user generations that invalidate them,
+# the cache hit counts and the token revocation generation all live in
+# the default cache. Invalidation is only correct when every worker
+# shares it, a per process cache keeps serving what another worker's
+# write changed. Point DJANGO_CACHE_LOCATION at the memcached servers,
+# comma separated. app.test_settings swaps in a LocMem cache for the
+# tests and single process tools
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ.get(
+            'DJANGO_CACHE_LOCATION', '127.0.0.1:11211'
+        ).split(','),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -105,6 +126,29 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# New passwords are hashed with the first hasher, hashes made by the
+# others or with outdated parameters are upgraded on their user's next
+# login. Argon2 needs argon2-cffi and bcrypt the bcrypt package
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+AUTHENTICATION_BACKENDS = ['user.backends.PooledPasswordBackend']
+
+# Login hashes are checked by this many worker processes, at most
+# MAX_PENDING logins wait up to TIMEOUT seconds for one, and as long for
+# its answer, before being turned away. With no workers they are checked
+# in the request thread
+PASSWORD_VERIFY_WORKERS = 2
+PASSWORD_VERIFY_MAX_PENDING = 64
+PASSWORD_VERIFY_TIMEOUT = 5
+
+# Login attempts allowed per email address
+LOGIN_THROTTLE_RATE = '10/min'
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.1/topics/i18n/
 
@@ -133,4 +177,98 @@ STATIC_ROOT = 'vol/web/static'
 
 AUTH_USER_MODEL = 'core.User'
 
+# Recipe API list pagination, clients may ask for up to the max with
+# ?page_size=
+RECIPE_API_PAGE_SIZE = 50
+RECIPE_API_MAX_PAGE_SIZE = 500
+
+# Bulk endpoints accept at most this many items, written in batches
+RECIPE_API_MAX_BULK_SIZE = 5000
+RECIPE_API_BULK_BATCH_SIZE = 500
+
+# Recipes fetched per round trip when streaming an export
+RECIPE_EXPORT_CHUNK_SIZE = 2000
+
+# Uploaded recipe images wait in the staging dir until a worker of the
+# queue stores them with their renditions
+RECIPE_IMAGE_QUEUE = 'recipe.images.ThreadPoolImageQueue'
+RECIPE_IMAGE_WORKERS = 2
+RECIPE_IMAGE_STAGING_DIR = 'vol/web/staging'
+RECIPE_IMAGE_RENDITION_WIDTHS = (320, 640, 1280)
+RECIPE_IMAGE_RENDITION_FORMATS = ('webp', 'jpeg')
+
+# Image files are shared by content and deleted once unreferenced, unless
+# they were stored again within the last GC_GRACE seconds
+RECIPE_IMAGE_GC_GRACE = 60
+
+# Resumable image uploads are assembled in the upload dir
+RECIPE_IMAGE_UPLOAD_DIR = 'vol/web/partial'
+RECIPE_IMAGE_MAX_UPLOAD_BYTES = 32 * 1024 * 1024
+RECIPE_IMAGE_UPLOAD_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
+# Uploads without a chunk for this long are gone, purge_image_uploads
+# removes their files, and a chunk lock this old is taken to be stale
+RECIPE_IMAGE_UPLOAD_EXPIRY = 24 * 60 * 60
+RECIPE_IMAGE_UPLOAD_LOCK_TIMEOUT = 10 * 60
+
+# Thumbnails are rendered on request in these widths and kept on disk
+# until the directory outgrows its budget
+RECIPE_THUMBNAIL_WIDTHS = (160, 320, 640, 1280)
+RECIPE_THUMBNAIL_DIR = 'vol/web/thumbnails'
+RECIPE_THUMBNAIL_CACHE_BYTES = 512 * 1024 * 1024
+
+# Tag and ingredient name suggestions are served from per user prefix
+# indexes, this many are kept in each process
+RECIPE_SUGGEST_CACHE_SIZE = 1000
+RECIPE_SUGGEST_LIMIT = 10
+RECIPE_SUGGEST_MAX_LIMIT = 50
+
+# Recipes returned by the pantry match endpoint, clients may ask for up
+# to the max with ?limit=
+RECIPE_MATCH_LIMIT = 10
+RECIPE_MATCH_MAX_LIMIT = 100
+
+# Similar recipes are found in per user tag and ingredient vectors, kept
+# on disk for every worker and in memory for this many users
+RECIPE_SIMILARITY_DIR = 'vol/web/similarity'
+RECIPE_SIMILARITY_CACHE_SIZE = 100
+RECIPE_SIMILAR_LIMIT = 10
+RECIPE_SIMILAR_MAX_LIMIT = 100
+
+# Seconds a cached list response is kept, writes invalidate it earlier
+RECIPE_API_CACHE_TIMEOUT = 300
+
+# API tokens expire TTL seconds after login, a device's new login revokes
+# its previous token. SIGNED issues self validating tokens, signed with the
+# SIGNING_KEY_ID key and accepted under any of SIGNING_KEYS so keys can be
+# rotated
+AUTH_TOKEN_TTL = 30 * 24 * 60 * 60
+AUTH_TOKEN_SIGNED = False
+AUTH_TOKEN_SIGNING_KEYS = {'1': SECRET_KEY}
+AUTH_TOKEN_SIGNING_KEY_ID = '1'
+
+# Revoked signed tokens are kept in an in-memory bloom filter sized for
+# this many at this false positive rate, positives are checked in the db
+AUTH_TOKEN_REVOCATION_CAPACITY = 100000
+AUTH_TOKEN_REVOCATION_ERROR_RATE = 0.001
+
+# Under ASGI, serve recipe, tag and ingredient reads from async views that
+# answer revalidations and cached list pages from the caches alone, in one
+# hop to a worker thread. Leave off under WSGI, where every async view
+# runs in its own loop
+RECIPE_API_ASYNC_READS = False
+
+# Build list pages from plain rows instead of model instances and
+# serializers, rendered with orjson when it is installed
+RECIPE_API_FAST_LISTS = True
+
+# Token to user resolutions are cached in process for TTL seconds and in
+# the SHARED_CACHE Django cache alias, which also carries revocations to
+# every worker. It must be a cache all workers share, with None nothing is
+# cached and every request checks its token in the database
+TOKEN_AUTH_CACHE = {
+    'MAXSIZE': 10000,
+    'TTL': 60,
+    'SHARED_CACHE': 'default',
+}
+
 
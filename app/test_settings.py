@@ -0,0 +1,12 @@
+"""
+settings for the tests and single process tools, the project settings
+with a cache of their own instead of the shared one
+"""
+from app.settings import *  # noqa: F401,F403
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
@@ -19,9 +19,16 @@ from django.urls import include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from recipe.views import recipe_image_thumbnail
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
+    path(
+        'media/recipe/<str:image_id>/<int:width>.<str:fmt>',
+        recipe_image_thumbnail,
+        name='recipe-image-thumbnail'
+    ),
 ] + static(settings.MEDIA_URL, document_root = settings.MEDIA_ROOT)
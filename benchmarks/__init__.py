@@ -0,0 +1,11 @@
+"""
+benchmarks for the recipe API, run from the project root with
+`python -m benchmarks.<name> --help`
+"""
+import os
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.test_settings')
+    import django
+    django.setup()
@@ -0,0 +1,205 @@
+"""
+compare recipe list throughput under WSGI (gunicorn, threads) and ASGI
+(uvicorn, with the sync viewsets and with the async read views) with many
+concurrent keep-alive connections
+
+    python -m benchmarks.asgi_vs_wsgi --connections 1000 --requests 50000
+
+needs gunicorn and uvicorn installed. Every request reads the first page
+of the recipe list with a token, either fetching it (served from the
+response cache once warm) or revalidating it with If-None-Match (304).
+The load generator shares the machine, keep it on its own cores with
+taskset for numbers worth comparing
+"""
+import argparse
+import asyncio
+import os
+import resource
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import setup_django
+
+
+def seed(recipes):
+    from django.core.management import call_command
+    from core.models import Recipe, Tag, User
+    from user import tokens
+
+    call_command('migrate', verbosity=0)
+    user = User.objects.create_user('bench@londonapp.com', 'password')
+    tag = Tag.objects.create(user=user, name='bench')
+    Recipe.objects.bulk_create(
+        Recipe(user=user, title=f'recipe {i}', time_minutes=10, price=1)
+        for i in range(recipes)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=pk, tag_id=tag.pk)
+        for pk in Recipe.objects.values_list('id', flat=True)
+    )
+    _, key = tokens.issue(user)
+    return key
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, port, workers, threads, env):
+    if kind == 'wsgi':
+        command = [
+            'gunicorn', 'app.wsgi:application', '--workers', str(workers),
+            '--worker-class', 'gthread', '--threads', str(threads),
+            '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+        ]
+    else:
+        command = [
+            'uvicorn', 'app.asgi:application', '--workers', str(workers),
+            '--host', '127.0.0.1', '--port', str(port),
+            '--log-level', 'warning', '--no-access-log',
+        ]
+    server = subprocess.Popen(command, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f'{kind} server did not start')
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    etag = None
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        if name == b'content-length':
+            length = int(value)
+        elif name == b'etag':
+            etag = value.strip().decode()
+    if length:
+        await reader.readexactly(length)
+    return status, etag
+
+
+async def client(port, request, revalidate, count, latencies, statuses):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        if revalidate:
+            # ETags come from the generations in each worker's cache,
+            # a keep-alive connection stays with its worker
+            writer.write(request)
+            _, etag = await read_response(reader)
+            request = request.replace(
+                b'\r\n\r\n', f'\r\nIf-None-Match: {etag}\r\n\r\n'.encode()
+            )
+        for _ in range(count):
+            start = time.perf_counter()
+            writer.write(request)
+            status, _ = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def load(port, path, key, revalidate, connections, requests):
+    request = '\r\n'.join([
+        f'GET {path} HTTP/1.1',
+        f'Host: 127.0.0.1:{port}',
+        f'Authorization: Token {key}',
+        'Accept: application/json',
+    ]).encode() + b'\r\n\r\n'
+    latencies = []
+    statuses = {}
+    per_connection, extra = divmod(requests, connections)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(
+            port, request, revalidate, per_connection + (i < extra),
+            latencies, statuses
+        )
+        for i in range(connections)
+    ))
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=50000)
+    parser.add_argument('--recipes', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--servers', default='wsgi,asgi-sync,asgi')
+    args = parser.parse_args()
+
+    # a descriptor per connection on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = min(hard, 4 * args.connections + 256)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, wanted), hard))
+    directory = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE='benchmarks.server_settings',
+        BENCHMARK_DB=os.path.join(directory, 'db.sqlite3'),
+    )
+    os.environ.update(env)
+    setup_django()
+    from django.urls import reverse
+
+    path = reverse('recipe:recipe-list')
+    try:
+        key = seed(args.recipes)
+        print(
+            f'{args.connections} connections, {args.requests} requests, '
+            f'{args.workers} workers'
+        )
+        for kind in args.servers.split(','):
+            port = free_port()
+            server = start_server(
+                'wsgi' if kind == 'wsgi' else 'asgi', port, args.workers,
+                args.threads,
+                dict(env, BENCHMARK_ASYNC_READS='1' if kind == 'asgi' else '0')
+            )
+            try:
+                for mode in ('fetch', 'revalidate'):
+                    revalidate = mode == 'revalidate'
+                    # warm every worker's token and response caches
+                    asyncio.run(load(
+                        port, path, key, revalidate,
+                        min(args.connections, 100), 20 * args.workers
+                    ))
+                    rate, latencies, statuses = asyncio.run(load(
+                        port, path, key, revalidate,
+                        args.connections, args.requests
+                    ))
+                    latencies.sort()
+                    p99 = latencies[int(len(latencies) * 0.99) - 1]
+                    print(
+                        f'  {kind:10} {mode:10} {rate:9.0f} req/s  '
+                        f'p50 {statistics.median(latencies) * 1000:7.1f} ms  '
+                        f'p99 {p99 * 1000:7.1f} ms  {statuses}'
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
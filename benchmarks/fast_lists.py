@@ -0,0 +1,144 @@
+"""
+time recipe list pages built from rows against the serializer path
+
+    python -m benchmarks.fast_lists --recipes 10000 --page-size 500
+
+walks every page of the list with the response cache off, once with
+RECIPE_API_FAST_LISTS and once without, and checks both render the same
+bytes. Runs on a throwaway test database
+"""
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks import setup_django
+
+
+def walk(client, url, page_size):
+    """
+    return the bytes of every page of the list and the seconds each took
+    """
+    pages = []
+    timings = []
+    next_url = f'{url}?page_size={page_size}'
+    while next_url:
+        start = time.perf_counter()
+        res = client.get(next_url)
+        timings.append(time.perf_counter() - start)
+        pages.append(res.content)
+        next_url = res.data['next']
+    return pages, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=10000)
+    parser.add_argument('--tags', type=int, default=50)
+    parser.add_argument('--ingredients', type=int, default=500)
+    parser.add_argument('--per-recipe', default='4-12')
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    setup_django()
+
+    from django.db import connection
+    from django.test import override_settings
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+    from core.models import Ingredient, Recipe, Tag, User
+    from recipe import fastpath
+
+    low, high = map(int, args.per_recipe.split('-'))
+    random.seed(0)
+    # lets the test client's host through
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user = User.objects.create_user('bench@londonapp.com', 'password')
+        Tag.objects.bulk_create(
+            Tag(user=user, name=f'tag {i}') for i in range(args.tags)
+        )
+        Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=f'ingredient {i}')
+            for i in range(args.ingredients)
+        )
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    user=user, title=f'recipe {i}', time_minutes=i % 120,
+                    price=f'{i % 100}.{i % 100:02d}', link=f'/recipes/{i}'
+                )
+                for i in range(args.recipes)
+            ),
+            batch_size=5000
+        )
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        Recipe.tags.through.objects.bulk_create(
+            (
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in random.sample(tag_ids, random.randint(1, 3))
+            ),
+            batch_size=5000
+        )
+        Recipe.ingredients.through.objects.bulk_create(
+            (
+                Recipe.ingredients.through(
+                    recipe_id=recipe_id, ingredient_id=ingredient_id
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in random.sample(
+                    ingredient_ids, random.randint(low, high)
+                )
+            ),
+            batch_size=5000
+        )
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+
+        client = APIClient()
+        client.force_authenticate(user)
+        url = reverse('recipe:recipe-list')
+        results = {}
+        # a timeout of 0 caches nothing, every page is built
+        with override_settings(RECIPE_API_CACHE_TIMEOUT=0):
+            for fast in (False, True):
+                with override_settings(RECIPE_API_FAST_LISTS=fast):
+                    walk(client, url, args.page_size)
+                    totals = []
+                    for _ in range(args.runs):
+                        pages, timings = walk(client, url, args.page_size)
+                        totals.append(sum(timings))
+                results[fast] = pages, totals
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    serializer_pages, serializer_totals = results[False]
+    fast_pages, fast_totals = results[True]
+    assert fast_pages == serializer_pages, 'the fast path rendered other bytes'
+    encoder = 'orjson' if fastpath.orjson else 'json'
+    print(
+        f'{args.recipes} recipes in {len(fast_pages)} pages of '
+        f'{args.page_size}, {sum(map(len, fast_pages))} bytes, identical'
+    )
+    for name, totals in (
+        ('serializers', serializer_totals), (f'fast ({encoder})', fast_totals)
+    ):
+        median = statistics.median(totals)
+        print(
+            f'  {name:16} {median * 1000:8.1f} ms for the list  '
+            f'{args.recipes / median:9.0f} recipes/s'
+        )
+    speedup = statistics.median(serializer_totals) / statistics.median(
+        fast_totals
+    )
+    print(f'  speedup: {speedup:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+time the "what can I cook" match against a large recipe collection
+
+    python -m benchmarks.pantry_match --recipes 100000 --pantry 15
+
+runs on a throwaway test database
+"""
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=100000)
+    parser.add_argument('--ingredients', type=int, default=500)
+    parser.add_argument('--per-recipe', default='4-12')
+    parser.add_argument('--pantry', type=int, default=15)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+    setup_django()
+
+    from django.db import connection
+    from core.models import Ingredient, Recipe, User
+    from recipe.matching import match_recipes
+
+    low, high = map(int, args.per_recipe.split('-'))
+    random.seed(0)
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user = User.objects.create_user('bench@londonapp.com', 'password')
+        Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=f'ingredient {i}')
+            for i in range(args.ingredients)
+        )
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        Recipe.objects.bulk_create(
+            (
+                Recipe(user=user, title=f'recipe {i}', time_minutes=10, price=1)
+                for i in range(args.recipes)
+            ),
+            batch_size=5000
+        )
+        through = Recipe.ingredients.through
+        rows = [
+            through(recipe_id=recipe_id, ingredient_id=ingredient_id)
+            for recipe_id in Recipe.objects.values_list('id', flat=True)
+            for ingredient_id in random.sample(
+                ingredient_ids, random.randint(low, high)
+            )
+        ]
+        through.objects.bulk_create(rows, batch_size=5000)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+
+        timings = []
+        for _ in range(args.runs):
+            pantry = random.sample(ingredient_ids, args.pantry)
+            start = time.perf_counter()
+            matches = match_recipes(user, pantry, args.limit)
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print(
+        f'{args.recipes} recipes, {len(rows)} recipe ingredients, '
+        f'pantry of {args.pantry}, top {args.limit}'
+    )
+    print(f'  best match coverage: {matches[0]["coverage"]:.2f}')
+    print(f'  median: {statistics.median(timings):8.1f} ms')
+    print(f'  max:    {max(timings):8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+"""
+settings for the servers benchmarks start, the project settings on the
+benchmark's own database. Each worker has its own cache unless
+BENCHMARK_CACHE_LOCATION names a memcached server
+"""
+import os
+
+from app.test_settings import *  # noqa: F401,F403
+from app.test_settings import DATABASES
+
+
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1']
+DATABASES['default']['NAME'] = os.environ['BENCHMARK_DB']
+if os.environ.get('BENCHMARK_CACHE_LOCATION'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': os.environ['BENCHMARK_CACHE_LOCATION'],
+        }
+    }
+RECIPE_API_ASYNC_READS = os.environ.get('BENCHMARK_ASYNC_READS') == '1'
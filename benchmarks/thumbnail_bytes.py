@@ -0,0 +1,66 @@
+"""
+compare the image bytes a recipe list page downloads with original
+uploads against on-demand thumbnails
+
+    python -m benchmarks.thumbnail_bytes --page-size 20 --width 320
+"""
+import argparse
+import io
+import os
+import shutil
+import tempfile
+
+from benchmarks import setup_django
+
+
+def sample_photo(width, height, seed):
+    # photos are mostly texture, noise keeps the encoder from cheating
+    from PIL import Image
+    noise = Image.effect_noise((width // 4, height // 4), 40 + seed % 20)
+    photo = Image.merge('RGB', (noise, noise.rotate(90, expand=False), noise))
+    return photo.resize((width, height), Image.BICUBIC)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--width', type=int, default=320)
+    parser.add_argument('--photo', default='4032x3024')
+    args = parser.parse_args()
+    setup_django()
+
+    from recipe.thumbnails import ThumbnailCache
+
+    photo_width, photo_height = map(int, args.photo.split('x'))
+    directory = tempfile.mkdtemp()
+    try:
+        cache = ThumbnailCache(os.path.join(directory, 'cache'), 10 ** 10)
+        original_bytes = 0
+        thumbnail_bytes = {'jpeg': 0, 'webp': 0}
+        for i in range(args.page_size):
+            path = os.path.join(directory, f'photo{i}.jpg')
+            buffer = io.BytesIO()
+            sample_photo(photo_width, photo_height, i).save(
+                buffer, format='JPEG', quality=92
+            )
+            with open(path, 'wb') as photo:
+                photo.write(buffer.getvalue())
+            original_bytes += len(buffer.getvalue())
+            for fmt in thumbnail_bytes:
+                thumbnail_bytes[fmt] += os.path.getsize(
+                    cache.get(path, args.width, fmt)
+                )
+    finally:
+        shutil.rmtree(directory)
+
+    print(f'list page of {args.page_size} recipe cards, {args.photo} photos')
+    print(f'  {"originals:":<16}{original_bytes / 1024:10.0f} KiB')
+    for fmt, size in thumbnail_bytes.items():
+        print(
+            f'  {args.width}px {fmt + ":":<10}{size / 1024:10.0f} KiB'
+            f'  ({original_bytes / size:.0f}x smaller)'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    set membership in a fixed bit array with no false negatives
+
+    each item sets num_hashes bits derived from one blake2b digest, an
+    item whose bits are all set was probably added. The array is sized so
+    capacity items give error_rate false positives
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)
+        self.num_bits = max(8, math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2
+        ))
+        self.num_hashes = max(1, round(
+            self.num_bits / capacity * math.log(2)
+        ))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(str(item).encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        # a zero step would put every hash on the same bit
+        second = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (first + i * second) % self.num_bits
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
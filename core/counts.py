@@ -0,0 +1,68 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from core.models import Ingredient, Recipe, Tag
+
+
+BATCH_SIZE = 500
+
+# related model -> (through model, column of the related id)
+RELATIONS = {
+    Tag: (Recipe.tags.through, 'tag_id'),
+    Ingredient: (Recipe.ingredients.through, 'ingredient_id'),
+}
+
+
+def adjust(model, counts):
+    """
+    add the given amount to the recipe_count of each object
+
+    counts maps object ids to (possibly negative) amounts, objects
+    changing by the same amount share one UPDATE, the F() expression
+    keeps concurrent adjustments from overwriting each other. Counts
+    never go below 0, a drifted count is corrected by reconcile()
+    """
+    by_amount = defaultdict(list)
+    for pk, amount in Counter(counts).items():
+        if amount:
+            by_amount[amount].append(pk)
+    for amount, ids in by_amount.items():
+        model.objects.filter(pk__in=ids).update(
+            recipe_count=Greatest(F('recipe_count') + amount, 0)
+        )
+
+
+def actual_count(model):
+    """
+    return an expression counting the recipes using each object
+    """
+    through, column = RELATIONS[model]
+    return Coalesce(Subquery(
+        through.objects.filter(**{column: OuterRef('pk')}).values(
+            column
+        ).annotate(count=Count('id')).values('count')
+    ), 0)
+
+
+def reconcile(model):
+    """
+    correct every recipe_count that drifted, return how many did
+    """
+    drifted = list(model.objects.annotate(
+        actual=actual_count(model)
+    ).exclude(recipe_count=F('actual')).values_list('pk', flat=True))
+    for start in range(0, len(drifted), BATCH_SIZE):
+        model.objects.filter(pk__in=drifted[start:start + BATCH_SIZE]).update(
+            recipe_count=actual_count(model)
+        )
+    return len(drifted)
+
+
+def linked_ids(model, recipe_id):
+    """
+    return a queryset of the ids of the objects the recipe uses
+    """
+    through, column = RELATIONS[model]
+    return through.objects.filter(recipe_id=recipe_id).values(column)
@@ -0,0 +1,63 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe, RecipeImageRendition, recipe_image_storage
+
+
+class Command(BaseCommand):
+    """
+    delete recipe image files no recipe or rendition refers to
+
+    files are normally deleted as soon as their last reference goes, this
+    sweeps up what that missed: files still within their grace period at
+    the time, uploads interrupted by a crash, and files left behind before
+    images were shared
+    """
+    help = 'Delete unreferenced recipe image files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='List the files without deleting them'
+        )
+        parser.add_argument(
+            '--grace', type=int, default=settings.RECIPE_IMAGE_GC_GRACE,
+            help='Keep files stored within this many seconds'
+        )
+
+    def handle(self, *args, **options):
+        referenced = set(
+            Recipe.objects.exclude(image='').exclude(image__isnull=True)
+            .values_list('image', flat=True).iterator()
+        )
+        referenced.update(
+            RecipeImageRendition.objects.values_list('file', flat=True)
+            .iterator()
+        )
+
+        root = recipe_image_storage.path('uploads/recipe')
+        collected = 0
+        for directory, _, files in os.walk(root):
+            for file_name in files:
+                name = os.path.relpath(
+                    os.path.join(directory, file_name),
+                    recipe_image_storage.location
+                ).replace(os.sep, '/')
+                if name in referenced:
+                    continue
+                if not recipe_image_storage.is_collectable(
+                    name, options['grace']
+                ):
+                    continue
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    recipe_image_storage.delete(name)
+                collected += 1
+
+        verb = 'Found' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {collected} unreferenced image files'
+        ))
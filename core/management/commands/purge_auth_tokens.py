@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import AuthToken
+
+
+class Command(BaseCommand):
+    """
+    delete expired API tokens
+
+    revoked tokens are kept until they expire, the revocation filter is
+    built from them and signed tokens stay valid without their row
+    """
+    help = 'Delete expired API tokens'
+
+    def handle(self, *args, **options):
+        deleted, _ = AuthToken.objects.filter(
+            expires__lte=timezone.now()
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tokens'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core import counts
+
+
+class Command(BaseCommand):
+    """
+    recount the recipes using each tag and ingredient
+
+    the counts are adjusted on every change, this corrects drift from
+    writes that bypassed the ORM signals, like raw SQL or restores
+    """
+    help = 'Correct the recipe counts of tags and ingredients'
+
+    def handle(self, *args, **options):
+        for model in counts.RELATIONS:
+            drifted = counts.reconcile(model)
+            self.stdout.write(self.style.SUCCESS(
+                f'Corrected {drifted} {model._meta.verbose_name_plural}'
+            ))
@@ -0,0 +1,28 @@
+# Generated by Django 3.1.2 on 2026-10-18 09:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # the auto created through tables already have a unique
+    # (recipe_id, <related>_id) index, these cover the reverse direction
+    # used when the planner drives the EXISTS filters from the related id
+
+    dependencies = [
+        ('core', '0006_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX core_recipe_tags_tag_recipe_idx '
+            'ON core_recipe_tags (tag_id, recipe_id);',
+            reverse_sql='DROP INDEX core_recipe_tags_tag_recipe_idx;',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX core_recipe_ingredients_ingredient_recipe_idx '
+            'ON core_recipe_ingredients (ingredient_id, recipe_id);',
+            reverse_sql=(
+                'DROP INDEX core_recipe_ingredients_ingredient_recipe_idx;'
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.1.2 on 2026-10-18 06:13
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_image_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(db_index=True, null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.AlterField(
+            model_name='recipeimagerendition',
+            name='file',
+            field=models.FileField(db_index=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_rendition_file_path),
+        ),
+    ]
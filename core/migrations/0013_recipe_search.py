@@ -0,0 +1,85 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# recipe.search keeps one row per recipe in this table, indexed by title
+# and tag and ingredient names
+FORWARD = {
+    'sqlite': [
+        # the rowid is the recipe id as well, recipe_id is there to join on
+        "CREATE VIRTUAL TABLE recipe_search USING fts5("
+        "recipe_id UNINDEXED, title, tags, ingredients, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    ],
+    'postgresql': [
+        'CREATE TABLE recipe_search ('
+        'recipe_id integer PRIMARY KEY '
+        'REFERENCES core_recipe (id) ON DELETE CASCADE '
+        'DEFERRABLE INITIALLY DEFERRED, '
+        'document tsvector NOT NULL)',
+        'CREATE INDEX recipe_search_document_idx '
+        'ON recipe_search USING GIN (document)',
+    ],
+}
+
+
+def create_index(apps, schema_editor):
+    for sql in FORWARD.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql)
+    _fill_index(apps, schema_editor)
+
+
+def _fill_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in FORWARD:
+        return
+    Recipe = apps.get_model('core', 'Recipe')
+    for recipe in Recipe.objects.prefetch_related('tags', 'ingredients'):
+        document = (
+            recipe.title,
+            ' '.join(tag.name for tag in recipe.tags.all()),
+            ' '.join(
+                ingredient.name for ingredient in recipe.ingredients.all()
+            ),
+        )
+        if vendor == 'sqlite':
+            schema_editor.execute(
+                'INSERT INTO recipe_search '
+                '(rowid, recipe_id, title, tags, ingredients) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                (recipe.id, recipe.id) + document
+            )
+        else:
+            schema_editor.execute(
+                "INSERT INTO recipe_search (recipe_id, document) VALUES (%s, "
+                "setweight(to_tsvector('simple', %s), 'A') || "
+                "setweight(to_tsvector('simple', %s), 'B') || "
+                "setweight(to_tsvector('simple', %s), 'B'))",
+                (recipe.id,) + document
+            )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor in FORWARD:
+        schema_editor.execute('DROP TABLE recipe_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchDocument',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='core.recipe')),
+            ],
+            options={
+                'db_table': 'recipe_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.1.2 on 2026-10-18 06:34
+
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def copy_tokens(apps, schema_editor):
+    # tokens handed out before keep working until they expire
+    Token = apps.get_model('authtoken', 'Token')
+    AuthToken = apps.get_model('core', 'AuthToken')
+    expires = timezone.now() + timedelta(seconds=settings.AUTH_TOKEN_TTL)
+    AuthToken.objects.bulk_create([
+        AuthToken(
+            user_id=user_id,
+            digest=hashlib.sha256(key.encode()).hexdigest(),
+            expires=expires
+        )
+        for key, user_id in Token.objects.values_list('key', 'user_id')
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_recipe_counts'),
+        ('authtoken', '0002_auto_20160226_1747'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, null=True, unique=True)),
+                ('device', models.CharField(blank=True, max_length=255)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('expires', models.DateTimeField()),
+                ('revoked', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='authtoken',
+            index=models.Index(fields=['user', 'device'], name='core_authto_user_id_bb0eff_idx'),
+        ),
+        migrations.RunPython(copy_tokens, migrations.RunPython.noop),
+    ]
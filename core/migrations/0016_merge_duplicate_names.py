@@ -0,0 +1,45 @@
+# Generated by Django 3.1.2 on 2026-10-18 07:00
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    # keep the oldest of each user's same named objects, with the recipes
+    # of all of them
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field).through
+        column = f'{model_name.lower()}_id'
+        groups = model.objects.values('user_id', 'name').annotate(
+            keep=Min('id'), objects=Count('id')
+        ).filter(objects__gt=1)
+        for group in groups:
+            keep = group['keep']
+            duplicates = list(model.objects.filter(
+                user_id=group['user_id'], name=group['name']
+            ).exclude(id=keep).values_list('id', flat=True))
+            recipe_ids = set(through.objects.filter(
+                **{f'{column}__in': duplicates + [keep]}
+            ).values_list('recipe_id', flat=True))
+            linked = set(through.objects.filter(
+                **{column: keep}
+            ).values_list('recipe_id', flat=True))
+            through.objects.bulk_create(
+                through(recipe_id=recipe_id, **{column: keep})
+                for recipe_id in recipe_ids - linked
+            )
+            model.objects.filter(id__in=duplicates).delete()
+            model.objects.filter(id=keep).update(recipe_count=len(recipe_ids))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_auth_tokens'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
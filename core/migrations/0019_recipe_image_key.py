@@ -0,0 +1,31 @@
+# Generated by Django 3.1.2 on 2026-10-18 07:29
+
+import os
+
+from django.db import migrations, models
+
+
+def fill_image_keys(apps, schema_editor):
+    # historical models do not run Recipe.save, name the keys here
+    Recipe = apps.get_model('core', 'Recipe')
+    recipes = Recipe.objects.exclude(image='').exclude(image__isnull=True)
+    for recipe in recipes.only('id', 'image').iterator():
+        Recipe.objects.filter(pk=recipe.pk).update(image_key=(
+            os.path.splitext(os.path.basename(recipe.image.name))[0]
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_recipe_image_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(fill_image_keys, migrations.RunPython.noop),
+    ]
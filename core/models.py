@@ -5,6 +5,12 @@ from django.db.models.base import Model
 import uuid
 import os
 
+from core.storage import ContentAddressedStorage
+
+
+# recipe images and their renditions are stored once per distinct content
+recipe_image_storage = ContentAddressedStorage()
+
 
 def recipe_image_file_path(instance, file_name):
     """
@@ -15,6 +21,20 @@ def recipe_image_file_path(instance, file_name):
     return os.path.join('uploads/recipe/',file_name)
 
 
+def image_key(name):
+    """
+    the key a stored recipe image is looked up by
+    """
+    return os.path.splitext(os.path.basename(name or ''))[0]
+
+
+def recipe_rendition_file_path(instance, file_name):
+    """
+    generate file path for a resized copy of a recipe image
+    """
+    return os.path.join('uploads/recipe/renditions/', file_name)
+
+
 class UserManager(BaseUserManager):
 
     def create_user(self,email,password=None, **extra_fields):
@@ -53,6 +73,19 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    # recipes using it, kept up to date by core.counts
+    recipe_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # a name once per user, its index serves the listing ordered by
+        # name, the other the one by popularity
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'], name='unique_tag_name_per_user'
+            ),
+        ]
+        indexes = [models.Index(fields=['user', 'recipe_count'])]
 
     def __str__(self):
         return self.name
@@ -67,6 +100,20 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    # recipes using it, kept up to date by core.counts
+    recipe_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # a name once per user, its index serves the listing ordered by
+        # name, the other the one by popularity
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_ingredient_name_per_user'
+            ),
+        ]
+        indexes = [models.Index(fields=['user', 'recipe_count'])]
 
     def __str__(self):
         return self.name
@@ -76,6 +123,16 @@ class Recipe(models.Model):
     """
     recipe object
     """
+    # where the last uploaded image is, clients poll it after a 202
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUSES = (
+        (IMAGE_PROCESSING, 'Processing'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete = models.CASCADE
@@ -88,7 +145,98 @@ class Recipe(models.Model):
     # the object name you want to many to many
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to = recipe_image_file_path)
+    image = models.ImageField(
+        null=True, upload_to = recipe_image_file_path, db_index=True,
+        storage=recipe_image_storage
+    )
+    # the image file name without directory and extension, its sha256 (or
+    # the uuid of older uploads), thumbnail urls refer to images by it
+    image_key = models.CharField(
+        max_length=64, blank=True, db_index=True, editable=False
+    )
+    image_status = models.CharField(
+        max_length=10, blank=True, choices=IMAGE_STATUSES
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # serves the per user listing ordered by id
+        indexes = [models.Index(fields=['user', 'id'])]
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        self.image_key = image_key(self.image.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'image' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'image_key'}
+        super().save(*args, **kwargs)
+
+
+class RecipeImageRendition(models.Model):
+    """
+    resized copy of a recipe image
+    """
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='renditions'
+    )
+    file = models.FileField(
+        upload_to=recipe_rendition_file_path,
+        storage=recipe_image_storage,
+        db_index=True
+    )
+    format = models.CharField(max_length=10)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    def __str__(self):
+        return self.file.name
+
+
+class RecipeSearchDocument(models.Model):
+    """
+    full text index row of a recipe, written by recipe.search
+
+    the table is created by a migration per database backend (FTS5 on
+    SQLite, tsvector with GIN on Postgres), the model only lets querysets
+    join it
+    """
+    recipe = models.OneToOneField(
+        'Recipe',
+        primary_key=True,
+        on_delete=models.DO_NOTHING,
+        related_name='search_document'
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'recipe_search'
+
+
+class AuthToken(models.Model):
+    """
+    API token of one of a user's devices, issued by user.tokens
+
+    opaque tokens are stored as the sha256 digest of their key, signed
+    tokens carry their id, user and expiry and have no digest
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='auth_tokens'
+    )
+    digest = models.CharField(max_length=64, unique=True, null=True)
+    device = models.CharField(max_length=255, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    expires = models.DateTimeField()
+    revoked = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # serves the per user device listing and replacing a device's token
+        indexes = [models.Index(fields=['user', 'device'])]
+
+    def __str__(self):
+        return f'{self.user_id}:{self.device or self.pk}'
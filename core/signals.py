@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_init, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from core import counts
+from core.models import Recipe, RecipeImageRendition
+from core.storage import release
+
+
+def _stored_name(instance, field_name):
+    # read the raw value, the attribute would load a deferred field
+    value = instance.__dict__.get(field_name)
+    return getattr(value, 'name', value)
+
+
+@receiver(post_init, sender=Recipe)
+def remember_image(sender, instance, **kwargs):
+    instance._stored_image = _stored_name(instance, 'image')
+
+
+@receiver(post_save, sender=Recipe)
+def release_replaced_image(sender, instance, **kwargs):
+    if 'image' not in instance.__dict__:
+        return
+    current = _stored_name(instance, 'image')
+    if instance._stored_image != current:
+        release(
+            Recipe, 'image', instance._stored_image,
+            settings.RECIPE_IMAGE_GC_GRACE
+        )
+        instance._stored_image = current
+
+
+@receiver(post_delete, sender=Recipe)
+def release_image(sender, instance, **kwargs):
+    release(
+        Recipe, 'image', _stored_name(instance, 'image'),
+        settings.RECIPE_IMAGE_GC_GRACE
+    )
+
+
+@receiver(post_delete, sender=RecipeImageRendition)
+def release_rendition(sender, instance, **kwargs):
+    release(
+        RecipeImageRendition, 'file', _stored_name(instance, 'file'),
+        settings.RECIPE_IMAGE_GC_GRACE
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_relation_changes(sender, instance, action, reverse, model,
+                           pk_set, **kwargs):
+    # instance is the recipe and model the tag or ingredient, the other way
+    # round for changes made from the tag or ingredient side
+    related = type(instance) if reverse else model
+    through, column = counts.RELATIONS[related]
+    stash = f'_removed_{column}'
+    if action == 'post_add':
+        if reverse:
+            counts.adjust(related, {instance.pk: len(pk_set)})
+        else:
+            counts.adjust(related, dict.fromkeys(pk_set, 1))
+    elif action in ('pre_remove', 'pre_clear'):
+        # remove() reports what it was asked to remove, not what was
+        # linked, and clear() reports nothing
+        if reverse:
+            links = through.objects.filter(**{column: instance.pk})
+            if pk_set is not None:
+                links = links.filter(recipe_id__in=pk_set)
+            instance.__dict__[stash] = {instance.pk: -links.count()}
+        else:
+            links = through.objects.filter(recipe_id=instance.pk)
+            if pk_set is not None:
+                links = links.filter(**{f'{column}__in': pk_set})
+            instance.__dict__[stash] = dict.fromkeys(
+                links.values_list(column, flat=True), -1
+            )
+    elif action in ('post_remove', 'post_clear'):
+        counts.adjust(related, instance.__dict__.pop(stash, {}))
+
+
+@receiver(pre_delete, sender=Recipe)
+def count_deleted_recipe(sender, instance, **kwargs):
+    # the through rows go with the recipe without any m2m signal, a count
+    # that drifted low stops at 0 like in counts.adjust()
+    for related in counts.RELATIONS:
+        related.objects.filter(
+            pk__in=counts.linked_ids(related, instance.pk)
+        ).update(recipe_count=Greatest(F('recipe_count') - 1, 0))
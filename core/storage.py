@@ -0,0 +1,89 @@
+import hashlib
+import os
+import tempfile
+import time
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    file system storage that keeps each distinct file once
+
+    a file is streamed once into a temp file while its SHA-256 is computed
+    and then stored as <upload dir>/<2 hex>/<sha256><ext>, saving content
+    that is already stored just returns the existing name. Records share
+    files, so a file is only deleted once nothing refers to it anymore
+    (see release)
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        directory, file_name = os.path.split(name)
+        extension = os.path.splitext(file_name)[1].lower()
+
+        # spool next to the destination so the final move is a rename
+        spool_dir = self.path(directory)
+        os.makedirs(spool_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=spool_dir, suffix='.tmp')
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+            hexdigest = digest.hexdigest()
+            name = os.path.join(
+                directory, hexdigest[:2], hexdigest + extension
+            ).replace('\\', '/')
+            path = self.path(name)
+            if os.path.exists(path):
+                # mark it used so a concurrent release leaves it alone
+                os.utime(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp_path, path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(path, self.file_permissions_mode)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name
+
+    def is_collectable(self, name, grace):
+        """
+        tell if an unreferenced file is old enough to be deleted
+
+        files saved again within `grace` seconds may be about to get a
+        reference from a transaction that hasn't committed yet
+        """
+        try:
+            return os.path.getmtime(self.path(name)) < time.time() - grace
+        except FileNotFoundError:
+            return False
+
+
+def release(model, field_name, name, grace):
+    """
+    delete a file stored by a field of the model once the current
+    transaction commits, unless some row still refers to it
+    """
+    if not name:
+        return
+    storage = model._meta.get_field(field_name).storage
+
+    def collect():
+        if model.objects.filter(**{field_name: name}).exists():
+            return
+        if (not isinstance(storage, ContentAddressedStorage)
+                or storage.is_collectable(name, grace)):
+            storage.delete(name)
+
+    transaction.on_commit(collect)
@@ -0,0 +1,114 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import counts
+from core.models import Ingredient, Recipe, Tag
+
+
+class RecipeCountTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'counts@test.com', 'password123'
+        )
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.dessert = Tag.objects.create(user=self.user, name='Dessert')
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+        self.recipes = [
+            Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_minutes=5,
+                price=1
+            )
+            for i in range(3)
+        ]
+
+    def assertCount(self, obj, expected):
+        obj.refresh_from_db(fields=['recipe_count'])
+        self.assertEqual(obj.recipe_count, expected)
+
+    def test_add_and_remove_from_recipe(self):
+        # test forward changes count once per link
+        recipe = self.recipes[0]
+        recipe.tags.add(self.vegan, self.dessert)
+        recipe.tags.add(self.vegan)
+        recipe.ingredients.add(self.salt)
+        self.assertCount(self.vegan, 1)
+        self.assertCount(self.dessert, 1)
+        self.assertCount(self.salt, 1)
+
+        recipe.tags.remove(self.vegan)
+        recipe.tags.remove(self.vegan)
+        self.assertCount(self.vegan, 0)
+        self.assertCount(self.dessert, 1)
+
+        recipe.tags.clear()
+        self.assertCount(self.dessert, 0)
+
+    def test_add_and_remove_from_tag(self):
+        # test reverse changes count the recipes linked or unlinked
+        self.vegan.recipe_set.add(*self.recipes)
+        self.assertCount(self.vegan, 3)
+
+        self.vegan.recipe_set.remove(self.recipes[0], self.recipes[0])
+        self.assertCount(self.vegan, 2)
+
+        self.vegan.recipe_set.clear()
+        self.assertCount(self.vegan, 0)
+
+    def test_set_replaces_links(self):
+        # test set() counts only the difference
+        recipe = self.recipes[0]
+        recipe.tags.set([self.vegan])
+        recipe.tags.set([self.dessert])
+        self.assertCount(self.vegan, 0)
+        self.assertCount(self.dessert, 1)
+
+    def test_deleting_recipe(self):
+        # test deleting recipes decrements what they used
+        for recipe in self.recipes:
+            recipe.tags.add(self.vegan)
+            recipe.ingredients.add(self.salt)
+        self.recipes[0].delete()
+        Recipe.objects.filter(pk=self.recipes[1].pk).delete()
+        self.assertCount(self.vegan, 1)
+        self.assertCount(self.salt, 1)
+
+    def test_count_never_negative(self):
+        # test a count that drifted low stops at 0
+        self.recipes[0].tags.add(self.vegan, self.dessert)
+        Tag.objects.filter(pk=self.vegan.pk).update(recipe_count=0)
+
+        self.recipes[0].tags.clear()
+        self.assertCount(self.vegan, 0)
+        self.assertCount(self.dessert, 0)
+
+    def test_deleting_recipe_with_drifted_count(self):
+        # test deleting a recipe whose tag count drifted to 0 still works
+        self.recipes[0].tags.add(self.vegan)
+        Tag.objects.filter(pk=self.vegan.pk).update(recipe_count=0)
+
+        self.recipes[0].delete()
+        self.assertCount(self.vegan, 0)
+
+    def test_reconcile(self):
+        # test drifted counts are recounted
+        self.recipes[0].tags.add(self.vegan)
+        Tag.objects.filter(pk=self.vegan.pk).update(recipe_count=7)
+        Tag.objects.filter(pk=self.dessert.pk).update(recipe_count=2)
+
+        self.assertEqual(counts.reconcile(Tag), 2)
+        self.assertCount(self.vegan, 1)
+        self.assertCount(self.dessert, 0)
+        self.assertEqual(counts.reconcile(Tag), 0)
+
+    def test_reconcile_command(self):
+        Ingredient.objects.filter(pk=self.salt.pk).update(recipe_count=4)
+        out = StringIO()
+        call_command('reconcile_recipe_counts', stdout=out)
+
+        self.assertIn('Corrected 0 tags', out.getvalue())
+        self.assertIn('Corrected 1 ingredients', out.getvalue())
+        self.assertCount(self.salt, 0)
@@ -0,0 +1,149 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from core.models import Recipe, RecipeImageRendition
+from core.storage import ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+    """
+    test files are stored once under their hash
+    """
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def tearDown(self):
+        shutil.rmtree(self.location)
+
+    def test_same_content_stored_once(self):
+        """
+        test saving the same bytes twice returns the same name
+        """
+        first = self.storage.save('uploads/a.JPG', ContentFile(b'pixels'))
+        second = self.storage.save('uploads/b.jpg', ContentFile(b'pixels'))
+
+        digest = hashlib.sha256(b'pixels').hexdigest()
+        self.assertEqual(first, f'uploads/{digest[:2]}/{digest}.jpg')
+        self.assertEqual(second, first)
+        self.assertEqual(os.listdir(self.storage.path('uploads')), [digest[:2]])
+
+    def test_different_content(self):
+        """
+        test different bytes get different names
+        """
+        first = self.storage.save('uploads/a.jpg', ContentFile(b'one'))
+        second = self.storage.save('uploads/a.jpg', ContentFile(b'two'))
+
+        self.assertNotEqual(first, second)
+        with self.storage.open(second) as stored:
+            self.assertEqual(stored.read(), b'two')
+
+
+@override_settings(RECIPE_IMAGE_GC_GRACE=0)
+class ImageCollectionTests(TransactionTestCase):
+    """
+    test image files are deleted once nothing refers to them
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = get_user_model().objects.create_user(
+            'test@londonapp.com',
+            'password123'
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def sample_recipe(self, content=b'image'):
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=5.00
+        )
+        recipe.image.save('photo.jpg', ContentFile(content))
+        return recipe
+
+    def test_shared_image_kept_until_last_recipe_deleted(self):
+        """
+        test recipes with the same image share one file
+        """
+        first = self.sample_recipe()
+        second = self.sample_recipe()
+        path = first.image.path
+        self.assertEqual(first.image.name, second.image.name)
+
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+        second.delete()
+        self.assertFalse(os.path.exists(path))
+
+    def test_replaced_image_deleted(self):
+        """
+        test replacing an image deletes the old file
+        """
+        recipe = self.sample_recipe(b'old')
+        old_path = recipe.image.path
+
+        recipe.image.save('photo.jpg', ContentFile(b'new'))
+
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(recipe.image.path))
+
+    def test_deferred_image_not_released(self):
+        """
+        test saving a recipe loaded without its image keeps the file
+        """
+        recipe = self.sample_recipe()
+        path = recipe.image.path
+
+        deferred = Recipe.objects.only('id', 'title').get(pk=recipe.pk)
+        deferred.title = 'Renamed'
+        deferred.save(update_fields=['title'])
+
+        self.assertTrue(os.path.exists(path))
+
+    def test_rendition_file_deleted(self):
+        """
+        test deleting a rendition deletes its file
+        """
+        recipe = self.sample_recipe()
+        rendition = RecipeImageRendition(
+            recipe=recipe, format='webp', width=320, height=240
+        )
+        rendition.file.save('photo_320.webp', ContentFile(b'small'))
+        path = rendition.file.path
+
+        rendition.delete()
+
+        self.assertFalse(os.path.exists(path))
+
+    def test_collect_command(self):
+        """
+        test the sweep deletes only unreferenced files
+        """
+        recipe = self.sample_recipe()
+        orphan = os.path.join(self.media_root, 'uploads/recipe/orphan.jpg')
+        with open(orphan, 'wb') as image:
+            image.write(b'left behind')
+
+        out = StringIO()
+        call_command('collect_recipe_images', stdout=out)
+
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(recipe.image.path))
+        self.assertIn('Deleted 1', out.getvalue())
@@ -0,0 +1,122 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import URLPattern
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from recipe.cache import CachedListMixin, record_hit, response_cache_key
+from recipe.conditional import ConditionalGetMixin, set_validators, validators
+from recipe.fastpath import FastJSONRenderer
+from user.authentication import cached_credentials
+
+
+READ_ACTIONS = ('list', 'retrieve')
+JSON = FastJSONRenderer.media_type
+
+
+def _cached_user_id(request):
+    # the same header TokenAuthentication reads, resolved only if known
+    auth = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(auth) != 2 or auth[0].lower() != 'token':
+        return None
+    credentials = cached_credentials(auth[1])
+    return credentials[0].id if credentials else None
+
+
+def _negotiates_json(request, kwargs):
+    # what DRF's content negotiation settles on when no renderer is asked
+    # for, anything else is left to it
+    if kwargs.get('format') or 'format' in request.GET:
+        return False
+    return request.META.get('HTTP_ACCEPT', '*/*') in ('*/*', JSON)
+
+
+def _answer(request, cached_list):
+    """
+    return the response for a read still valid for the client or a list
+    page in the response cache, None when the viewset must answer
+    """
+    user_id = _cached_user_id(request)
+    if user_id is None:
+        return None
+    etag, modified = validators(user_id, JSON, request.get_full_path())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=modified
+    )
+    if response is None and cached_list:
+        data = cache.get(response_cache_key(request, user_id))
+        if data is not None:
+            record_hit()
+            response = HttpResponse(
+                FastJSONRenderer().render(data), content_type=JSON
+            )
+            response['X-Cache'] = 'HIT'
+    if response is None:
+        return None
+    return set_validators(response, etag, modified)
+
+
+def async_read_view(view):
+    """
+    return an async version of a viewset view for ASGI deployments
+
+    reads still valid for the client (304) and list pages in the response
+    cache are answered from the caches alone, like the sync view would.
+    The caches may be a network away, so they are read in one hop to a
+    worker thread, off the event loop. Everything else runs the viewset in
+    one hop to the sync thread, instead of Django wrapping the whole view
+    in one
+    """
+    action = view.actions.get('get')
+    fast = (
+        action in READ_ACTIONS and issubclass(view.cls, ConditionalGetMixin)
+    )
+    cached_list = action == 'list' and issubclass(view.cls, CachedListMixin)
+    # the Allow header DRF adds for the methods the route maps, it serves
+    # HEAD wherever GET is mapped
+    methods = set(view.actions) | {'options'}
+    if 'get' in methods:
+        methods.add('head')
+    allow = ', '.join(
+        method.upper() for method in view.cls.http_method_names
+        if method in methods
+    )
+    sync_view = sync_to_async(view, thread_sensitive=True)
+    # no queries, the cache reads needn't wait for the sync thread
+    answer = sync_to_async(_answer, thread_sensitive=False)
+
+    async def async_view(request, *args, **kwargs):
+        if fast and request.method == 'GET' and _negotiates_json(
+            request, kwargs
+        ):
+            response = await answer(request, cached_list)
+            if response is not None:
+                response['Allow'] = allow
+                patch_vary_headers(response, ('Accept',))
+                return response
+        return await sync_view(request, *args, **kwargs)
+
+    # csrf_exempt() would hide that the view is a coroutine
+    async_view.csrf_exempt = True
+    async_view.cls = view.cls
+    async_view.initkwargs = view.initkwargs
+    async_view.actions = view.actions
+    return async_view
+
+
+def _serves_reads(url):
+    actions = getattr(url.callback, 'actions', {})
+    return any(action in READ_ACTIONS for action in actions.values())
+
+
+def async_read_urls(urls):
+    """
+    return the router's url patterns with their read views made async
+    """
+    return [
+        URLPattern(
+            url.pattern, async_read_view(url.callback),
+            url.default_args, url.name
+        ) if _serves_reads(url) else url
+        for url in urls
+    ]
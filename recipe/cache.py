@@ -0,0 +1,134 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+
+STATS_OUTCOMES = ('hits', 'misses')
+
+
+def _generation_key(user_id):
+    return f'recipe-api:generation:{user_id}'
+
+
+def _modified_key(user_id):
+    return f'recipe-api:modified:{user_id}'
+
+
+def get_generation(user_id):
+    """
+    return the current version of everything the user owns
+    """
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # seed from the clock so a counter lost to eviction never comes
+        # back with a value that old responses were cached under
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def get_version(user_id):
+    """
+    return the user's generation and when it last changed, in epoch seconds
+    """
+    generation = get_generation(user_id)
+    modified = cache.get(_modified_key(user_id))
+    if modified is None:
+        # unknown, claim it changed now rather than risk a false 304
+        modified = int(time.time())
+        cache.add(_modified_key(user_id), modified, None)
+    return generation, modified
+
+
+def bump_generation(user_id):
+    """
+    invalidate every cached response of the user
+    """
+    key = _generation_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+    cache.set(_modified_key(user_id), int(time.time()), None)
+
+
+def _stats_key(outcome):
+    return f'recipe-api:cache-stats:{outcome}'
+
+
+def stats():
+    """
+    return the response cache hit and miss counts of every worker sharing
+    the cache, since they were last reset
+    """
+    keys = [_stats_key(outcome) for outcome in STATS_OUTCOMES]
+    counts = cache.get_many(keys)
+    return {
+        outcome: counts.get(_stats_key(outcome), 0)
+        for outcome in STATS_OUTCOMES
+    }
+
+
+def reset_stats():
+    cache.delete_many([_stats_key(outcome) for outcome in STATS_OUTCOMES])
+
+
+def _record(outcome):
+    # counted in the shared cache, so the counts cover every worker
+    key = _stats_key(outcome)
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # the first count, unless another worker just made it
+            if not cache.add(key, 1, None):
+                cache.incr(key)
+    except Exception:
+        # counts are best effort, a cache that is down must not fail the
+        # request they are about
+        pass
+
+
+def record_hit():
+    _record('hits')
+
+
+def response_cache_key(request, user_id):
+    # the same params in any order share an entry
+    params = urlencode(sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        for value in values
+    ))
+    digest = hashlib.sha1(
+        f'{request.path}?{params}'.encode()
+    ).hexdigest()
+    generation = get_generation(user_id)
+    return f'recipe-api:response:{user_id}:{generation}:{digest}'
+
+
+class CachedListMixin:
+    """
+    serve list responses from a per user cache
+
+    entries are keyed on the user's generation, so any write by the user
+    makes all of their cached lists unreachable at once
+    """
+
+    def list(self, request, *args, **kwargs):
+        key = response_cache_key(request, request.user.id)
+        data = cache.get(key)
+        if data is not None:
+            _record('hits')
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        _record('misses')
+        response = super().list(request, *args, **kwargs)
+        cache.set(key, response.data, settings.RECIPE_API_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
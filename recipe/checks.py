@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    warn when the response cache invalidation can not reach every worker
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        'The default cache is local to each process.',
+        hint=(
+            'Cached recipe lists, ETags and token revocations are only '
+            'invalidated in the worker that handled the write. Configure '
+            'a shared cache such as memcached.'
+        ),
+        id='recipe.W001',
+    )]
@@ -0,0 +1,61 @@
+import hashlib
+import time
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from recipe.cache import get_version
+
+
+def validators(user_id, media_type, full_path):
+    """
+    return the (ETag, Last-Modified in epoch seconds or None) of a read of
+    the user's data
+    """
+    generation, modified = get_version(user_id)
+    etag = quote_etag(hashlib.sha1(
+        f'{user_id}:{generation}:{media_type}:{full_path}'.encode()
+    ).hexdigest())
+    # a timestamp from the current second may still be followed by
+    # another write within that second, only advertise settled ones
+    if modified >= int(time.time()):
+        modified = None
+    return etag, modified
+
+
+def set_validators(response, etag, modified):
+    response['ETag'] = etag
+    if modified is not None:
+        response['Last-Modified'] = http_date(modified)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    answer conditional list and detail requests from the user's version
+
+    the ETag is derived from the user's generation, which every write
+    bumps, so a matching If-None-Match or If-Modified-Since returns 304
+    before any query or serialization runs
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, super().retrieve, *args, **kwargs)
+
+    def _conditional(self, request, view, *args, **kwargs):
+        etag, modified = validators(
+            request.user.id, request.accepted_media_type,
+            request.get_full_path()
+        )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=modified
+        )
+        if response is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return set_validators(response, etag, modified)
@@ -0,0 +1,83 @@
+import csv
+from collections import defaultdict
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.models import Recipe
+
+
+CSV_HEADER = (
+    'id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients'
+)
+
+
+def iter_recipes(queryset, chunk_size):
+    """
+    yield the recipes as dicts with their tags and ingredients
+
+    rows come from a server side cursor and the relations are fetched per
+    chunk, so only one chunk is ever held in memory
+    """
+    rows = queryset.order_by('id').values(
+        'id', 'title', 'time_minutes', 'price', 'link'
+    ).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        recipe_ids = [row['id'] for row in chunk]
+        tags = _related(Recipe.tags.through, 'tag', recipe_ids)
+        ingredients = _related(
+            Recipe.ingredients.through, 'ingredient', recipe_ids
+        )
+        for row in chunk:
+            row['tags'] = tags[row['id']]
+            row['ingredients'] = ingredients[row['id']]
+            yield row
+
+
+def _related(through, field, recipe_ids):
+    # map recipe id to its related objects with one query for the chunk
+    related = defaultdict(list)
+    rows = through.objects.filter(recipe_id__in=recipe_ids).order_by(
+        f'{field}_id'
+    ).values_list('recipe_id', f'{field}_id', f'{field}__name')
+    for recipe_id, pk, name in rows:
+        related[recipe_id].append({'id': pk, 'name': name})
+    return related
+
+
+def ndjson_lines(recipes):
+    """
+    render each recipe as one line of JSON
+    """
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for recipe in recipes:
+        yield encoder.encode(recipe) + '\n'
+
+
+class _Echo:
+    # csv.writer only needs write(), hand the row straight back
+    def write(self, value):
+        return value
+
+
+def csv_lines(recipes):
+    """
+    render the recipes as CSV rows, relations as ;-separated names
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for recipe in recipes:
+        yield writer.writerow((
+            recipe['id'],
+            recipe['title'],
+            recipe['time_minutes'],
+            recipe['price'],
+            recipe['link'],
+            ';'.join(tag['name'] for tag in recipe['tags']),
+            ';'.join(
+                ingredient['name'] for ingredient in recipe['ingredients']
+            ),
+        ))
@@ -0,0 +1,215 @@
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# serializer fields whose representation of a database value is the value
+PASSTHROUGH_FIELDS = (serializers.IntegerField, serializers.CharField)
+
+# datetimes and dataclasses fall back to the JSON renderer, orjson would
+# format them differently
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson else 0
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    render JSON with orjson when it is installed
+
+    the output is byte for byte what JSONRenderer renders for the strings,
+    integers, lists and dicts lists are made of. Anything orjson can not
+    encode the same way, like lazy strings or decimals, is left to
+    JSONRenderer, as is indented output
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(
+            accepted_media_type, renderer_context or {}
+        ) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, option=ORJSON_OPTIONS)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer escapes these to keep the output valid javascript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
+
+
+def _represent(convert, value):
+    if convert is None or value is None:
+        return value
+    return convert(value)
+
+
+class Relation:
+    """
+    a many to many field a serializer renders as a list of primary keys,
+    or of the objects a nested plan of plain columns builds
+    """
+
+    def __init__(self, model_field, plan=None):
+        through = model_field.remote_field.through
+        self.manager = through.objects
+        self.source = through._meta.get_field(
+            model_field.m2m_field_name()
+        ).attname
+        target = through._meta.get_field(model_field.m2m_reverse_field_name())
+        self.target = target.attname
+        self.plan = plan
+        if plan is not None:
+            self.lookups = [f'{target.name}__{column}' for _, column, _ in plan]
+
+    def load(self, pks):
+        """
+        return the related ids or objects of every row, in id order like
+        the viewsets prefetch them
+        """
+        related = defaultdict(list)
+        rows = self.manager.filter(**{f'{self.source}__in': pks}).order_by(
+            self.target
+        )
+        if self.plan is None:
+            for pk, related_id in rows.values_list(self.source, self.target):
+                related[pk].append(related_id)
+            return related
+        for pk, *values in rows.values_list(self.source, *self.lookups):
+            related[pk].append({
+                name: _represent(convert, value)
+                for (name, _, convert), value in zip(self.plan, values)
+            })
+        return related
+
+
+@lru_cache(maxsize=None)
+def get_plan(serializer_class, model):
+    """
+    return how to build the rows of a list serializer from `.values()`,
+    a (name, column, convert) per field in the serializer's order with
+    no column and a Relation for many to many fields rendered as ids or
+    nested serializers of plain columns, or None when a field needs the
+    model instance
+    """
+    plan = []
+    for name, field in serializer_class().fields.items():
+        if field.write_only:
+            continue
+        if len(field.source_attrs) != 1:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if isinstance(field, serializers.ListSerializer):
+            nested = get_plan(type(field.child), model_field.related_model)
+            if (not isinstance(model_field, models.ManyToManyField)
+                    or nested is None
+                    or any(column is None for _, column, _ in nested)):
+                return None
+            plan.append((name, None, Relation(model_field, nested)))
+        elif isinstance(field, ManyRelatedField):
+            child = field.child_relation
+            if (not isinstance(model_field, models.ManyToManyField)
+                    or not isinstance(child, PrimaryKeyRelatedField)
+                    or child.pk_field is not None):
+                return None
+            plan.append((name, None, Relation(model_field)))
+        elif model_field.concrete and not model_field.is_relation:
+            convert = (
+                None if type(field) in PASSTHROUGH_FIELDS
+                else field.to_representation
+            )
+            plan.append((name, model_field.attname, convert))
+        else:
+            return None
+    return tuple(plan)
+
+
+def build_rows(plan, values):
+    """
+    return the serialized rows of the `.values()` dicts
+    """
+    pks = [row['pk'] for row in values]
+    related = {
+        name: relation.load(pks)
+        for name, column, relation in plan if column is None
+    }
+    rows = []
+    for row in values:
+        data = {}
+        for name, column, convert in plan:
+            if column is None:
+                data[name] = related[name].get(row['pk'], [])
+                continue
+            data[name] = _represent(convert, row[column])
+        rows.append(data)
+    return rows
+
+
+class FastListMixin:
+    """
+    serve list actions without model instances or serializers
+
+    the page is read with `.values()` and each many to many relation in
+    one query, then rendered by FastJSONRenderer. The response is the one
+    the serializer would produce, lists whose serializer needs more than
+    plain columns, primary key relations and nested relations of plain
+    columns take the regular path, as every list does with
+    RECIPE_API_FAST_LISTS off
+    """
+
+    def _fast_list_plan(self):
+        if self.action != 'list' or not settings.RECIPE_API_FAST_LISTS:
+            return None
+        return get_plan(self.get_serializer_class(), self.queryset.model)
+
+    def get_renderers(self):
+        # negotiated before the request is authenticated, so without the
+        # serializer, the renderer is as good for any list
+        renderers = super().get_renderers()
+        if self.action != 'list' or not settings.RECIPE_API_FAST_LISTS:
+            return renderers
+        return [
+            FastJSONRenderer() if type(renderer) is JSONRenderer
+            else renderer
+            for renderer in renderers
+        ]
+
+    def list(self, request, *args, **kwargs):
+        plan = self._fast_list_plan()
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        # cursors are read from the page's last row, keep the column of
+        # the ordering they are made from
+        fields = ['pk']
+        fields.extend(column for _, column, _ in plan if column is not None)
+        if self.paginator is not None:
+            fields.extend(
+                field.lstrip('-') for field in self.paginator.get_ordering(
+                    request, queryset, self
+                )
+            )
+        values = queryset.prefetch_related(None).values(
+            *dict.fromkeys(fields)
+        )
+        page = self.paginate_queryset(values)
+        data = build_rows(plan, page if page is not None else list(values))
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
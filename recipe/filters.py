@@ -0,0 +1,81 @@
+from django.db.models import Exists, OuterRef
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from core.models import Recipe
+from recipe import search
+
+
+def params_to_ints(param, value):
+    """
+    convert a string like '1,2,3' into a set of ints
+    """
+    try:
+        return {int(str_id) for str_id in value.split(',')}
+    except ValueError:
+        raise ValidationError(
+            {param: _('Must be a comma separated list of ids.')}
+        )
+
+
+class RecipeRelationFilter(BaseFilterBackend):
+    """
+    filter recipes by tag and ingredient ids
+
+    each filter is a correlated EXISTS against the through table, so the
+    recipe rows are never multiplied by a join and need no DISTINCT.
+    `?tags=1,2` matches recipes with any of the tags, `&tags_mode=all`
+    only the recipes that have every one of them (same for ingredients)
+    """
+    # query param, through model, column holding the related id
+    relations = (
+        ('tags', Recipe.tags.through, 'tag_id'),
+        ('ingredients', Recipe.ingredients.through, 'ingredient_id'),
+    )
+    modes = ('any', 'all')
+
+    def filter_queryset(self, request, queryset, view):
+        for param, through, column in self.relations:
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            ids = params_to_ints(param, value)
+            mode = request.query_params.get(f'{param}_mode', 'any')
+            if mode not in self.modes:
+                raise ValidationError(
+                    {f'{param}_mode': _('Must be one of: any, all.')}
+                )
+            if mode == 'all':
+                # one semi-join per id, each answered by the through index
+                for related_id in ids:
+                    queryset = queryset.filter(Exists(through.objects.filter(
+                        recipe_id=OuterRef('pk'), **{column: related_id}
+                    )))
+            else:
+                queryset = queryset.filter(Exists(through.objects.filter(
+                    recipe_id=OuterRef('pk'), **{f'{column}__in': ids}
+                )))
+        return queryset
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """
+    full text search of recipes with `?q=`
+
+    every word of the query matches as a prefix of a word in the title,
+    tag or ingredient names, results are annotated with their search_rank
+    and paginated best match first
+    """
+    search_param = 'q'
+    max_length = 200
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param)
+        if not query:
+            return queryset
+        if len(query) > self.max_length:
+            raise ValidationError({self.search_param: _(
+                'Ensure this field has no more than %(max)d characters.'
+            ) % {'max': self.max_length}})
+        return search.get_backend().search(queryset, query)
@@ -0,0 +1,207 @@
+import io
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.move import file_move_safe
+from django.db import connection
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+from core.models import Recipe, RecipeImageRendition
+
+
+logger = logging.getLogger(__name__)
+
+RENDITION_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def stage_upload(upload):
+    """
+    move an uploaded file aside for the worker and return its path
+    """
+    os.makedirs(settings.RECIPE_IMAGE_STAGING_DIR, exist_ok=True)
+    path = os.path.join(settings.RECIPE_IMAGE_STAGING_DIR, uuid.uuid4().hex)
+    if hasattr(upload, 'temporary_file_path'):
+        # large uploads are already on disk, a rename is enough
+        file_move_safe(upload.temporary_file_path(), path)
+    else:
+        with open(path, 'wb') as staged:
+            for chunk in upload.chunks():
+                staged.write(chunk)
+    return path
+
+
+def queue_recipe_image(recipe_id, staged_path, file_name):
+    """
+    mark a recipe's image as processing and hand the staged upload to the
+    image queue
+    """
+    Recipe.objects.filter(pk=recipe_id).update(
+        image_status=Recipe.IMAGE_PROCESSING
+    )
+    get_queue().enqueue(
+        process_recipe_image, recipe_id, staged_path, file_name
+    )
+
+
+def process_recipe_image(recipe_id, staged_path, file_name):
+    """
+    attach a staged upload to its recipe along with resized renditions
+
+    the image is re-encoded without its EXIF data (after applying its
+    orientation) so location and camera details are never served. The
+    staged file is removed whatever happens, a failure is recorded in the
+    recipe's image status
+    """
+    try:
+        _attach_image(recipe_id, staged_path, file_name)
+    except Exception:
+        Recipe.objects.filter(pk=recipe_id).update(
+            image_status=Recipe.IMAGE_FAILED
+        )
+        raise
+    finally:
+        try:
+            os.remove(staged_path)
+        except FileNotFoundError:
+            pass
+
+
+def _attach_image(recipe_id, staged_path, file_name):
+    try:
+        recipe = Recipe.objects.get(pk=recipe_id)
+    except Recipe.DoesNotExist:
+        return
+
+    with Image.open(staged_path) as source:
+        image_format = source.format
+        image = ImageOps.exif_transpose(source)
+        image.load()
+
+    original = io.BytesIO()
+    save_options = {'quality': 95} if image_format == 'JPEG' else {}
+    image.save(original, format=image_format, **save_options)
+
+    replaced = list(recipe.renditions.values_list('pk', flat=True))
+
+    recipe.image.save(
+        file_name, ContentFile(original.getvalue()), save=False
+    )
+    recipe.save(update_fields=['image'])
+
+    stem = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    for width, height, fmt, content in render_renditions(image):
+        rendition = RecipeImageRendition(
+            recipe=recipe, format=fmt, width=width, height=height
+        )
+        rendition.file.save(
+            f'{stem}_{width}.{fmt}', ContentFile(content), save=False
+        )
+        rendition.save()
+    # dropped after the new ones exist, so files they share are kept,
+    # the storage deletes the files nothing refers to anymore
+    RecipeImageRendition.objects.filter(pk__in=replaced).delete()
+    # set last, a client seeing ready finds the renditions in place
+    Recipe.objects.filter(pk=recipe_id).update(
+        image_status=Recipe.IMAGE_READY
+    )
+
+
+def render_renditions(image):
+    """
+    yield (width, height, format, bytes) for each configured rendition
+    """
+    widths = sorted({
+        min(width, image.width)
+        for width in settings.RECIPE_IMAGE_RENDITION_WIDTHS
+    })
+    for width in widths:
+        resized = resize(image, width)
+        for fmt in settings.RECIPE_IMAGE_RENDITION_FORMATS:
+            yield width, resized.height, fmt, encode(resized, fmt)
+
+
+def resize(image, width):
+    """
+    scale an image to the given width, never up
+    """
+    width = min(width, image.width)
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def encode(image, fmt):
+    """
+    encode an image as one of RENDITION_FORMATS
+    """
+    pil_format, options = RENDITION_FORMATS[fmt]
+    if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+
+class InlineImageQueue:
+    """
+    process images in the calling thread, the stand-in for tests and
+    deployments without spare workers
+    """
+
+    def enqueue(self, func, *args):
+        # a failure is recorded like on the workers, the upload still
+        # gets its 202
+        try:
+            func(*args)
+        except Exception:
+            logger.exception('Processing recipe image failed')
+
+
+class ThreadPoolImageQueue:
+    """
+    process images on a pool of worker threads in this process
+
+    Pillow releases the GIL while decoding and encoding, so the workers
+    run in parallel with each other and with the request threads
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.RECIPE_IMAGE_WORKERS,
+            thread_name_prefix='recipe-image'
+        )
+
+    def enqueue(self, func, *args):
+        self.executor.submit(self._run, func, *args)
+
+    def _run(self, func, *args):
+        try:
+            func(*args)
+        except Exception:
+            logger.exception('Processing recipe image failed')
+        finally:
+            # worker threads own their connection, don't leak it
+            connection.close()
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_queue():
+    """
+    return the queue configured by RECIPE_IMAGE_QUEUE
+    """
+    path = settings.RECIPE_IMAGE_QUEUE
+    with _queues_lock:
+        if path not in _queues:
+            _queues[path] = import_string(path)()
+        return _queues[path]
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from recipe import uploads
+
+
+class Command(BaseCommand):
+    """
+    remove the files of resumable image uploads that expired
+
+    meant to run periodically, e.g. from cron, uploads expire after
+    RECIPE_IMAGE_UPLOAD_EXPIRY seconds without a chunk
+    """
+    help = 'Remove the files of expired resumable image uploads'
+
+    def handle(self, *args, **options):
+        purged = uploads.purge_expired_uploads()
+        self.stdout.write(
+            self.style.SUCCESS(f'Purged {purged} expired uploads')
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe import search
+
+
+class Command(BaseCommand):
+    """
+    rebuild the recipe search index from the recipe tables
+
+    the index is kept up to date on every write, this is for restores and
+    writes that bypassed the ORM
+    """
+    help = 'Rebuild the recipe full text search index'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            search.get_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS('Recipe search index rebuilt'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from recipe import cache
+
+
+class Command(BaseCommand):
+    """
+    report how often list responses were served from the response cache
+
+    the counts are kept in the shared cache for every worker, they start
+    over when it is flushed or with --reset
+    """
+    help = 'Show the recipe API response cache hit and miss counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Start the counts over after showing them'
+        )
+
+    def handle(self, *args, **options):
+        counts = cache.stats()
+        total = counts['hits'] + counts['misses']
+        ratio = counts['hits'] / total if total else 0
+        self.stdout.write(
+            f"hits: {counts['hits']}  misses: {counts['misses']}  "
+            f'hit ratio: {ratio:.1%}'
+        )
+        if options['reset']:
+            cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counts reset'))
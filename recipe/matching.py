@@ -0,0 +1,65 @@
+from collections import defaultdict
+
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q
+from django.db.models.functions import Cast
+
+from core.models import Recipe
+
+
+def match_recipes(user, ingredient_ids, limit):
+    """
+    return the `limit` recipes of the user best covered by the ingredients
+
+    each match is a dict of the recipe id and title, the fraction of its
+    ingredients covered and the ingredients it still misses. Coverage is
+    counted in one aggregate over the recipe-ingredient table, restricted
+    to recipes using at least one of the ingredients so recipes that
+    can't match are never grouped
+    """
+    through = Recipe.ingredients.through
+    ingredient_ids = list(ingredient_ids)
+    # checking the owner on the candidates joins far fewer rows than on
+    # every ingredient of them
+    candidates = through.objects.filter(
+        ingredient_id__in=ingredient_ids, recipe__user=user
+    ).values('recipe_id')
+    ranked = list(
+        through.objects.filter(
+            recipe_id__in=candidates
+        ).values('recipe_id').annotate(
+            total=Count('id'),
+            covered=Count('id', filter=Q(ingredient_id__in=ingredient_ids)),
+        ).annotate(
+            coverage=ExpressionWrapper(
+                Cast('covered', FloatField()) / F('total'),
+                output_field=FloatField()
+            )
+        ).order_by(
+            '-coverage', '-covered', '-recipe_id'
+        ).values_list('recipe_id', 'coverage')[:limit]
+    )
+    if not ranked:
+        return []
+
+    recipe_ids = [recipe_id for recipe_id, _ in ranked]
+    titles = dict(Recipe.objects.filter(
+        id__in=recipe_ids
+    ).values_list('id', 'title'))
+    missing = defaultdict(list)
+    rows = through.objects.filter(recipe_id__in=recipe_ids).exclude(
+        ingredient_id__in=ingredient_ids
+    ).order_by('ingredient__name').values_list(
+        'recipe_id', 'ingredient_id', 'ingredient__name'
+    )
+    for recipe_id, pk, name in rows:
+        missing[recipe_id].append({'id': pk, 'name': name})
+
+    return [
+        {
+            'id': recipe_id,
+            'title': titles[recipe_id],
+            'coverage': coverage,
+            'missing': missing[recipe_id],
+        }
+        for recipe_id, coverage in ranked
+    ]
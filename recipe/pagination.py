@@ -0,0 +1,169 @@
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (
+    CursorPagination, _positive_int, _reverse_ordering
+)
+
+
+class RecipeApiCursorPagination(CursorPagination):
+    """
+    keyset pagination with opaque cursors
+
+    every page is a range scan from the cursor position on an indexed
+    ordering, so a deep page costs the same as the first one
+    """
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        # read the settings per request so they can be tuned per deployment
+        page_size = settings.RECIPE_API_PAGE_SIZE
+        max_page_size = settings.RECIPE_API_MAX_PAGE_SIZE
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=max_page_size
+            )
+        except (KeyError, ValueError):
+            return min(page_size, max_page_size)
+
+
+class RecipeCursorPagination(RecipeApiCursorPagination):
+    """
+    paginate recipes, newest first or best match first for a search
+    """
+    ordering = ('-id',)
+
+    def get_ordering(self, request, queryset, view):
+        # a search ranks lower the better the match, ties newest first
+        if 'search_rank' in queryset.query.annotations:
+            return ('search_rank', '-id')
+        return super().get_ordering(request, queryset, view)
+
+
+class KeysetCursorPagination(RecipeApiCursorPagination):
+    """
+    cursor pagination on a compound ordering
+
+    the cursor holds the values of every ordering field of the row a page
+    starts after, not just the first one, so with a unique last field
+    every position is exact and rows that tie on the first field are
+    never skipped or repeated. The values must be JSON types
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # CursorPagination's, with the compound position filter
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            try:
+                queryset = queryset.filter(
+                    self._after(current_position, reverse)
+                )
+            except (TypeError, ValueError):
+                # a value the field can't hold, the cursor was tampered with
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+
+        at_start = current_position is None and offset == 0
+        if reverse:
+            self.page.reverse()
+            self.has_next = not at_start
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = not at_start
+            self.next_position = following_position
+            self.previous_position = current_position
+        self.display_page_controls = self.has_previous or self.has_next
+        return self.page
+
+    def _after(self, position, reverse):
+        """
+        return a filter for the rows following the position in the
+        direction of the page
+        """
+        after = Q()
+        equal = {}
+        for order, value in zip(self.ordering, position):
+            name = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') != reverse else 'gt'
+            after |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return after
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list)
+                or len(position) != len(self.ordering)
+                or not all(isinstance(value, (str, int, float))
+                           for value in position)):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor._replace(position=position)
+
+    def encode_cursor(self, cursor):
+        if cursor.position is not None:
+            cursor = cursor._replace(position=json.dumps(cursor.position))
+        return super().encode_cursor(cursor)
+
+    def _get_position_from_instance(self, instance, ordering):
+        names = [order.lstrip('-') for order in ordering]
+        if isinstance(instance, dict):
+            return [instance[name] for name in names]
+        return [getattr(instance, name) for name in names]
+
+
+class RecipeAttrCursorPagination(KeysetCursorPagination):
+    """
+    paginate tags and ingredients by name, or most used first with
+    `?sort=popular`
+
+    a tag or ingredient whose count changes while a client pages through
+    the popular list moves, it can be seen twice or not at all, but the
+    rest of the list is neither skipped nor repeated
+    """
+    ordering = ('-name', 'id')
+    sort_query_param = 'sort'
+    sort_orderings = {
+        'name': ('-name', 'id'),
+        'popular': ('-recipe_count', '-name', 'id'),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        sort = request.query_params.get(self.sort_query_param, 'name')
+        try:
+            return self.sort_orderings[sort]
+        except KeyError:
+            raise ValidationError(
+                {self.sort_query_param: _('Must be one of: name, popular.')}
+            )
@@ -0,0 +1,234 @@
+import re
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from core.models import Recipe
+
+
+# the index table is created by core's 0013_recipe_search migration
+TABLE = 'recipe_search'
+BATCH_SIZE = 500
+
+_word = re.compile(r'\w+')
+
+
+def terms(query):
+    """
+    split a search query into lower case words
+    """
+    return [word.lower() for word in _word.findall(query)]
+
+
+def documents(recipe_ids):
+    """
+    return (id, title, tag names, ingredient names) for the recipes
+    """
+    tags = _names(Recipe.tags.through, 'tag', recipe_ids)
+    ingredients = _names(Recipe.ingredients.through, 'ingredient', recipe_ids)
+    return [
+        (pk, title, ' '.join(tags[pk]), ' '.join(ingredients[pk]))
+        for pk, title in Recipe.objects.filter(
+            id__in=recipe_ids
+        ).values_list('id', 'title')
+    ]
+
+
+def _names(through, field, recipe_ids):
+    names = defaultdict(list)
+    rows = through.objects.filter(recipe_id__in=recipe_ids).values_list(
+        'recipe_id', f'{field}__name'
+    )
+    for recipe_id, name in rows:
+        names[recipe_id].append(name)
+    return names
+
+
+class SearchBackend:
+    """
+    full text index of recipe titles, tag and ingredient names
+
+    every recipe has one row in the index table keyed by its id, writes
+    replace the rows of the recipes they touch. Matches rank lower the
+    better they are, so both backends sort ascending
+    """
+
+    def search(self, queryset, query):
+        """
+        restrict the recipes to matches of every word of the query (as
+        prefixes) and annotate them with their search_rank
+        """
+        words = terms(query)
+        if not words:
+            return queryset.none()
+        match = self.match_expression(words)
+        # filtering on the reverse one to one joins the index table, the
+        # raw conditions below refer to it by its name
+        return queryset.filter(search_document__isnull=False).filter(
+            RawSQL(self.match_sql, [match], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(
+                self.rank_sql, self.rank_params(match),
+                output_field=FloatField()
+            )
+        )
+
+    def rank_params(self, match):
+        return [match]
+
+    def index(self, recipe_ids):
+        """
+        bring the index rows of the recipes up to date, removing those
+        of recipes that no longer exist
+        """
+        recipe_ids = list(recipe_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(recipe_ids), BATCH_SIZE):
+                batch = recipe_ids[start:start + BATCH_SIZE]
+                self.delete(cursor, batch)
+                self.insert(cursor, documents(batch))
+
+    def remove(self, recipe_ids):
+        recipe_ids = list(recipe_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(recipe_ids), BATCH_SIZE):
+                self.delete(cursor, recipe_ids[start:start + BATCH_SIZE])
+
+    def rebuild(self):
+        """
+        index every recipe from scratch
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+        recipe_ids = Recipe.objects.order_by('id').values_list(
+            'id', flat=True
+        ).iterator(chunk_size=BATCH_SIZE)
+        batch = []
+        for pk in recipe_ids:
+            batch.append(pk)
+            if len(batch) == BATCH_SIZE:
+                self._insert_batch(batch)
+                batch = []
+        self._insert_batch(batch)
+
+    def _insert_batch(self, recipe_ids):
+        if recipe_ids:
+            with connection.cursor() as cursor:
+                self.insert(cursor, documents(recipe_ids))
+
+    def delete(self, cursor, recipe_ids):
+        raise NotImplementedError
+
+    def insert(self, cursor, documents):
+        raise NotImplementedError
+
+    def match_expression(self, words):
+        raise NotImplementedError
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    FTS5 virtual table ranked by bm25, the title weighs more than the
+    tag and ingredient names
+    """
+    match_sql = f'{TABLE} MATCH %s'
+    # one weight per column, recipe_id is unindexed
+    rank_sql = f'bm25({TABLE}, 0.0, 4.0, 1.0, 1.0)'
+
+    def rank_params(self, match):
+        # bm25 scores against the MATCH of the same query
+        return []
+
+    def delete(self, cursor, recipe_ids):
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE rowid IN '
+            f'({", ".join(["%s"] * len(recipe_ids))})',
+            recipe_ids
+        )
+
+    def insert(self, cursor, documents):
+        cursor.executemany(
+            f'INSERT INTO {TABLE} '
+            f'(rowid, recipe_id, title, tags, ingredients) '
+            f'VALUES (%s, %s, %s, %s, %s)',
+            [(document[0],) + document for document in documents]
+        )
+
+    def match_expression(self, words):
+        # quoted so FTS5 syntax in the query is searched for literally
+        return ' '.join(f'"{word}"*' for word in words)
+
+    def rebuild(self):
+        super().rebuild()
+        with connection.cursor() as cursor:
+            # merge the segments written in batches into one b-tree
+            cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    weighted tsvector with a GIN index ranked by ts_rank_cd, negated so
+    the best match ranks lowest
+    """
+    match_sql = f"{TABLE}.document @@ to_tsquery('simple', %s)"
+    rank_sql = f"-ts_rank_cd({TABLE}.document, to_tsquery('simple', %s))"
+
+    def delete(self, cursor, recipe_ids):
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE recipe_id = ANY(%s)', [recipe_ids]
+        )
+
+    def insert(self, cursor, documents):
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (recipe_id, document) VALUES (%s, "
+            f"setweight(to_tsvector('simple', %s), 'A') || "
+            f"setweight(to_tsvector('simple', %s), 'B') || "
+            f"setweight(to_tsvector('simple', %s), 'B'))",
+            documents
+        )
+
+    def match_expression(self, words):
+        return ' & '.join(f'{word}:*' for word in words)
+
+
+class UnindexedSearchBackend(SearchBackend):
+    """
+    search without an index on databases the migration creates none for,
+    every word of the query must be part of the title, all matches rank
+    the same so the newest come first
+    """
+
+    def search(self, queryset, query):
+        words = terms(query)
+        if not words:
+            return queryset.none()
+        match = Q()
+        for word in words:
+            match &= Q(title__icontains=word)
+        return queryset.filter(match).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+    def index(self, recipe_ids):
+        pass
+
+    def remove(self, recipe_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend():
+    """
+    return the search backend for the database in use
+    """
+    return BACKENDS.get(connection.vendor, UnindexedSearchBackend)()
@@ -1,7 +1,9 @@
+from functools import lru_cache
+
 from django.forms import fields
 from rest_framework import serializers
 
-from core.models import Tag, Ingredient, Recipe
+from core.models import Tag, Ingredient, Recipe, RecipeImageRendition
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -25,6 +27,23 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields =('id',)
 
 
+class BulkRenameSerializer(serializers.Serializer):
+    """
+    serializer for renaming a tag or ingredient in a bulk request
+    """
+    id = serializers.IntegerField()
+    name = serializers.CharField(max_length=255)
+
+
+class BulkDeleteSerializer(serializers.Serializer):
+    """
+    serializer for the ids of a bulk delete request
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False
+    )
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     """
     serializer for recipe obejct
@@ -56,11 +75,111 @@ class RecipeDetailSerializer(RecipeSerializer):
     tags = TagSerializer(many=True, read_only=True)
 
 
+# recipe relations `?expand=` renders as nested objects instead of ids
+EXPANDABLE_RELATIONS = {
+    'ingredients': IngredientSerializer,
+    'tags': TagSerializer,
+}
+
+
+@lru_cache(maxsize=None)
+def recipe_fieldset_serializer(fields, expand):
+    """
+    return a recipe serializer rendering only `fields`, with the relations
+    in `expand` nested
+
+    both are tuples in the order of RecipeSerializer's fields, so every
+    fieldset gets a single class
+    """
+    attrs = {
+        'Meta': type('Meta', (RecipeSerializer.Meta,), {'fields': fields}),
+    }
+    for name, serializer_class in EXPANDABLE_RELATIONS.items():
+        if name not in fields:
+            # drop the declared field along with the column
+            attrs[name] = None
+        elif name in expand:
+            attrs[name] = serializer_class(many=True, read_only=True)
+    return type('RecipeFieldsetSerializer', (RecipeSerializer,), attrs)
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    """
+    serialize a recipe of a bulk import, relations are plain ids that
+    the view resolves for the whole batch at once
+    """
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+
+    class Meta:
+        model = Recipe
+        fields = ('title','ingredients','tags','time_minutes',
+                'price','link'
+                    )
+
+
+class RecipeImageRenditionSerializer(serializers.ModelSerializer):
+    """
+    serializer for resized copies of a recipe image
+    """
+    class Meta:
+        model = RecipeImageRendition
+        fields = ('file','format','width','height')
+        read_only_fields = fields
+
+
 class RecipImageSerializer(serializers.ModelSerializer):
     """
     docstring
     """
+    renditions = RecipeImageRenditionSerializer(many=True, read_only=True)
+    image_status = serializers.CharField(read_only=True)
+
     class Meta:
         model = Recipe
-        fields = ('id','image')
+        fields = ('id','image','image_status','renditions')
         read_only_fileds = ('id',)
+
+
+class ImageUploadSessionSerializer(serializers.Serializer):
+    """
+    serializer for starting a resumable image upload
+    """
+    name = serializers.CharField(max_length=100)
+    size = serializers.IntegerField(min_value=1, required=False)
+
+
+class RelationUsageSerializer(serializers.Serializer):
+    """
+    serialize a tag or ingredient with the number of recipes using it
+    """
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    recipes = serializers.IntegerField()
+
+
+class RecipeStatsSerializer(serializers.Serializer):
+    """
+    serialize the aggregates of a user's recipes
+    """
+    recipes = serializers.IntegerField()
+    time_minutes_avg = serializers.FloatField(allow_null=True)
+    time_minutes_min = serializers.IntegerField(allow_null=True)
+    time_minutes_max = serializers.IntegerField(allow_null=True)
+    price_avg = serializers.DecimalField(
+        max_digits=5, decimal_places=2, allow_null=True
+    )
+    price_min = serializers.DecimalField(
+        max_digits=5, decimal_places=2, allow_null=True
+    )
+    price_max = serializers.DecimalField(
+        max_digits=5, decimal_places=2, allow_null=True
+    )
+    tags = RelationUsageSerializer(many=True)
+    ingredients = RelationUsageSerializer(many=True)
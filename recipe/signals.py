@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Ingredient, Recipe, Tag
+from recipe import search
+from recipe.cache import bump_generation
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_owner(sender, instance, **kwargs):
+    # fires from perform_create/update/destroy as well as any other write
+    bump_generation(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_relation_owner(sender, instance, action, pk_set, **kwargs):
+    # instance is the recipe, or the tag/ingredient for reverse changes,
+    # both belong to the same user
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_generation(instance.user_id)
+        # the recipes changed even though their rows did not
+        if isinstance(instance, Recipe):
+            recipes = Recipe.objects.filter(pk=instance.pk)
+        else:
+            recipes = Recipe.objects.filter(pk__in=pk_set or ())
+        recipes.update(updated_at=timezone.now())
+    elif action == 'pre_clear' and not isinstance(instance, Recipe):
+        # a reverse clear doesn't name the recipes afterwards
+        Recipe.objects.filter(pk__in=_recipe_ids(instance)).update(
+            updated_at=timezone.now()
+        )
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def reset_new_user(sender, instance, created, **kwargs):
+    # a new user may reuse the id of a deleted one, never serve them its
+    # cached responses
+    if created:
+        bump_generation(instance.id)
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(sender, instance, **kwargs):
+    search.get_backend().index([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(sender, instance, **kwargs):
+    search.get_backend().remove([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def index_relation(sender, instance, action, pk_set, **kwargs):
+    if isinstance(instance, Recipe):
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            search.get_backend().index([instance.pk])
+        return
+    # a tag or ingredient gained or lost recipes, a clear doesn't say
+    # which so remember them beforehand
+    column = 'tag_id' if isinstance(instance, Tag) else 'ingredient_id'
+    if action == 'pre_clear':
+        instance._search_recipe_ids = list(sender.objects.filter(
+            **{column: instance.pk}
+        ).values_list('recipe_id', flat=True))
+    elif action == 'post_clear':
+        search.get_backend().index(
+            instance.__dict__.pop('_search_recipe_ids', ())
+        )
+    elif action in ('post_add', 'post_remove'):
+        search.get_backend().index(pk_set)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_indexed_recipes(sender, instance, **kwargs):
+    # the through rows go with the object without any m2m signal
+    instance._search_recipe_ids = _recipe_ids(instance)
+    Recipe.objects.filter(pk__in=instance._search_recipe_ids).update(
+        updated_at=timezone.now()
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def index_named_recipes(sender, instance, **kwargs):
+    if kwargs.get('created'):
+        return
+    recipe_ids = instance.__dict__.pop('_search_recipe_ids', None)
+    if recipe_ids is None:
+        recipe_ids = _recipe_ids(instance)
+    search.get_backend().index(recipe_ids)
+
+
+def _recipe_ids(instance):
+    if isinstance(instance, Tag):
+        rows = Recipe.tags.through.objects.filter(tag_id=instance.pk)
+    else:
+        rows = Recipe.ingredients.through.objects.filter(
+            ingredient_id=instance.pk
+        )
+    return list(rows.values_list('recipe_id', flat=True))
@@ -0,0 +1,243 @@
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+from core.lru import LRUCache
+from core.models import Recipe
+from recipe.cache import get_generation
+
+
+BATCH_SIZE = 500
+METRICS = ('cosine', 'jaccard')
+# writes committing after a refresh read may carry an earlier updated_at,
+# every refresh looks back this far to catch them
+LOOKBACK = timedelta(seconds=60)
+
+
+def _feature_rows(**filters):
+    """
+    return (recipe ids, feature codes) of the tags and ingredients of the
+    recipes matching the filters, tags coded 2 * id, ingredients 2 * id + 1
+    """
+    recipe_ids = []
+    codes = []
+    for through, column, offset in (
+        (Recipe.tags.through, 'tag_id', 0),
+        (Recipe.ingredients.through, 'ingredient_id', 1),
+    ):
+        rows = np.array(
+            list(through.objects.filter(**filters).values_list(
+                'recipe_id', column
+            )),
+            dtype=np.int64
+        ).reshape(-1, 2)
+        recipe_ids.append(rows[:, 0])
+        codes.append(rows[:, 1] * 2 + offset)
+    return np.concatenate(recipe_ids), np.concatenate(codes)
+
+
+def _recipe_ids(**filters):
+    return np.array(
+        list(Recipe.objects.filter(**filters).order_by('id').values_list(
+            'id', flat=True
+        )),
+        dtype=np.int64
+    )
+
+
+class SimilarityIndex:
+    """
+    one user's recipes as binary tag and ingredient vectors
+
+    rows of a sparse matrix sorted by recipe id, so the similarity of one
+    recipe to all the others is a single sparse product. The index
+    remembers the generation it reflects and when it was built, to pick up
+    only the recipes changed since
+    """
+
+    def __init__(self, recipe_ids, matrix, generation, built_at):
+        self.recipe_ids = recipe_ids
+        self.matrix = matrix
+        self.generation = generation
+        self.built_at = built_at
+        self.sizes = np.diff(matrix.indptr)
+
+    @classmethod
+    def build(cls, user_id, generation):
+        built_at = datetime.now(timezone.utc)
+        recipe_ids = _recipe_ids(user_id=user_id)
+        rows, codes = _feature_rows(recipe__user_id=user_id)
+        return cls(
+            recipe_ids, cls._matrix(recipe_ids, rows, codes),
+            generation, built_at
+        )
+
+    @staticmethod
+    def _matrix(recipe_ids, rows, codes, width=0):
+        # recipe_ids is sorted, rows are looked up in it
+        width = max(width, int(codes.max()) + 1 if len(codes) else 1)
+        matrix = sparse.csr_matrix(
+            (
+                np.ones(len(codes), dtype=np.float32),
+                (np.searchsorted(recipe_ids, rows), codes)
+            ),
+            shape=(len(recipe_ids), width)
+        )
+        # a relation added twice would count twice
+        matrix.data[:] = 1
+        return matrix
+
+    def refresh(self, user_id, generation):
+        """
+        return an index that also reflects the recipes changed, added or
+        deleted since this one was built
+        """
+        built_at = datetime.now(timezone.utc)
+        recipe_ids = _recipe_ids(user_id=user_id)
+        changed = np.union1d(
+            _recipe_ids(
+                user_id=user_id, updated_at__gte=self.built_at - LOOKBACK
+            ),
+            np.setdiff1d(recipe_ids, self.recipe_ids, assume_unique=True)
+        )
+        if len(changed) > len(recipe_ids) // 2:
+            return self.build(user_id, generation)
+
+        keep = np.isin(self.recipe_ids, recipe_ids, assume_unique=True)
+        keep &= ~np.isin(self.recipe_ids, changed, assume_unique=True)
+        rows = [np.empty(0, dtype=np.int64)]
+        codes = [np.empty(0, dtype=np.int64)]
+        for start in range(0, len(changed), BATCH_SIZE):
+            batch_rows, batch_codes = _feature_rows(
+                recipe_id__in=changed[start:start + BATCH_SIZE].tolist()
+            )
+            rows.append(batch_rows)
+            codes.append(batch_codes)
+        rows = np.concatenate(rows)
+        codes = np.concatenate(codes)
+
+        kept = self.matrix[keep]
+        width = max(kept.shape[1], int(codes.max()) + 1 if len(codes) else 1)
+        kept.resize((kept.shape[0], width))
+        ids = np.concatenate([self.recipe_ids[keep], changed])
+        order = np.argsort(ids, kind='stable')
+        matrix = sparse.vstack([
+            kept, self._matrix(changed, rows, codes, width)
+        ]).tocsr()[order]
+        return SimilarityIndex(ids[order], matrix, generation, built_at)
+
+    def similar(self, recipe_id, k, metric='cosine'):
+        """
+        return up to k (recipe id, score) most similar to the recipe, best
+        first, leaving out the recipe itself and recipes sharing nothing
+        """
+        row = np.searchsorted(self.recipe_ids, recipe_id)
+        if row == len(self.recipe_ids) or self.recipe_ids[row] != recipe_id:
+            return []
+        size = self.sizes[row]
+        if not size:
+            return []
+        overlap = (self.matrix @ self.matrix[row].T).toarray().ravel()
+        overlap[row] = 0
+        candidates = np.flatnonzero(overlap)
+        overlap = overlap[candidates]
+        sizes = self.sizes[candidates]
+        if metric == 'jaccard':
+            scores = overlap / (size + sizes - overlap)
+        else:
+            scores = overlap / np.sqrt(size * sizes)
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        # best score first, newest recipe among equals
+        top = top[np.lexsort(
+            (-self.recipe_ids[candidates[top]], -scores[top])
+        )]
+        return [
+            (int(self.recipe_ids[candidates[i]]), float(scores[i]))
+            for i in top
+        ]
+
+    def save(self, path):
+        """
+        write the index to path, atomically replacing the previous one
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp.npz'
+        np.savez(
+            temp_path,
+            recipe_ids=self.recipe_ids,
+            indptr=self.matrix.indptr,
+            indices=self.matrix.indices,
+            shape=np.array(self.matrix.shape),
+            generation=np.array(self.generation, dtype=np.int64),
+            built_at=np.array(self.built_at.timestamp()),
+        )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with np.load(path) as stored:
+                indices = stored['indices']
+                matrix = sparse.csr_matrix(
+                    (
+                        np.ones(len(indices), dtype=np.float32),
+                        indices,
+                        stored['indptr']
+                    ),
+                    shape=tuple(stored['shape'])
+                )
+                return cls(
+                    stored['recipe_ids'],
+                    matrix,
+                    int(stored['generation']),
+                    datetime.fromtimestamp(
+                        float(stored['built_at']), timezone.utc
+                    )
+                )
+        except (FileNotFoundError, ValueError, KeyError, OSError):
+            return None
+
+
+# user id -> SimilarityIndex
+similarity_indexes = LRUCache(maxsize=settings.RECIPE_SIMILARITY_CACHE_SIZE)
+_build_lock = threading.Lock()
+
+
+def index_path(user_id):
+    return os.path.join(settings.RECIPE_SIMILARITY_DIR, f'{user_id}.npz')
+
+
+def get_index(user_id):
+    """
+    return the user's similarity index, up to date with their recipes
+
+    an index is looked for in this process, then on disk where another
+    worker may have left it, and is refreshed with the recipes changed
+    since it was built when the user's generation moved on
+    """
+    generation = get_generation(user_id)
+    index = similarity_indexes.get(user_id)
+    if index is not None and index.generation == generation:
+        return index
+    with _build_lock:
+        path = index_path(user_id)
+        if index is None:
+            index = SimilarityIndex.load(path)
+        if index is None:
+            index = SimilarityIndex.build(user_id, generation)
+        elif index.generation != generation:
+            index = index.refresh(user_id, generation)
+        else:
+            similarity_indexes.set(user_id, index)
+            return index
+        index.save(path)
+        similarity_indexes.set(user_id, index)
+        return index
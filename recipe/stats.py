@@ -0,0 +1,31 @@
+from django.db.models import Avg, Count, F, Max, Min
+
+from core.models import Ingredient, Recipe, Tag
+
+
+def recipe_stats(user):
+    """
+    return the aggregates of the user's recipes in three queries
+
+    one aggregate over the recipes, and per tag and per ingredient the
+    number of recipes using it (their maintained recipe_count), most used
+    first
+    """
+    stats = Recipe.objects.filter(user=user).aggregate(
+        recipes=Count('id'),
+        time_minutes_avg=Avg('time_minutes'),
+        time_minutes_min=Min('time_minutes'),
+        time_minutes_max=Max('time_minutes'),
+        price_avg=Avg('price'),
+        price_min=Min('price'),
+        price_max=Max('price'),
+    )
+    for field, model in (('tags', Tag), ('ingredients', Ingredient)):
+        stats[field] = list(
+            model.objects.filter(user=user).annotate(
+                recipes=F('recipe_count')
+            ).order_by('-recipes', 'name', 'id').values(
+                'id', 'name', 'recipes'
+            )
+        )
+    return stats
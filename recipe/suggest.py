@@ -0,0 +1,65 @@
+import heapq
+from bisect import bisect_left
+
+from django.conf import settings
+
+from core.lru import LRUCache
+from recipe.cache import get_generation
+
+
+class PrefixIndex:
+    """
+    names of one user's tags or ingredients sorted for prefix lookups
+
+    the names matching a prefix are a contiguous run of the sorted keys,
+    found with a binary search, and the most used of them are picked
+    without sorting the whole run
+    """
+
+    def __init__(self, rows):
+        # rows of (id, name, number of recipes using it)
+        entries = sorted(
+            (name.casefold(), -usage, name, pk) for pk, name, usage in rows
+        )
+        self.keys = [entry[0] for entry in entries]
+        self.entries = [entry[1:] for entry in entries]
+
+    def lookup(self, prefix, limit):
+        """
+        return up to `limit` (id, name) starting with prefix, most used
+        first and alphabetically among equals
+        """
+        prefix = prefix.casefold()
+        start = bisect_left(self.keys, prefix)
+        # sorts after every key that continues the prefix
+        end = bisect_left(self.keys, prefix + '\U0010ffff', start)
+        best = heapq.nsmallest(limit, self.entries[start:end])
+        return [(pk, name) for _, name, pk in best]
+
+    def __len__(self):
+        return len(self.keys)
+
+
+# (model label, user id) -> (generation, PrefixIndex)
+prefix_indexes = LRUCache(maxsize=settings.RECIPE_SUGGEST_CACHE_SIZE)
+
+
+def get_index(model, user_id):
+    """
+    return the prefix index of the user's objects of the model
+
+    indexes are kept per process and keyed on the user's generation, so
+    creating or renaming anything makes the next lookup rebuild it
+    """
+    key = (model._meta.label, user_id)
+    generation = get_generation(user_id)
+    cached = prefix_indexes.get(key)
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    index = PrefixIndex(
+        model.objects.filter(user_id=user_id).values_list(
+            'id', 'name', 'recipe_count'
+        ).order_by()
+    )
+    prefix_indexes.set(key, (generation, index))
+    return index
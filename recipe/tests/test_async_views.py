@@ -0,0 +1,160 @@
+import asyncio
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from core.models import Recipe, Tag
+from recipe import views
+from recipe.async_views import async_read_urls, async_read_view
+from recipe.urls import router
+from user import tokens
+from user.authentication import cached_credentials, token_cache
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class AsyncReadViewTests(TestCase):
+    """
+    test the async read views answer like the sync viewsets
+    """
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'async@test.com', 'password123'
+        )
+        token, key = tokens.issue(self.user)
+        self.factory = RequestFactory(HTTP_AUTHORIZATION=f'Token {key}')
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=5
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Warm'))
+        self.list_view = views.RecipeViewSet.as_view(
+            {'get': 'list', 'post': 'create'}
+        )
+        self.async_list_view = async_read_view(self.list_view)
+
+    def sync_get(self, view, path, **kwargs):
+        request = self.factory.get(path, **kwargs.pop('headers', {}))
+        response = view(request, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def async_get(self, view, path, **kwargs):
+        request = self.factory.get(path, **kwargs.pop('headers', {}))
+        return async_to_sync(view)(request, **kwargs)
+
+    def assertSameResponse(self, expected, actual):
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.content, expected.content)
+        for header in ('Content-Type', 'ETag', 'Vary', 'Allow', 'X-Cache'):
+            self.assertEqual(actual.get(header), expected.get(header))
+
+    def test_view_is_coroutine(self):
+        self.assertTrue(asyncio.iscoroutinefunction(self.async_list_view))
+        self.assertTrue(self.async_list_view.csrf_exempt)
+
+    def test_not_modified_without_queries(self):
+        """
+        test a revalidation is answered from the caches alone
+        """
+        first = self.sync_get(self.list_view, RECIPES_URL)
+        headers = {'HTTP_IF_NONE_MATCH': first['ETag']}
+        expected = self.sync_get(self.list_view, RECIPES_URL, headers=headers)
+
+        with self.assertNumQueries(0):
+            res = self.async_get(
+                self.async_list_view, RECIPES_URL, headers=headers
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertSameResponse(expected, res)
+
+    def test_cached_list_without_queries(self):
+        """
+        test a cached list page renders the bytes the viewset would
+        """
+        self.sync_get(self.list_view, RECIPES_URL)
+        expected = self.sync_get(self.list_view, RECIPES_URL)
+        self.assertEqual(expected['X-Cache'], 'HIT')
+
+        with self.assertNumQueries(0):
+            res = self.async_get(self.async_list_view, RECIPES_URL)
+
+        self.assertSameResponse(expected, res)
+
+    def test_caches_read_off_the_event_loop(self):
+        """
+        test the token and response caches are not read on the event loop
+        """
+        self.sync_get(self.list_view, RECIPES_URL)
+        loops = []
+
+        def credentials(key):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return cached_credentials(key)
+
+        with patch(
+            'recipe.async_views.cached_credentials', side_effect=credentials
+        ):
+            res = self.async_get(self.async_list_view, RECIPES_URL)
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(loops, [None])
+
+    def test_uncached_read_runs_viewset(self):
+        detail_view = views.RecipeViewSet.as_view({'get': 'retrieve'})
+        url = detail_url(self.recipe.id)
+        expected = self.sync_get(detail_view, url, pk=self.recipe.id)
+
+        res = self.async_get(
+            async_read_view(detail_view), url, pk=self.recipe.id
+        )
+        res.render()
+
+        self.assertSameResponse(expected, res)
+        self.assertEqual(res.data['title'], 'Soup')
+
+    def test_unknown_token_runs_viewset(self):
+        factory = RequestFactory(HTTP_AUTHORIZATION='Token unknown')
+        request = factory.get(RECIPES_URL)
+
+        res = async_to_sync(self.async_list_view)(request)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_browsable_api_runs_viewset(self):
+        self.sync_get(self.list_view, RECIPES_URL)
+
+        res = self.async_get(
+            self.async_list_view, RECIPES_URL,
+            headers={'HTTP_ACCEPT': 'text/html'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/html; charset=utf-8')
+
+    def test_only_read_routes_replaced(self):
+        urls = {url.name: url for url in async_read_urls(router.urls)}
+
+        for name in ('recipe-list', 'recipe-detail', 'tag-list'):
+            self.assertTrue(asyncio.iscoroutinefunction(urls[name].callback))
+        for name in ('recipe-match', 'tag-suggest', 'recipe-upload-image'):
+            self.assertFalse(
+                asyncio.iscoroutinefunction(urls[name].callback)
+            )
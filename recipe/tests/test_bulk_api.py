@@ -0,0 +1,241 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.views import TagViewSet
+
+
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredient-bulk')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class BulkApiTests(TestCase):
+    """
+    test creating, renaming and deleting tags and ingredients in bulk
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonapp.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_ingredients(self):
+        """
+        test creating ingredients skips existing and repeated names
+        """
+        Ingredient.objects.create(user=self.user, name='Salt')
+        payload = [
+            {'name': 'Salt'},
+            {'name': 'Pepper'},
+            {'name': 'Kale'},
+            {'name': 'Pepper'},
+        ]
+
+        with self.assertNumQueries(7):
+            # savepoint, existing names, savepoint, insert, release, created
+            # rows, release
+            res = self.client.post(INGREDIENTS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [item['name'] for item in res.data['created']], ['Pepper', 'Kale']
+        )
+        self.assertEqual(res.data['existing'], ['Salt'])
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 3
+        )
+
+    def test_bulk_create_concurrent_names(self):
+        """
+        test names another request creates meanwhile are reported as
+        existing, not as created by this one
+        """
+        Tag.objects.create(user=self.user, name='Vegan')
+        existing_names = TagViewSet._existing_names
+        # the first look misses the tag, as if it was committed just after
+        lookups = iter([lambda view, names: set(), existing_names])
+
+        with patch.object(
+            TagViewSet, '_existing_names',
+            lambda view, names: next(lookups)(view, names)
+        ):
+            res = self.client.post(
+                TAGS_BULK_URL, [{'name': 'Vegan'}, {'name': 'Cheap'}],
+                format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [item['name'] for item in res.data['created']], ['Cheap']
+        )
+        self.assertEqual(res.data['existing'], ['Vegan'])
+
+    def test_bulk_create_invalid_items(self):
+        """
+        test invalid items are reported and nothing is written
+        """
+        payload = [{'name': 'Vegan'}, {'name': ''}, {}]
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertIn('name', res.data[2])
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_requires_list(self):
+        """
+        test the payload must be a list
+        """
+        res = self.client.post(TAGS_BULK_URL, {'name': 'Vegan'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_API_MAX_BULK_SIZE=2)
+    def test_bulk_size_limited(self):
+        """
+        test oversized batches are rejected
+        """
+        payload = [{'name': 'a'}, {'name': 'b'}, {'name': 'c'}]
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_rename_tags(self):
+        """
+        test renaming tags in one request
+        """
+        tag1 = Tag.objects.create(user=self.user, name='Vegn')
+        tag2 = Tag.objects.create(user=self.user, name='Deserts')
+        payload = [
+            {'id': tag1.id, 'name': 'Vegan'},
+            {'id': tag2.id, 'name': 'Desserts'},
+        ]
+        res = self.client.patch(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tag1.refresh_from_db()
+        tag2.refresh_from_db()
+        self.assertEqual(tag1.name, 'Vegan')
+        self.assertEqual(tag2.name, 'Desserts')
+
+    def test_bulk_rename_other_users_tag(self):
+        """
+        test tags of other users can not be renamed
+        """
+        user2 = get_user_model().objects.create_user(
+            'other@londonapp.com',
+            'password123'
+        )
+        tag = Tag.objects.create(user=user2, name='Fruit')
+        payload = [{'id': tag.id, 'name': 'Mine'}]
+        res = self.client.patch(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[0])
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Fruit')
+
+    def test_bulk_create_invalidates_list(self):
+        """
+        test the cached list shows bulk created ingredients
+        """
+        self.client.get(INGREDIENTS_URL)
+        self.client.post(
+            INGREDIENTS_BULK_URL, [{'name': 'Salt'}], format='json'
+        )
+
+        res = self.client.get(INGREDIENTS_URL)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_bulk_rename_to_taken_names(self):
+        """
+        test renames may not repeat a name, in the request or of an
+        object it leaves alone
+        """
+        tag1 = Tag.objects.create(user=self.user, name='Vegn')
+        tag2 = Tag.objects.create(user=self.user, name='Deserts')
+        Tag.objects.create(user=self.user, name='Vegan')
+        payload = [
+            {'id': tag1.id, 'name': 'Vegan'},
+            {'id': tag2.id, 'name': 'Soup'},
+            {'id': tag2.id, 'name': 'Soup'},
+        ]
+        res = self.client.patch(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data[0])
+        self.assertEqual(set(res.data[1]), {'id', 'name'})
+        tag1.refresh_from_db()
+        self.assertEqual(tag1.name, 'Vegn')
+
+    def test_bulk_rename_to_own_name(self):
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{'id': tag.id, 'name': 'Vegan'}]
+        res = self.client.patch(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_create_taken_name(self):
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_delete(self):
+        """
+        test deleting tags unlinks them from recipes and the cached list
+        """
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        kept = Tag.objects.create(user=self.user, name='Soup')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Cake', time_minutes=5, price=1
+        )
+        recipe.tags.add(tag1, kept)
+        self.client.get(TAGS_URL)
+
+        res = self.client.delete(
+            TAGS_BULK_URL, [tag1.id, tag2.id], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Tag.objects.all()), [kept])
+        self.assertEqual(list(recipe.tags.all()), [kept])
+        res = self.client.get(TAGS_URL)
+        self.assertEqual([tag['name'] for tag in res.data['results']], ['Soup'])
+
+    def test_bulk_delete_unknown_ids(self):
+        """
+        test nothing is deleted when an id is not the user's
+        """
+        user2 = get_user_model().objects.create_user(
+            'other@londonapp.com',
+            'password123'
+        )
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        other = Tag.objects.create(user=user2, name='Fruit')
+
+        res = self.client.delete(
+            TAGS_BULK_URL, [tag.id, other.id], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(res.data), [1])
+        self.assertEqual(Tag.objects.count(), 2)
+
+        res = self.client.delete(TAGS_BULK_URL, ['x'], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.delete(TAGS_BULK_URL, [], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
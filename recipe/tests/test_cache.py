@@ -0,0 +1,160 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe import cache
+from recipe.checks import check_shared_cache
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class ResponseCacheTests(TestCase):
+    """
+    test list responses are cached per user and invalidated on writes
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonapp.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=5.00
+        )
+
+    def test_list_served_from_cache(self):
+        """
+        test a repeated list is a cache hit without queries
+        """
+        before = cache.stats()
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(len(res.data['results']), 1)
+
+        after = cache.stats()
+        self.assertEqual(after['hits'] - before['hits'], 1)
+        self.assertEqual(after['misses'] - before['misses'], 1)
+
+    def test_query_params_normalized(self):
+        """
+        test the param order does not matter but their values do
+        """
+        self.client.get(TAGS_URL, {'assigned_only': 0, 'page_size': 5})
+
+        res = self.client.get(TAGS_URL + '?page_size=5&assigned_only=0')
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+    def test_create_through_api_invalidates(self):
+        """
+        test creating a recipe refreshes the cached list
+        """
+        self.client.get(RECIPES_URL)
+        payload = {'title': 'New recipe', 'time_minutes': 5, 'price': 5.00}
+        self.client.post(RECIPES_URL, payload)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_relation_change_invalidates(self):
+        """
+        test adding a tag to a recipe refreshes the cached list
+        """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(RECIPES_URL)
+        self.recipe.tags.add(tag)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'][0]['tags'], [tag.id])
+
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.client.get(RECIPES_URL)
+        ingredient.recipe_set.add(self.recipe)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data['results'][0]['ingredients'], [ingredient.id])
+
+    def test_cache_is_per_user(self):
+        """
+        test users never see each other's cached lists
+        """
+        self.client.get(RECIPES_URL)
+        user2 = get_user_model().objects.create_user(
+            'other@londonapp.com',
+            'password123'
+        )
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'], [])
+
+
+class CacheStatsTests(TestCase):
+    """
+    test the hit and miss counts shared by the workers
+    """
+
+    def setUp(self):
+        cache.reset_stats()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'stats@londonapp.com', 'password123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_stats_command(self):
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+        out = StringIO()
+
+        call_command('recipe_cache_stats', '--reset', stdout=out)
+
+        self.assertIn('hits: 2  misses: 1  hit ratio: 66.7%', out.getvalue())
+        self.assertEqual(cache.stats(), {'hits': 0, 'misses': 0})
+
+    def test_unavailable_cache_not_counted(self):
+        """
+        test lists are still served when the counts can't be written
+        """
+        with patch.object(django_cache, 'incr', side_effect=ValueError), \
+                patch.object(django_cache, 'add', return_value=False):
+            res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, 200)
+            res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, 200)
+
+        self.assertEqual(cache.stats(), {'hits': 0, 'misses': 0})
+
+    def test_process_local_cache_warned_on_deploy(self):
+        self.assertEqual(check_shared_cache(None)[0].id, 'recipe.W001')
+
+        shared = {'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': '127.0.0.1:11211',
+        }}
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_shared_cache(None), [])
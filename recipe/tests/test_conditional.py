@@ -0,0 +1,109 @@
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ConditionalGetTests(TestCase):
+    """
+    test unchanged resources answer conditional requests with 304
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonapp.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=5.00
+        )
+
+    def test_list_not_modified(self):
+        """
+        test a matching If-None-Match skips the query and serializer
+        """
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_detail_not_modified(self):
+        """
+        test the recipe detail honors If-None-Match
+        """
+        res = self.client.get(detail_url(self.recipe.id))
+        res = self.client.get(
+            detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=res['ETag']
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_write_changes_etag(self):
+        """
+        test a write makes the previous ETag stale
+        """
+        res = self.client.get(TAGS_URL)
+        etag = res['ETag']
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_etag_differs_per_query(self):
+        """
+        test different filters never share an ETag
+        """
+        res1 = self.client.get(TAGS_URL)
+        res2 = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertNotEqual(res1['ETag'], res2['ETag'])
+
+    def test_if_modified_since(self):
+        """
+        test If-Modified-Since is honored once the change has settled
+        """
+        later = time.time() + 5
+        with patch('time.time', return_value=later):
+            res = self.client.get(RECIPES_URL)
+            last_modified = res['Last-Modified']
+            res = self.client.get(
+                RECIPES_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        res = self.client.get(
+            RECIPES_URL, HTTP_IF_MODIFIED_SINCE=http_date(later - 3600)
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_relation_change_touches_recipe(self):
+        """
+        test adding a tag bumps the recipe modification time
+        """
+        updated_at = self.recipe.updated_at
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated_at, updated_at)
@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportApiTests(TestCase):
+    """
+    test streaming the recipe library
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonapp.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Kale')
+        self.recipes = []
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=5.00
+            )
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+            self.recipes.append(recipe)
+
+    def test_export_ndjson(self):
+        """
+        test every recipe is streamed as a JSON line
+        """
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [row['id'] for row in rows], [r.id for r in self.recipes]
+        )
+        self.assertEqual(rows[0]['price'], '5.00')
+        self.assertEqual(rows[0]['tags'][0]['name'], 'Vegan')
+        self.assertEqual(rows[0]['ingredients'][0]['name'], 'Kale')
+
+    def test_export_csv(self):
+        """
+        test exporting as CSV with relation names
+        """
+        res = self.client.get(EXPORT_URL, {'output': 'csv'})
+
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['tags'], 'Vegan')
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_queries_per_chunk(self):
+        """
+        test relations are fetched once per chunk, not once per recipe
+        """
+        res = self.client.get(EXPORT_URL)
+        # recipes, then tags and ingredients for each of the 3 chunks
+        with self.assertNumQueries(7):
+            lines = list(res.streaming_content)
+        self.assertEqual(len(lines), 5)
+
+    def test_export_invalid_output(self):
+        """
+        test unknown formats are rejected
+        """
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
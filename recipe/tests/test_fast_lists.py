@@ -0,0 +1,159 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe import fastpath
+from recipe.serializers import RecipeSerializer, TagSerializer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+# titles JSONRenderer escapes, or must not
+TITLES = (
+    'Crème brûlée', 'Line\u2028separator\u2029', 'Tab\tand "quotes" \\',
+    'Control \x00\x1f\x7f', 'Emoji \U0001f35c', '</script>',
+)
+
+
+class FastJSONRendererTests(TestCase):
+    """
+    test the fast renderer renders what JSONRenderer does
+    """
+
+    def assertSameBytes(self, data, **kwargs):
+        self.assertEqual(
+            fastpath.FastJSONRenderer().render(data, **kwargs),
+            JSONRenderer().render(data, **kwargs)
+        )
+
+    def test_plain_data(self):
+        self.assertSameBytes({
+            'results': [{'id': 1, 'title': title, 'tags': [1, 2]}
+                        for title in TITLES],
+            'next': None,
+            'empty': [],
+        })
+
+    def test_data_left_to_json_renderer(self):
+        """
+        test what orjson formats differently still renders the same
+        """
+        from datetime import datetime
+        from decimal import Decimal
+
+        self.assertSameBytes({'price': Decimal('1.50')})
+        self.assertSameBytes({'at': datetime(2020, 10, 1, 12, 30, 0, 1234)})
+        self.assertSameBytes({'id': 1}, renderer_context={'indent': 4})
+        self.assertSameBytes(
+            {'id': 1}, accepted_media_type='application/json; indent=2'
+        )
+        self.assertEqual(fastpath.FastJSONRenderer().render(None), b'')
+
+    def test_without_orjson(self):
+        orjson = fastpath.orjson
+        fastpath.orjson = None
+        try:
+            self.assertSameBytes({'title': TITLES[1]})
+        finally:
+            fastpath.orjson = orjson
+
+
+class FastListTests(TestCase):
+    """
+    test list pages built from rows match the serializers byte for byte
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'fast@londonapp.com', 'password123'
+        )
+        self.client.force_authenticate(self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=title) for title in TITLES
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'ingredient {i}')
+            for i in range(4)
+        ]
+        for i, title in enumerate(TITLES * 3):
+            recipe = Recipe.objects.create(
+                user=self.user, title=title, time_minutes=i,
+                price='%d.%02d' % (i, i), link='' if i % 2 else f'/r/{i}'
+            )
+            # added in reverse so insertion order is not id order
+            recipe.tags.add(*reversed(tags[:i % 4]))
+            recipe.ingredients.add(*reversed(ingredients[:i % 4]))
+
+    def get_pages(self, url, params, fast):
+        """
+        return the bytes of every page of the list
+        """
+        pages = []
+        with override_settings(RECIPE_API_FAST_LISTS=fast):
+            cache.clear()
+            res = self.client.get(url, {'page_size': 2, **params})
+            while True:
+                self.assertEqual(res.status_code, 200, res.content)
+                pages.append(res.content)
+                if not res.data['next']:
+                    return pages
+                res = self.client.get(res.data['next'])
+
+    def assertSameLists(self, url, params=None):
+        params = params or {}
+        expected = self.get_pages(url, params, fast=False)
+        self.assertGreater(len(expected), 1)
+        self.assertEqual(self.get_pages(url, params, fast=True), expected)
+
+    def test_serializer_bytes(self):
+        queryset = Recipe.objects.order_by('-id')
+        expected = JSONRenderer().render(
+            RecipeSerializer(queryset, many=True).data
+        )
+        plan = fastpath.get_plan(RecipeSerializer, Recipe)
+
+        rows = fastpath.build_rows(plan, list(queryset.values(
+            'pk', 'id', 'title', 'time_minutes', 'price', 'link'
+        )))
+
+        # without a prefetch the relations are read in id order too
+        self.assertEqual(fastpath.FastJSONRenderer().render(rows), expected)
+
+    def test_recipe_lists(self):
+        self.assertSameLists(RECIPES_URL)
+
+    def test_filtered_and_searched_lists(self):
+        tag = Tag.objects.get(name=TITLES[0])
+        self.assertSameLists(RECIPES_URL, {'tags': tag.id})
+        self.assertSameLists(RECIPES_URL, {'q': 'control'})
+
+    def test_tag_and_ingredient_lists(self):
+        self.assertSameLists(TAGS_URL)
+        self.assertSameLists(TAGS_URL, {'sort': 'popular'})
+        self.assertSameLists(INGREDIENTS_URL, {'assigned_only': 1})
+
+    def test_queries(self):
+        """
+        test a page takes a query for the rows and one per relation
+        """
+        with self.assertNumQueries(3):
+            self.client.get(RECIPES_URL)
+
+    def test_instance_fields_take_serializer_path(self):
+        class TagOwnerSerializer(TagSerializer):
+            owner = serializers.CharField(source='user.email')
+
+            class Meta(TagSerializer.Meta):
+                fields = ('id', 'name', 'owner')
+
+        self.assertIsNone(fastpath.get_plan(TagOwnerSerializer, Tag))
+        self.assertIsNotNone(fastpath.get_plan(TagSerializer, Tag))
@@ -0,0 +1,146 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.serializers import RecipeDetailSerializer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class RecipeFieldsetApiTests(TestCase):
+    """
+    test `?fields=` and `?expand=` on recipe reads
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'fields@londonapp.com', 'password123'
+        )
+        self.client.force_authenticate(self.user)
+        self.tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Dessert')
+        ]
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Sugar'
+        )
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Cake {i}', time_minutes=30,
+                price=5, link='/cake'
+            )
+            recipe.tags.add(*reversed(self.tags[:i]))
+            recipe.ingredients.add(self.ingredient)
+        self.recipe = recipe
+
+    def test_list_fields(self):
+        res = self.client.get(RECIPES_URL, {'fields': 'title,id'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # the serializer's order, not the one asked for
+        self.assertEqual(
+            [list(recipe) for recipe in res.data['results']],
+            [['id', 'title']] * 3
+        )
+
+    def test_fields_skip_relation_queries(self):
+        """
+        test relations left out of the fields are not loaded, on either
+        list path
+        """
+        for fast in (True, False):
+            cache.clear()
+            with override_settings(RECIPE_API_FAST_LISTS=fast), \
+                    self.assertNumQueries(1):
+                self.client.get(RECIPES_URL, {'fields': 'id,title'})
+            with override_settings(RECIPE_API_FAST_LISTS=fast), \
+                    self.assertNumQueries(2):
+                self.client.get(RECIPES_URL, {'fields': 'id,tags'})
+
+    def test_expand_list(self):
+        res = self.client.get(RECIPES_URL, {'expand': 'tags,ingredients'})
+
+        recipe = res.data['results'][0]
+        self.assertEqual(
+            list(recipe), list(RecipeDetailSerializer().fields)
+        )
+        # in id order, not the order they were added in
+        self.assertEqual(
+            recipe['tags'],
+            [{'id': tag.id, 'name': tag.name} for tag in self.tags]
+        )
+        self.assertEqual(
+            recipe['ingredients'],
+            [{'id': self.ingredient.id, 'name': 'Sugar'}]
+        )
+
+    def test_expand_same_bytes_on_both_paths(self):
+        for params in (
+            {'expand': 'tags'},
+            {'expand': 'ingredients,tags', 'fields': 'title,tags'},
+            {'fields': 'price,ingredients'},
+        ):
+            pages = []
+            for fast in (True, False):
+                cache.clear()
+                with override_settings(RECIPE_API_FAST_LISTS=fast):
+                    pages.append(self.client.get(RECIPES_URL, params).content)
+            self.assertEqual(pages[0], pages[1], params)
+
+    def test_expand_only_requested_fields(self):
+        res = self.client.get(
+            RECIPES_URL, {'fields': 'id,title', 'expand': 'tags'}
+        )
+
+        self.assertNotIn('tags', res.data['results'][0])
+
+    def test_detail_fields(self):
+        url = detail_url(self.recipe.id)
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, {'fields': 'title,tags'})
+
+        self.assertEqual(res.data, {
+            'title': 'Cake 2',
+            'tags': [{'id': tag.id, 'name': tag.name} for tag in self.tags],
+        })
+        recipe_sql = queries.captured_queries[0]['sql']
+        self.assertNotIn('"link"', recipe_sql)
+        self.assertNotIn('"price"', recipe_sql)
+        self.assertEqual(len(queries), 2)
+
+    def test_lists_cached_per_fieldset(self):
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL, {'fields': 'title'})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(list(res.data['results'][0]), ['title'])
+
+    def test_unknown_names_rejected(self):
+        res = self.client.get(RECIPES_URL, {'fields': 'title,owner'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', res.data)
+
+        res = self.client.get(
+            detail_url(self.recipe.id), {'expand': 'image'}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('expand', res.data)
+
+    def test_authentication_checked_first(self):
+        res = APIClient().get(RECIPES_URL, {'fields': 'owner'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,182 @@
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+IMPORT_URL = reverse('recipe:recipe-import')
+
+
+class RecipeImportApiTests(TestCase):
+    """
+    test importing recipes in bulk
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonapp.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Kale'
+        )
+
+    def test_import_recipes(self):
+        """
+        test recipes and their relations are created
+        """
+        payload = [
+            {
+                'title': 'Kale salad',
+                'time_minutes': 10,
+                'price': '4.50',
+                'tags': [self.tag.id],
+                'ingredients': [self.ingredient.id],
+            },
+            {
+                'title': 'Toast',
+                'time_minutes': 2,
+                'price': '1.00',
+                'link': 'https://example.com/toast',
+            },
+        ]
+        res = self.client.post(IMPORT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['ids']), 2)
+        salad = Recipe.objects.get(id=res.data['ids'][0])
+        toast = Recipe.objects.get(id=res.data['ids'][1])
+        self.assertEqual(salad.title, 'Kale salad')
+        self.assertEqual(salad.price, Decimal('4.50'))
+        self.assertEqual(list(salad.tags.all()), [self.tag])
+        self.assertEqual(list(salad.ingredients.all()), [self.ingredient])
+        self.assertEqual(toast.link, payload[1]['link'])
+        self.assertFalse(toast.tags.exists())
+
+    def test_import_query_count_is_fixed(self):
+        """
+        test the number of queries does not grow with the batch
+        """
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [self.tag.id],
+                'ingredients': [self.ingredient.id],
+            }
+            for i in range(50)
+        ]
+        # tag ids, ingredient ids, savepoint, recipes, last inserted id,
+        # tags through, ingredients through, search index (delete, tag
+        # names, ingredient names, titles, insert), tag and ingredient
+        # recipe counts, release
+        with self.assertNumQueries(15):
+            res = self.client.post(IMPORT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.tags.through.objects.count(), 50)
+        self.assertEqual(
+            sorted(res.data['ids']),
+            list(Recipe.objects.order_by('id').values_list('id', flat=True))
+        )
+
+    @override_settings(RECIPE_API_BULK_BATCH_SIZE=2)
+    def test_import_ids_across_batches(self):
+        """
+        test every returned id is the recipe imported at its position
+        """
+        Recipe.objects.create(
+            user=self.user, title='Existing', time_minutes=1, price='1.00'
+        )
+        payload = [
+            {'title': f'Recipe {i}', 'time_minutes': i, 'price': '5.00'}
+            for i in range(5)
+        ]
+        res = self.client.post(IMPORT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        titles = Recipe.objects.in_bulk(res.data['ids'])
+        self.assertEqual(
+            [titles[pk].title for pk in res.data['ids']],
+            [item['title'] for item in payload]
+        )
+
+    def test_import_ids_without_last_insert_rowid(self):
+        """
+        test ids are found by their values on backends other than SQLite
+        """
+        Recipe.objects.create(
+            user=self.user, title='Toast', time_minutes=2, price='1.00'
+        )
+        payload = [
+            {
+                'title': 'Toast',
+                'time_minutes': 2,
+                'price': '1.00',
+                'tags': [self.tag.id],
+            },
+            {'title': 'Kale salad', 'time_minutes': 10, 'price': '4.50'},
+            {'title': 'Toast', 'time_minutes': 2, 'price': '1.00'},
+        ]
+        backend = SimpleNamespace(vendor='mysql', features=connection.features)
+        with patch('recipe.views.connection', backend):
+            res = self.client.post(IMPORT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipes = Recipe.objects.in_bulk(res.data['ids'])
+        self.assertEqual(len(recipes), 3)
+        self.assertEqual(
+            [recipes[pk].title for pk in res.data['ids']],
+            [item['title'] for item in payload]
+        )
+        self.assertEqual(
+            list(recipes[res.data['ids'][0]].tags.all()), [self.tag]
+        )
+        self.assertFalse(recipes[res.data['ids'][2]].tags.exists())
+
+    def test_import_unknown_relation(self):
+        """
+        test ids of other users' tags are rejected per item
+        """
+        user2 = get_user_model().objects.create_user(
+            'other@londonapp.com',
+            'password123'
+        )
+        other_tag = Tag.objects.create(user=user2, name='Fruit')
+        payload = [
+            {'title': 'Ok', 'time_minutes': 1, 'price': '1.00'},
+            {
+                'title': 'Bad',
+                'time_minutes': 1,
+                'price': '1.00',
+                'tags': [other_tag.id],
+            },
+        ]
+        res = self.client.post(IMPORT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('tags', res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_import_invalid_fields(self):
+        """
+        test field validation errors are reported per item
+        """
+        payload = [{'title': 'No time', 'price': '1.00'}]
+        res = self.client.post(IMPORT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('time_minutes', res.data[0])
@@ -47,7 +47,7 @@ class PrivateIngredientsApiTest(TestCase):
         serializer = IngredientSerializer(ingredients,many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredient_to_user(self):
         """
@@ -62,8 +62,8 @@ class PrivateIngredientsApiTest(TestCase):
         res = self.client.get(INGREDIENT_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data),1)
-        self.assertEqual(res.data[0]['name'],ingredient.name)
+        self.assertEqual(len(res.data['results']),1)
+        self.assertEqual(res.data['results'][0]['name'],ingredient.name)
 
     def test_create_ingredient_success(self):
         """
@@ -109,8 +109,8 @@ class PrivateIngredientsApiTest(TestCase):
         })
         serializer1 = IngredientSerializer(ingredient1)
         serializer2 = IngredientSerializer(ingredient2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrive_uniqe_items(self):
         """
@@ -141,4 +141,4 @@ class PrivateIngredientsApiTest(TestCase):
         res = self.client.get(INGREDIENT_URL, {
             'assigned_only':1
         })
-        self.assertEqual(len(res.data),1)
\ No newline at end of file
+        self.assertEqual(len(res.data['results']),1)
\ No newline at end of file
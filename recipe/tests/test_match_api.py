@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe
+
+
+MATCH_URL = reverse('recipe:recipe-match')
+
+
+class RecipeMatchApiTests(TestCase):
+    """
+    test ranking recipes by the ingredients on hand
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonapp.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+        self.egg, self.flour, self.milk, self.salt = (
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Egg', 'Flour', 'Milk', 'Salt')
+        )
+
+    def sample_recipe(self, title, *ingredients, user=None):
+        recipe = Recipe.objects.create(
+            user=user or self.user, title=title, time_minutes=10, price=5.00
+        )
+        recipe.ingredients.add(*ingredients)
+        return recipe
+
+    def match(self, *ingredients, **params):
+        ids = ','.join(str(ingredient.id) for ingredient in ingredients)
+        return self.client.get(MATCH_URL, {'ingredients': ids, **params})
+
+    def test_ranked_by_coverage(self):
+        """
+        test fully covered recipes come first with what is missing listed
+        """
+        pancakes = self.sample_recipe(
+            'Pancakes', self.egg, self.flour, self.milk
+        )
+        omelette = self.sample_recipe('Omelette', self.egg, self.salt)
+        boiled = self.sample_recipe('Boiled egg', self.egg)
+        self.sample_recipe('Salted milk', self.milk, self.salt)
+
+        res = self.match(self.egg, self.flour)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {
+                'id': boiled.id, 'title': 'Boiled egg', 'coverage': 1.0,
+                'missing': [],
+            },
+            {
+                'id': pancakes.id, 'title': 'Pancakes',
+                'coverage': 2 / 3,
+                'missing': [{'id': self.milk.id, 'name': 'Milk'}],
+            },
+            {
+                'id': omelette.id, 'title': 'Omelette', 'coverage': 0.5,
+                'missing': [{'id': self.salt.id, 'name': 'Salt'}],
+            },
+        ])
+
+    def test_limit(self):
+        """
+        test only the top recipes are returned
+        """
+        for i in range(3):
+            self.sample_recipe(f'Egg {i}', self.egg)
+
+        res = self.match(self.egg, limit=2)
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_query_count_is_fixed(self):
+        """
+        test the ranking, titles and missing ingredients take one query each
+        """
+        for i in range(10):
+            self.sample_recipe(f'Recipe {i}', self.egg, self.milk)
+
+        with self.assertNumQueries(3):
+            self.match(self.egg)
+
+    def test_other_users_recipes_excluded(self):
+        """
+        test recipes of other users are never matched
+        """
+        other = get_user_model().objects.create_user(
+            'other@londonapp.com',
+            'password123'
+        )
+        self.sample_recipe('Not mine', self.egg, user=other)
+
+        res = self.match(self.egg)
+
+        self.assertEqual(res.data, [])
+
+    def test_invalid_params(self):
+        """
+        test ingredient ids are required and must be ints
+        """
+        res = self.client.get(MATCH_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(MATCH_URL, {'ingredients': '1,x'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
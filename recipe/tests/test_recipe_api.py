@@ -1,7 +1,7 @@
 from os import name
 from django.contrib.auth import get_user_model
 from django.contrib.auth.signals import user_logged_in
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.test import client
 from django.urls import reverse
 from rest_framework import status
@@ -12,6 +12,7 @@ from core.models import Recipe, Tag, Ingredient
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 import tempfile
 import os
+import shutil
 
 from PIL import Image
 
@@ -101,10 +102,10 @@ class PrivateRecipeApiTest(TestCase):
         sample_recipe(user = self.user)
         sample_recipe(user = self.user)
         res = self.client.get(RECIPES_URL)
-        recipes = Recipe.objects.all()
+        recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_limited_to_user(self):
         """
@@ -121,8 +122,8 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipies, many= True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         """
@@ -256,9 +257,9 @@ class PrivateRecipeApiTest(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """Test returning recipes with specific ingredients"""
@@ -278,9 +279,9 @@ class PrivateRecipeApiTest(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_distinct(self):
         """
@@ -296,7 +297,126 @@ class PrivateRecipeApiTest(TestCase):
             {'tags': '{},{}'.format(tag1.id, tag2.id)}
         )
         serializer = RecipeSerializer(recipe)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_recipes_by_all_tags(self):
+        """
+        test tags_mode=all only returns recipes having every tag
+        """
+        recipe1 = sample_recipe(user=self.user, title='Vegan curry')
+        recipe2 = sample_recipe(user=self.user, title='Vegan salad')
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Spicy')
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag1)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': f'{tag1.id},{tag2.id}', 'tags_mode': 'all'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0], RecipeSerializer(recipe1).data)
+
+    def test_filter_recipes_by_all_ingredients(self):
+        """
+        test ingredients_mode=all only returns recipes having every ingredient
+        """
+        recipe1 = sample_recipe(user=self.user, title='Cinnamon buns')
+        recipe2 = sample_recipe(user=self.user, title='Plain buns')
+        ingredient1 = sample_ingredient(user=self.user, name='Flour')
+        ingredient2 = sample_ingredient(user=self.user, name='Cinnamon')
+        recipe1.ingredients.add(ingredient1, ingredient2)
+        recipe2.ingredients.add(ingredient1)
+
+        res = self.client.get(RECIPES_URL, {
+            'ingredients': f'{ingredient1.id},{ingredient2.id}',
+            'ingredients_mode': 'all',
+        })
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['id'], recipe1.id)
+
+    def test_filter_recipes_invalid_params(self):
+        """
+        test malformed filter params are rejected
+        """
+        res = self.client.get(RECIPES_URL, {'tags': '1,abc'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPES_URL, {'tags': '1', 'tags_mode': 'some'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_recipes_paginated(self):
+        """
+        test recipes are paged newest first with opaque cursors
+        """
+        recipes = [
+            sample_recipe(user=self.user, title=f'Recipe {i}') for i in range(5)
+        ]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['previous'])
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [recipes[4].id, recipes[3].id]
+        )
+
+        seen = []
+        url = RECIPES_URL + '?page_size=2'
+        while url:
+            res = self.client.get(url)
+            seen.extend(recipe['id'] for recipe in res.data['results'])
+            url = res.data['next']
+        self.assertEqual(seen, [recipe.id for recipe in reversed(recipes)])
+
+    @override_settings(RECIPE_API_PAGE_SIZE=2, RECIPE_API_MAX_PAGE_SIZE=3)
+    def test_list_recipes_page_size_capped(self):
+        """
+        test the page size defaults from settings and is capped
+        """
+        for i in range(5):
+            sample_recipe(user=self.user, title=f'Recipe {i}')
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data['results']), 2)
+
+        res = self.client.get(RECIPES_URL, {'page_size': 100})
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_list_recipes_query_count(self):
+        """
+        test listing recipes runs a fixed number of queries
+        """
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+        for i in range(10):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+        # recipes, tags and ingredients, regardless of the recipe count
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 10)
+
+    def test_view_recipe_detail_query_count(self):
+        """
+        test the recipe detail prefetches its tags and ingredients
+        """
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+        recipe.tags.add(sample_tag(user=self.user, name='Vegan'))
+        recipe.ingredients.add(sample_ingredient(user=self.user))
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 2)
 
 
 class RecipeImageUploadTests(TestCase):
@@ -304,6 +424,15 @@ class RecipeImageUploadTests(TestCase):
     docstring
     """
     def setUp(self):
+        # keep images and staged uploads out of the checkout
+        self.media_root = tempfile.mkdtemp()
+        self.staging_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            RECIPE_IMAGE_STAGING_DIR=self.staging_dir,
+            RECIPE_IMAGE_QUEUE='recipe.images.InlineImageQueue'
+        )
+        self.settings_override.enable()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             'user@testlondongmaiasf.com',
@@ -314,7 +443,13 @@ class RecipeImageUploadTests(TestCase):
 
     def tearDown(self):
         # make sure the image is removed after running the test
+        self.recipe.refresh_from_db()
+        for rendition in self.recipe.renditions.all():
+            rendition.file.delete()
         self.recipe.image.delete()
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+        shutil.rmtree(self.staging_dir)
 
     def test_upload_image(self):
         """
@@ -329,10 +464,42 @@ class RecipeImageUploadTests(TestCase):
             res = self.client.post(url, {'image': ntf}, format='multipart')
 
         self.recipe.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn('image', res.data)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['status'], 'processing')
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+        res = self.client.get(url)
+        self.assertIn('image', res.data)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_READY)
+        self.assertEqual(len(res.data['renditions']), 2)
+
+    def test_upload_image_renditions(self):
+        """
+        test renditions are resized and carry no EXIF data
+        """
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img = Image.new('RGB', (800, 400))
+            exif = Image.Exif()
+            exif[0x010f] = 'Camera maker'
+            img.save(ntf, format='JPEG', exif=exif.tobytes())
+            ntf.seek(0)
+            self.client.post(url, {'image': ntf}, format='multipart')
+
+        renditions = self.recipe.renditions.order_by('width', 'format')
+        self.assertEqual(
+            [(r.width, r.height, r.format) for r in renditions],
+            [
+                (320, 160, 'jpeg'), (320, 160, 'webp'),
+                (640, 320, 'jpeg'), (640, 320, 'webp'),
+                (800, 400, 'jpeg'), (800, 400, 'webp'),
+            ]
+        )
+        self.recipe.refresh_from_db()
+        for path in [self.recipe.image.path] + [r.file.path for r in renditions]:
+            with Image.open(path) as stored:
+                self.assertFalse(stored.getexif())
+
     def test_upload_image_bad_request(self):
         """
         test uploading a invalid image
@@ -340,5 +507,3 @@ class RecipeImageUploadTests(TestCase):
         url = image_upload_url(self.recipe.id)
         res = self.client.post(url, {'image':'string instead'}, format='multipart')
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
-
-
@@ -0,0 +1,166 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe import search as search_index
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+IMPORT_URL = reverse('recipe:recipe-import')
+
+
+def search(client, query, **params):
+    res = client.get(RECIPES_URL, {'q': query, **params})
+    return [recipe['title'] for recipe in res.data['results']]
+
+
+class RecipeSearchApiTests(TestCase):
+    """
+    test full text search of recipes
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonapp.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+        self.curry = Recipe.objects.create(
+            user=self.user, title='Thai green curry', time_minutes=30,
+            price=8.00
+        )
+        self.soup = Recipe.objects.create(
+            user=self.user, title='Pumpkin soup', time_minutes=20,
+            price=4.00
+        )
+
+    def test_search_title_prefix(self):
+        """
+        test every word of the query matches a word prefix
+        """
+        self.assertEqual(search(self.client, 'cur'), ['Thai green curry'])
+        self.assertEqual(search(self.client, 'green CURRY'), ['Thai green curry'])
+        self.assertEqual(search(self.client, 'green soup'), [])
+
+    def test_search_relation_names(self):
+        """
+        test tags and ingredients are searched, and follow their changes
+        """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Squash')
+        self.soup.tags.add(tag)
+        ingredient.recipe_set.add(self.soup)
+        self.assertEqual(search(self.client, 'vegan'), ['Pumpkin soup'])
+        self.assertEqual(search(self.client, 'squash'), ['Pumpkin soup'])
+
+        tag.name = 'Plant based'
+        tag.save()
+        self.assertEqual(search(self.client, 'vegan'), [])
+        self.assertEqual(search(self.client, 'plant'), ['Pumpkin soup'])
+
+        ingredient.delete()
+        self.assertEqual(search(self.client, 'squash'), [])
+
+    def test_search_ranked(self):
+        """
+        test title matches rank above relation matches
+        """
+        tag = Tag.objects.create(user=self.user, name='Soup')
+        self.curry.tags.add(tag)
+
+        self.assertEqual(
+            search(self.client, 'soup'), ['Pumpkin soup', 'Thai green curry']
+        )
+
+    def test_search_paginated(self):
+        """
+        test cursors page through ranked results
+        """
+        for i in range(5):
+            Recipe.objects.create(
+                user=self.user, title=f'Curry {i}', time_minutes=10,
+                price=5.00
+            )
+        titles = []
+        res = self.client.get(RECIPES_URL, {'q': 'curry', 'page_size': 2})
+        while True:
+            titles += [recipe['title'] for recipe in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(len(titles), 6)
+        self.assertEqual(len(set(titles)), 6)
+
+    def test_search_limited_to_user(self):
+        """
+        test other users' recipes are not found
+        """
+        other = get_user_model().objects.create_user(
+            'other@londonapp.com',
+            'password123'
+        )
+        Recipe.objects.create(
+            user=other, title='Red curry', time_minutes=30, price=8.00
+        )
+
+        self.assertEqual(search(self.client, 'curry'), ['Thai green curry'])
+
+    def test_search_removed_recipe(self):
+        """
+        test deleted recipes leave the index
+        """
+        self.curry.delete()
+
+        self.assertEqual(search(self.client, 'curry'), [])
+
+    def test_search_syntax_is_literal(self):
+        """
+        test search operators in the query are not interpreted
+        """
+        self.assertEqual(search(self.client, 'curry OR "soup'), [])
+        self.assertEqual(search(self.client, '*'), [])
+
+    def test_imported_recipes_indexed(self):
+        """
+        test recipes created by an import are searchable
+        """
+        self.client.post(IMPORT_URL, [
+            {'title': 'Lentil dal', 'time_minutes': 40, 'price': '3.00'}
+        ], format='json')
+
+        self.assertEqual(search(self.client, 'lentil'), ['Lentil dal'])
+
+    def test_rebuild_command(self):
+        """
+        test the index can be rebuilt from the recipe tables
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM recipe_search')
+
+        call_command('rebuild_recipe_search', stdout=StringIO())
+
+        self.assertEqual(search(self.client, 'curry'), ['Thai green curry'])
+        self.assertEqual(search(self.client, 'soup'), ['Pumpkin soup'])
+
+    def test_unsupported_database(self):
+        """
+        test recipes are saved and searched by title without an index on
+        databases the search migration skips
+        """
+        with patch.object(search_index, 'BACKENDS', {}):
+            Recipe.objects.create(
+                user=self.user, title='Green salad', time_minutes=5,
+                price=4.00
+            )
+            self.curry.delete()
+
+            self.assertEqual(search(self.client, 'GREEN'), ['Green salad'])
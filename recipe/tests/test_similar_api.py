@@ -0,0 +1,141 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe import similarity
+
+
+def similar_url(recipe_id):
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+class SimilarRecipesApiTests(TestCase):
+    """
+    test finding recipes with similar tags and ingredients
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            RECIPE_SIMILARITY_DIR=self.directory
+        )
+        self.settings_override.enable()
+        similarity.similarity_indexes.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonapp.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.rice, self.tofu, self.kale = (
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Rice', 'Tofu', 'Kale')
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.directory)
+
+    def sample_recipe(self, title, tags=(), ingredients=()):
+        recipe = Recipe.objects.create(
+            user=self.user, title=title, time_minutes=10, price=5.00
+        )
+        recipe.tags.add(*tags)
+        recipe.ingredients.add(*ingredients)
+        return recipe
+
+    def test_ranked_by_similarity(self):
+        """
+        test recipes sharing more come first and unrelated ones are left out
+        """
+        bowl = self.sample_recipe(
+            'Tofu bowl', [self.vegan], [self.rice, self.tofu]
+        )
+        stir_fry = self.sample_recipe(
+            'Tofu stir fry', [self.vegan], [self.rice, self.tofu, self.kale]
+        )
+        rice = self.sample_recipe('Plain rice', [], [self.rice])
+        self.sample_recipe('Kale chips', [], [self.kale])
+
+        res = self.client.get(similar_url(bowl.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data], [stir_fry.id, rice.id]
+        )
+        self.assertAlmostEqual(res.data[0]['score'], 3 / (3 * 4) ** 0.5)
+
+        res = self.client.get(similar_url(bowl.id), {'metric': 'jaccard'})
+        self.assertAlmostEqual(res.data[0]['score'], 3 / 4)
+        self.assertAlmostEqual(res.data[1]['score'], 1 / 3)
+
+    def test_follows_relation_changes(self):
+        """
+        test the index picks up added, changed and deleted recipes
+        """
+        bowl = self.sample_recipe('Tofu bowl', [], [self.tofu])
+        self.client.get(similar_url(bowl.id))
+
+        salad = self.sample_recipe('Tofu salad', [], [self.tofu])
+        res = self.client.get(similar_url(bowl.id))
+        self.assertEqual([recipe['id'] for recipe in res.data], [salad.id])
+
+        salad.ingredients.remove(self.tofu)
+        res = self.client.get(similar_url(bowl.id))
+        self.assertEqual(res.data, [])
+
+        salad.ingredients.add(self.tofu)
+        salad.delete()
+        res = self.client.get(similar_url(bowl.id))
+        self.assertEqual(res.data, [])
+
+    def test_index_persisted(self):
+        """
+        test another worker loads the index from disk instead of building it
+        """
+        bowl = self.sample_recipe('Tofu bowl', [], [self.tofu])
+        salad = self.sample_recipe('Tofu salad', [], [self.tofu])
+        self.client.get(similar_url(bowl.id))
+        self.assertTrue(
+            os.path.exists(similarity.index_path(self.user.id))
+        )
+        similarity.similarity_indexes.clear()
+
+        # the recipe lookup and the titles, no index queries
+        with self.assertNumQueries(2):
+            res = self.client.get(similar_url(bowl.id))
+        self.assertEqual([recipe['id'] for recipe in res.data], [salad.id])
+
+    def test_other_users_recipe(self):
+        """
+        test recipes of other users are not found
+        """
+        other = get_user_model().objects.create_user(
+            'other@londonapp.com',
+            'password123'
+        )
+        recipe = Recipe.objects.create(
+            user=other, title='Not mine', time_minutes=10, price=5.00
+        )
+
+        res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_metric(self):
+        """
+        test only the known metrics are accepted
+        """
+        recipe = self.sample_recipe('Tofu bowl')
+
+        res = self.client.get(similar_url(recipe.id), {'metric': 'l2'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
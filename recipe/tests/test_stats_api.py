@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+STATS_URL = reverse('recipe:stats')
+
+
+class RecipeStatsApiTests(TestCase):
+    """
+    test the recipe library statistics
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonapp.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def sample_recipe(self, user=None, **params):
+        defaults = {'title': 'Sample', 'time_minutes': 10, 'price': 5.00}
+        defaults.update(params)
+        return Recipe.objects.create(user=user or self.user, **defaults)
+
+    def test_auth_required(self):
+        """
+        test the statistics are private
+        """
+        res = APIClient().get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stats(self):
+        """
+        test the aggregates and usage counts of the user's recipes
+        """
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        dessert = Tag.objects.create(user=self.user, name='Dessert')
+        kale = Ingredient.objects.create(user=self.user, name='Kale')
+        first = self.sample_recipe(time_minutes=10, price='4.00')
+        second = self.sample_recipe(time_minutes=30, price='7.50')
+        first.tags.add(vegan)
+        second.tags.add(vegan)
+        first.ingredients.add(kale)
+        other = get_user_model().objects.create_user(
+            'other@londonapp.com',
+            'password123'
+        )
+        self.sample_recipe(user=other, time_minutes=500, price='99.00')
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipes'], 2)
+        self.assertEqual(res.data['time_minutes_avg'], 20.0)
+        self.assertEqual(res.data['time_minutes_min'], 10)
+        self.assertEqual(res.data['time_minutes_max'], 30)
+        self.assertEqual(res.data['price_avg'], '5.75')
+        self.assertEqual(res.data['price_min'], '4.00')
+        self.assertEqual(res.data['price_max'], '7.50')
+        self.assertEqual(res.data['tags'], [
+            {'id': vegan.id, 'name': 'Vegan', 'recipes': 2},
+            {'id': dessert.id, 'name': 'Dessert', 'recipes': 0},
+        ])
+        self.assertEqual(res.data['ingredients'], [
+            {'id': kale.id, 'name': 'Kale', 'recipes': 1},
+        ])
+
+    def test_stats_empty_library(self):
+        """
+        test a user without recipes gets empty aggregates
+        """
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipes'], 0)
+        self.assertIsNone(res.data['price_avg'])
+        self.assertEqual(res.data['tags'], [])
+
+    def test_stats_cached_until_write(self):
+        """
+        test repeated requests are served from the cache until a write
+        """
+        self.sample_recipe()
+        with self.assertNumQueries(3):
+            self.client.get(STATS_URL)
+        with self.assertNumQueries(0):
+            res = self.client.get(STATS_URL)
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+        self.sample_recipe()
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['recipes'], 2)
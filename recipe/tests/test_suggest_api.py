@@ -0,0 +1,128 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.suggest import PrefixIndex
+
+
+INGREDIENTS_SUGGEST_URL = reverse('recipe:ingredient-suggest')
+TAGS_SUGGEST_URL = reverse('recipe:tag-suggest')
+
+
+class PrefixIndexTests(TestCase):
+    """
+    test prefix lookups on the sorted names
+    """
+
+    def test_lookup(self):
+        """
+        test matches are case insensitive and ordered by usage, then name
+        """
+        index = PrefixIndex([
+            (1, 'Salt', 1),
+            (2, 'salmon', 5),
+            (3, 'Sage', 5),
+            (4, 'Sugar', 9),
+            (5, 'Pepper', 20),
+        ])
+
+        self.assertEqual(index.lookup('sa', 10), [
+            (3, 'Sage'), (2, 'salmon'), (1, 'Salt')
+        ])
+        self.assertEqual(index.lookup('S', 2), [(4, 'Sugar'), (3, 'Sage')])
+        self.assertEqual(index.lookup('salt', 10), [(1, 'Salt')])
+        self.assertEqual(index.lookup('x', 10), [])
+
+
+class SuggestApiTests(TestCase):
+    """
+    test the name suggestion endpoints
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonapp.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_suggest_by_usage(self):
+        """
+        test ingredients used by more recipes come first
+        """
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        sage = Ingredient.objects.create(user=self.user, name='Sage')
+        Ingredient.objects.create(user=self.user, name='Pepper')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=1.00
+        )
+        recipe.ingredients.add(salt)
+
+        res = self.client.get(INGREDIENTS_SUGGEST_URL, {'prefix': 'sa'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'id': salt.id, 'name': 'Salt'},
+            {'id': sage.id, 'name': 'Sage'},
+        ])
+
+    def test_suggest_sees_new_names(self):
+        """
+        test the index follows creates
+        """
+        self.client.get(TAGS_SUGGEST_URL, {'prefix': 've'})
+        self.client.post(reverse('recipe:tag-list'), {'name': 'Vegan'})
+
+        res = self.client.get(TAGS_SUGGEST_URL, {'prefix': 've'})
+
+        self.assertEqual([tag['name'] for tag in res.data], ['Vegan'])
+
+    def test_suggest_cached(self):
+        """
+        test repeated lookups don't query the database for the names
+        """
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_SUGGEST_URL, {'prefix': 'v'})
+
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_SUGGEST_URL, {'prefix': 've'})
+        self.assertEqual(len(res.data), 1)
+
+    def test_suggest_limited_to_user(self):
+        """
+        test other users' names are not suggested
+        """
+        other = get_user_model().objects.create_user(
+            'other@londonapp.com',
+            'password123'
+        )
+        Tag.objects.create(user=other, name='Vegan')
+
+        res = self.client.get(TAGS_SUGGEST_URL, {'prefix': 'v'})
+
+        self.assertEqual(res.data, [])
+
+    def test_suggest_limit(self):
+        """
+        test the number of suggestions is bounded
+        """
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        res = self.client.get(TAGS_SUGGEST_URL, {'prefix': 't', 'limit': 2})
+        self.assertEqual(len(res.data), 2)
+
+        res = self.client.get(TAGS_SUGGEST_URL, {'prefix': 't', 'limit': 'x'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_suggest_requires_prefix(self):
+        """
+        test a prefix must be given
+        """
+        res = self.client.get(TAGS_SUGGEST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
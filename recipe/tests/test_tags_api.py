@@ -1,4 +1,5 @@
 from os import name
+from base64 import b64encode
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
@@ -50,7 +51,7 @@ class PrivateTagsApiTests(TestCase):
         # pass true because we want to pass many tags
         serialazer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serialazer.data)
+        self.assertEqual(res.data['results'], serialazer.data)
 
     def test_tags_limited_to_user_(self):
         """
@@ -65,8 +66,8 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successful(self):
         """
@@ -102,8 +103,8 @@ class PrivateTagsApiTests(TestCase):
         res  = self.client.get(TAGS_URL, {'assigned_only':1})
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrive_tags_assigned_unique(self):
         """
@@ -127,5 +128,79 @@ class PrivateTagsApiTests(TestCase):
         recipe2.tags.add(tag)
 
         res  = self.client.get(TAGS_URL, {'assigned_only':1})
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
 
+    def test_sort_tags_by_popularity(self):
+        """
+        test sort=popular lists the most used tags first
+        """
+        rare = Tag.objects.create(user=self.user, name='Rare')
+        common = Tag.objects.create(user=self.user, name='Common')
+        unused = Tag.objects.create(user=self.user, name='Unused')
+        for i in range(2):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_minutes=5, price=1
+            )
+            recipe.tags.add(common)
+        recipe.tags.add(rare)
+
+        res = self.client.get(TAGS_URL, {'sort': 'popular'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [tag['id'] for tag in res.data['results']],
+            [common.id, rare.id, unused.id]
+        )
+
+    def test_page_through_popular_ties(self):
+        """
+        test paging the popular list in both directions sees every tag
+        once, many tags sharing a count
+        """
+        recipe = Recipe.objects.create(
+            user=self.user, title='Recipe', time_minutes=5, price=1
+        )
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(7)
+        ]
+        recipe.tags.add(*tags[::3])
+
+        seen = []
+        res = self.client.get(TAGS_URL, {'sort': 'popular', 'page_size': 2})
+        while True:
+            seen.extend(tag['id'] for tag in res.data['results'])
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+        self.assertEqual(seen, [
+            tag.id for tag in sorted(
+                tags, key=lambda tag: (tag in tags[::3], tag.name),
+                reverse=True
+            )
+        ])
+
+        backwards = []
+        while res.data['previous']:
+            res = self.client.get(res.data['previous'])
+            backwards[:0] = [tag['id'] for tag in res.data['results']]
+        self.assertEqual(backwards, seen[:len(backwards)])
+        self.assertEqual(len(backwards) + 1, len(seen))
+
+    def test_tampered_cursor(self):
+        """
+        test cursors that don't hold the sort key are rejected
+        """
+        for position in ('[1, "Vegan"]', '["many", "Vegan", 1]', '{}'):
+            cursor = b64encode(f'p={position}'.encode()).decode()
+            res = self.client.get(
+                TAGS_URL, {'sort': 'popular', 'cursor': cursor}
+            )
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_sort_tags_invalid(self):
+        """
+        test sorting by an unknown order is rejected
+        """
+        res = self.client.get(TAGS_URL, {'sort': 'recipe_count'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,160 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+
+from core.models import Recipe
+from recipe import views
+from recipe.thumbnails import ThumbnailCache
+
+
+def sample_image(size=(800, 600), format='JPEG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def thumbnail_url(recipe, width, fmt):
+    image_id = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    return reverse(
+        'recipe-image-thumbnail', args=[image_id, width, fmt]
+    )
+
+
+class ThumbnailViewTests(TestCase):
+    """
+    test recipe image thumbnails are rendered and cached
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.thumbnail_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            RECIPE_THUMBNAIL_DIR=self.thumbnail_dir
+        )
+        self.settings_override.enable()
+        user = get_user_model().objects.create_user(
+            'test@londonapp.com',
+            'password123'
+        )
+        self.recipe = Recipe.objects.create(
+            user=user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=5.00
+        )
+        self.recipe.image.save('photo.jpg', ContentFile(sample_image()))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+        shutil.rmtree(self.thumbnail_dir)
+
+    def test_thumbnail_rendered(self):
+        """
+        test a thumbnail is resized and cacheable forever
+        """
+        res = self.client.get(thumbnail_url(self.recipe, 320, 'webp'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'image/webp')
+        self.assertIn('immutable', res['Cache-Control'])
+        content = b''.join(res.streaming_content)
+        with Image.open(io.BytesIO(content)) as thumbnail:
+            self.assertEqual(thumbnail.size, (320, 240))
+
+    def test_thumbnail_cached_on_disk(self):
+        """
+        test repeated requests reuse the rendered file
+        """
+        url = thumbnail_url(self.recipe, 160, 'jpeg')
+        b''.join(self.client.get(url).streaming_content)
+        with self.assertNumQueries(0):
+            b''.join(self.client.get(url).streaming_content)
+        self.assertEqual(len(os.listdir(self.thumbnail_dir)), 1)
+
+    def test_unknown_width_or_format(self):
+        """
+        test only configured sizes and formats are rendered
+        """
+        res = self.client.get(thumbnail_url(self.recipe, 321, 'webp'))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        res = self.client.get(thumbnail_url(self.recipe, 320, 'gif'))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_image_looked_up_by_key(self):
+        """
+        test the image is found by an exact match on its indexed key
+        """
+        image_id = os.path.splitext(
+            os.path.basename(self.recipe.image.name)
+        )[0]
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).image_key, image_id
+        )
+
+        views._image_names.clear()
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(thumbnail_url(self.recipe, 160, 'webp'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('LIKE', queries[0]['sql'])
+
+    def test_unknown_image(self):
+        """
+        test ids without an image are not found
+        """
+        url = reverse(
+            'recipe-image-thumbnail',
+            args=['00000000-0000-0000-0000-000000000000', 320, 'webp']
+        )
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ThumbnailCacheTests(TestCase):
+    """
+    test the thumbnail cache stays within its budget
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.sources = []
+        for i in range(3):
+            path = os.path.join(self.directory, f'source{i}.png')
+            Image.effect_noise((200, 200), 64).save(path)
+            self.sources.append(path)
+        self.cache_dir = os.path.join(self.directory, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_least_recently_used_evicted(self):
+        """
+        test the least recently read thumbnail goes first
+        """
+        cache = ThumbnailCache(self.cache_dir, 10 ** 9)
+        first = cache.get(self.sources[0], 160, 'jpeg')
+        cache.max_bytes = os.path.getsize(first) * 2.5
+        second = cache.get(self.sources[1], 160, 'jpeg')
+        os.utime(first, ns=(0, 0))
+        os.utime(second, ns=(1, 1))
+        # reading the first makes the second the oldest
+        self.assertEqual(cache.get(self.sources[0], 160, 'jpeg'), first)
+        third = cache.get(self.sources[2], 160, 'jpeg')
+
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+        self.assertTrue(os.path.exists(third))
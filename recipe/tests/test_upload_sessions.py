@@ -0,0 +1,278 @@
+import io
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe.uploads import UploadSession
+
+
+def sessions_url(recipe_id):
+    return reverse('recipe:recipe-upload-sessions', args=[recipe_id])
+
+
+def session_url(recipe_id, upload_id):
+    return reverse('recipe:recipe-upload-session', args=[recipe_id, upload_id])
+
+
+def finalize_url(recipe_id, upload_id):
+    return reverse(
+        'recipe:recipe-upload-session-finalize', args=[recipe_id, upload_id]
+    )
+
+
+def image_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def sample_jpeg():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), 'blue').save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class ImageUploadSessionTests(TestCase):
+    """
+    test uploading a recipe image in resumable chunks
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.upload_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            RECIPE_IMAGE_UPLOAD_DIR=self.upload_dir,
+            RECIPE_IMAGE_QUEUE='recipe.images.InlineImageQueue'
+        )
+        self.settings_override.enable()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonapp.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=5.00
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+        shutil.rmtree(self.upload_dir)
+
+    def _start(self, size=None):
+        payload = {'name': 'photo.jpg'}
+        if size is not None:
+            payload['size'] = size
+        res = self.client.post(sessions_url(self.recipe.id), payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data['upload_id']
+
+    def _append(self, upload_id, chunk, offset):
+        return self.client.generic(
+            'PATCH',
+            session_url(self.recipe.id, upload_id),
+            data=chunk,
+            content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def test_chunked_upload(self):
+        """
+        test an image sent in chunks is attached to the recipe
+        """
+        content = sample_jpeg()
+        upload_id = self._start(size=len(content))
+        middle = len(content) // 2
+
+        res = self._append(upload_id, content[:middle], 0)
+        self.assertEqual(res.data['offset'], middle)
+        res = self.client.get(session_url(self.recipe.id, upload_id))
+        self.assertEqual(res.data['offset'], middle)
+        res = self._append(upload_id, content[middle:], middle)
+        self.assertEqual(res.data['offset'], len(content))
+
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.recipe.refresh_from_db()
+        with Image.open(self.recipe.image.path) as image:
+            self.assertEqual(image.size, (64, 48))
+        res = self.client.get(session_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_failed_processing(self):
+        """
+        test an image that can't be decoded is reported failed and its
+        staged file removed
+        """
+        content = io.BytesIO()
+        Image.new('RGB', (640, 480), 'blue').save(content, format='JPEG')
+        # the header parses, the pixels don't
+        content = content.getvalue()[:1000]
+        upload_id = self._start(size=len(content))
+        self._append(upload_id, content, 0)
+
+        with self.assertLogs('recipe.images', 'ERROR'):
+            res = self.client.post(finalize_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        res = self.client.get(image_url(self.recipe.id))
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_FAILED)
+        self.assertIsNone(res.data['image'])
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_offset_mismatch(self):
+        """
+        test a chunk at the wrong offset is rejected with the real one
+        """
+        upload_id = self._start()
+        self._append(upload_id, b'abc', 0)
+
+        res = self._append(upload_id, b'def', 0)
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data['offset'], 3)
+
+    def test_chunk_beyond_size(self):
+        """
+        test chunks can't grow the upload past its declared size
+        """
+        upload_id = self._start(size=4)
+        res = self._append(upload_id, b'abcdef', 0)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_IMAGE_MAX_UPLOAD_BYTES=10)
+    def test_size_limited(self):
+        """
+        test oversized uploads are refused up front
+        """
+        res = self.client.post(
+            sessions_url(self.recipe.id), {'name': 'a.jpg', 'size': 11}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_finalize_incomplete(self):
+        """
+        test an upload can't be finalized before all bytes arrived
+        """
+        upload_id = self._start(size=100)
+        self._append(upload_id, sample_jpeg()[:50], 0)
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_finalize_not_an_image(self):
+        """
+        test the image header is validated on finalize
+        """
+        upload_id = self._start()
+        self._append(upload_id, b'not an image', 0)
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_abort(self):
+        """
+        test aborting drops the session
+        """
+        upload_id = self._start()
+        res = self.client.delete(session_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        res = self.client.get(session_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def _lock(self, upload_id, pid=None, age=0):
+        """
+        leave a chunk lock on the upload as a worker would
+        """
+        session = UploadSession(self.recipe.id, upload_id)
+        with open(session.lock_path, 'w') as lock:
+            json.dump({
+                'host': socket.gethostname(), 'pid': pid or os.getpid(),
+                'at': time.time() - age, 'token': 'held',
+            }, lock)
+        return session
+
+    def test_locked_upload(self):
+        """
+        test chunks and aborts wait for the chunk being written
+        """
+        upload_id = self._start()
+        session = self._lock(upload_id)
+
+        res = self._append(upload_id, b'abc', 0)
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        res = self.client.delete(session_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertTrue(session.exists())
+
+    def test_stale_lock_broken(self):
+        """
+        test a lock left by a dead or stuck worker doesn't block the upload
+        """
+        finished = subprocess.Popen([sys.executable, '-c', ''])
+        finished.wait()
+        upload_id = self._start()
+
+        self._lock(upload_id, pid=finished.pid)
+        res = self._append(upload_id, b'abc', 0)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self._lock(
+            upload_id, age=settings.RECIPE_IMAGE_UPLOAD_LOCK_TIMEOUT + 1
+        )
+        res = self._append(upload_id, b'def', 3)
+        self.assertEqual(res.data['offset'], 6)
+        self.assertEqual(len(os.listdir(self.upload_dir)), 2)
+
+    def test_expired_uploads_purged(self):
+        """
+        test uploads without chunks for a day are gone and purged
+        """
+        expired_id = self._start()
+        session = UploadSession(self.recipe.id, expired_id)
+        self._lock(expired_id)
+        long_ago = time.time() - settings.RECIPE_IMAGE_UPLOAD_EXPIRY - 1
+        for path in (session.part_path, session.meta_path, session.lock_path):
+            os.utime(path, (long_ago, long_ago))
+        active_id = self._start()
+
+        res = self.client.get(session_url(self.recipe.id, expired_id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        out = io.StringIO()
+        call_command('purge_image_uploads', stdout=out)
+
+        self.assertIn('Purged 1 expired uploads', out.getvalue())
+        self.assertEqual(
+            sorted(os.listdir(self.upload_dir)),
+            [f'{self.recipe.id}-{active_id}.json',
+             f'{self.recipe.id}-{active_id}.part']
+        )
+
+    def test_other_users_recipe(self):
+        """
+        test uploads can't target another user's recipe
+        """
+        user2 = get_user_model().objects.create_user(
+            'other@londonapp.com',
+            'password123'
+        )
+        recipe = Recipe.objects.create(
+            user=user2, title='Theirs', time_minutes=1, price=1.00
+        )
+        res = self.client.post(sessions_url(recipe.id), {'name': 'a.jpg'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
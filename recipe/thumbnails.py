@@ -0,0 +1,113 @@
+import hashlib
+import os
+import threading
+import uuid
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from recipe import images
+
+
+class ThumbnailCache:
+    """
+    disk cache of resized recipe images with a size budget
+
+    files are named after a hash of the source file identity and the
+    requested size, reads refresh their mtime and the least recently read
+    files are evicted once the directory grows past its budget
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+
+    def get(self, source_path, width, fmt):
+        """
+        return the path of the thumbnail, rendering it on first request
+        """
+        path = os.path.join(
+            self.directory, f'{self._key(source_path, width, fmt)}.{fmt}'
+        )
+        try:
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+
+        with Image.open(source_path) as source:
+            image = ImageOps.exif_transpose(source)
+            image.load()
+        content = images.encode(images.resize(image, width), fmt)
+
+        os.makedirs(self.directory, exist_ok=True)
+        # concurrent renders of the same thumbnail each write their own
+        # temp file, the rename makes whichever lands last win atomically
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(temp_path, 'wb') as temp:
+            temp.write(content)
+        os.replace(temp_path, path)
+        self._grow(len(content))
+        return path
+
+    def _key(self, source_path, width, fmt):
+        stat = os.stat(source_path)
+        identity = f'{source_path}:{stat.st_size}:{stat.st_mtime_ns}'
+        return hashlib.sha256(f'{identity}:{width}:{fmt}'.encode()).hexdigest()
+
+    def _grow(self, size):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(
+                    entry.stat().st_size for entry in self._entries()
+                )
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # drop the least recently read files down to 90% of the budget,
+        # DirEntry caches its stat so each file is only stat'ed once
+        entries = sorted(
+            self._entries(), key=lambda entry: entry.stat().st_mtime_ns
+        )
+        self._size = sum(entry.stat().st_size for entry in entries)
+        target = self.max_bytes * 0.9
+        for entry in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+            self._size -= entry.stat().st_size
+
+    def _entries(self):
+        return [
+            entry for entry in os.scandir(self.directory)
+            if entry.is_file() and not entry.name.endswith('.tmp')
+        ]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    return the thumbnail cache configured in the settings
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None or (
+            _cache.directory != settings.RECIPE_THUMBNAIL_DIR
+            or _cache.max_bytes != settings.RECIPE_THUMBNAIL_CACHE_BYTES
+        ):
+            _cache = ThumbnailCache(
+                settings.RECIPE_THUMBNAIL_DIR,
+                settings.RECIPE_THUMBNAIL_CACHE_BYTES
+            )
+        return _cache
@@ -0,0 +1,261 @@
+import json
+import os
+import socket
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from PIL import Image
+
+
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """
+    a chunk or session the protocol can't accept
+    """
+
+
+class UploadConflict(UploadError):
+    """
+    the client's idea of the upload offset is out of date
+    """
+
+
+class UploadSession:
+    """
+    resumable upload of a recipe image
+
+    chunks are appended straight to a part file on disk, the offset of an
+    upload is the size of its part file, so a client that lost its
+    connection asks for the offset and carries on from there
+    """
+
+    def __init__(self, recipe_id, upload_id):
+        self.recipe_id = recipe_id
+        self.upload_id = upload_id
+        base = os.path.join(
+            settings.RECIPE_IMAGE_UPLOAD_DIR, f'{recipe_id}-{upload_id}'
+        )
+        self.part_path = base + '.part'
+        self.meta_path = base + '.json'
+        self.lock_path = base + '.lock'
+
+    @classmethod
+    def start(cls, recipe_id, name, size=None):
+        """
+        open a new upload of `size` bytes (if known) for a file `name`
+        """
+        if size is not None and size > settings.RECIPE_IMAGE_MAX_UPLOAD_BYTES:
+            raise UploadError('The image is too large.')
+        os.makedirs(settings.RECIPE_IMAGE_UPLOAD_DIR, exist_ok=True)
+        session = cls(recipe_id, uuid.uuid4().hex)
+        with open(session.meta_path, 'w') as meta:
+            json.dump({'name': name, 'size': size}, meta)
+        open(session.part_path, 'wb').close()
+        return session
+
+    @property
+    def meta(self):
+        with open(self.meta_path) as meta:
+            return json.load(meta)
+
+    def exists(self):
+        return os.path.exists(self.meta_path) and not self.expired
+
+    @property
+    def expired(self):
+        """
+        whether the upload saw no chunk for RECIPE_IMAGE_UPLOAD_EXPIRY
+        """
+        try:
+            touched = max(
+                os.path.getmtime(path)
+                for path in (self.meta_path, self.part_path)
+            )
+        except FileNotFoundError:
+            return True
+        return time.time() - touched > settings.RECIPE_IMAGE_UPLOAD_EXPIRY
+
+    @property
+    def offset(self):
+        return os.path.getsize(self.part_path)
+
+    def append(self, stream, offset, length):
+        """
+        write `length` bytes of `stream` at `offset`, return the new offset
+        """
+        limit = self.meta['size'] or settings.RECIPE_IMAGE_MAX_UPLOAD_BYTES
+        with self._locked():
+            with open(self.part_path, 'ab') as part:
+                if part.tell() != offset:
+                    raise UploadConflict('The offset does not match.')
+                if offset + length > limit:
+                    raise UploadError('The chunk exceeds the image size.')
+                _copy(stream, part, length)
+                return part.tell()
+
+    def finish(self):
+        """
+        check the assembled file is an image and return its path and name
+
+        only the header is parsed, the pixels are left to the image queue
+        """
+        with self._locked():
+            meta = self.meta
+            if meta['size'] is not None and self.offset != meta['size']:
+                raise UploadError('The upload is incomplete.')
+            try:
+                with Image.open(self.part_path) as image:
+                    image_format = image.format
+            except (OSError, SyntaxError, Image.DecompressionBombError):
+                raise UploadError('Upload a valid image.')
+            if image_format not in settings.RECIPE_IMAGE_UPLOAD_FORMATS:
+                raise UploadError('Upload a valid image.')
+            os.remove(self.meta_path)
+            return self.part_path, meta['name']
+
+    def abort(self):
+        """
+        drop the upload, unless a chunk is being written to it
+        """
+        with self._locked():
+            _remove(self.part_path, self.meta_path)
+
+    @contextmanager
+    def _locked(self):
+        # a lock file works across worker processes and platforms, it
+        # names its holder so one left behind by a dead worker is broken
+        holder = {
+            'host': socket.gethostname(), 'pid': os.getpid(),
+            'at': time.time(), 'token': uuid.uuid4().hex,
+        }
+        while True:
+            try:
+                lock = os.open(
+                    self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY
+                )
+                break
+            except FileExistsError:
+                if not self._break_stale_lock():
+                    raise UploadConflict('Another chunk is being written.')
+        with os.fdopen(lock, 'w') as lock_file:
+            json.dump(holder, lock_file)
+        try:
+            yield
+        finally:
+            # only our own, a stale lock may have been broken and taken
+            if _read_lock(self.lock_path) == holder:
+                _remove(self.lock_path)
+
+    def _break_stale_lock(self):
+        """
+        remove the lock if its holder is gone, return whether to try again
+        """
+        holder = _read_lock(self.lock_path)
+        if holder is None:
+            # released, or just created and not written yet
+            return not os.path.exists(self.lock_path)
+        if not _is_stale(holder):
+            return False
+        # renamed first, so of two workers breaking it only one succeeds
+        broken_path = f'{self.lock_path}.{uuid.uuid4().hex}'
+        try:
+            os.rename(self.lock_path, broken_path)
+        except FileNotFoundError:
+            return True
+        broken = _read_lock(broken_path)
+        if broken != holder:
+            # another worker broke it first and holds it now, give it back
+            try:
+                os.link(broken_path, self.lock_path)
+            except FileExistsError:
+                pass
+            _remove(broken_path)
+            return False
+        _remove(broken_path)
+        return True
+
+
+def _read_lock(path):
+    try:
+        with open(path) as lock:
+            return json.load(lock)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _is_stale(holder):
+    if time.time() - holder['at'] > settings.RECIPE_IMAGE_UPLOAD_LOCK_TIMEOUT:
+        return True
+    # signal 0 only checks the process exists on POSIX, and a pid only
+    # means something on the host that wrote it
+    if os.name != 'posix' or holder['host'] != socket.gethostname():
+        return False
+    try:
+        os.kill(holder['pid'], 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def _remove(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def purge_expired_uploads():
+    """
+    remove the files of uploads that expired, return how many there were
+
+    this covers uploads clients never finished or aborted, and the part
+    files of finished ones a dead worker never processed
+    """
+    try:
+        names = os.listdir(settings.RECIPE_IMAGE_UPLOAD_DIR)
+    except FileNotFoundError:
+        return 0
+    uploads = {}
+    for name in names:
+        path = os.path.join(settings.RECIPE_IMAGE_UPLOAD_DIR, name)
+        try:
+            touched = os.path.getmtime(path)
+        except FileNotFoundError:
+            continue
+        # {recipe_id}-{upload_id}, then the suffix and any broken lock's
+        upload = name.split('.', 1)[0]
+        paths, last = uploads.get(upload, ([], 0))
+        uploads[upload] = paths + [path], max(last, touched)
+    expired = [
+        paths for paths, touched in uploads.values()
+        if time.time() - touched > settings.RECIPE_IMAGE_UPLOAD_EXPIRY
+    ]
+    for paths in expired:
+        _remove(*paths)
+    return len(expired)
+
+
+def _copy(stream, part, length):
+    # read into one reusable buffer when the stream allows it so chunks
+    # go from the socket to the file without intermediate bytes objects
+    buffer = memoryview(bytearray(BLOCK_SIZE))
+    readinto = getattr(stream, 'readinto', None)
+    remaining = length
+    while remaining:
+        if readinto is not None:
+            read = readinto(buffer[:min(remaining, BLOCK_SIZE)])
+            data = buffer[:read]
+        else:
+            data = stream.read(min(remaining, BLOCK_SIZE))
+            read = len(data)
+        if not read:
+            raise UploadError('The chunk ended early.')
+        part.write(data)
+        remaining -= read
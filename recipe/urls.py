@@ -1,8 +1,10 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework import urlpatterns
 from rest_framework.routers import DefaultRouter
 
 from recipe import views
+from recipe.async_views import async_read_urls
 
 # default router will automaticlly registers the appropriate url for all the actions
 
@@ -13,6 +15,11 @@ router.register('recipes',views.RecipeViewSet)
 
 app_name = 'recipe'
 
+router_urls = router.urls
+if settings.RECIPE_API_ASYNC_READS:
+    router_urls = async_read_urls(router_urls)
+
 urlpatterns = [
-    path('', include(router.urls))
+    path('stats/', views.RecipeStatsView.as_view(), name='stats'),
+    path('', include(router_urls))
 ]
@@ -1,47 +1,411 @@
-from django.db.models import query
-from django.shortcuts import render
+import os
+import re
+import uuid
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Max, Prefetch
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from django.views.decorators.http import require_safe
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 
-from core.models import Tag, Ingredient, Recipe
-from recipe import serializers
+from core import counts
+from core.lru import LRUCache
+from core.models import Tag, Ingredient, Recipe, recipe_image_storage
+from user.authentication import CachedTokenAuthentication
+from recipe import (
+    serializers, filters, pagination, export, images, thumbnails, uploads,
+    search, suggest, matching, similarity, stats
+)
+from recipe.cache import CachedListMixin, bump_generation, get_generation
+from recipe.conditional import ConditionalGetMixin
+from recipe.fastpath import FastListMixin
 from rest_framework.decorators import action
+from rest_framework.pagination import _positive_int
 from rest_framework.response import Response
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+EXPORT_FORMATS = {
+    'ndjson': (export.ndjson_lines, 'application/x-ndjson'),
+    'csv': (export.csv_lines, 'text/csv'),
+}
+
+
+# names are unique per user and model
+DUPLICATE_NAME = _('You already have one with this name.')
+GIVEN_TWICE = _('Given more than once in this request.')
+
+
+_image_names = LRUCache(maxsize=10000)
+
+
+@require_safe
+def recipe_image_thumbnail(request, image_id, width, fmt):
+    """
+    serve a resized copy of a recipe image, rendered on first request
+    """
+    if (width not in settings.RECIPE_THUMBNAIL_WIDTHS
+            or fmt not in images.RENDITION_FORMATS):
+        raise Http404
+    key = _image_key(image_id)
+    if key is None:
+        raise Http404
+    # the upload names never change, remember which file an id refers to
+    name = _image_names.get(key)
+    if name is None:
+        name = Recipe.objects.filter(
+            image_key=key
+        ).values_list('image', flat=True).first()
+        if not name:
+            raise Http404
+        _image_names.set(key, name)
+    source = recipe_image_storage.path(name)
+    if not os.path.exists(source):
+        raise Http404
+
+    cache = thumbnails.get_cache()
+    try:
+        thumbnail = open(cache.get(source, width, fmt), 'rb')
+    except FileNotFoundError:
+        # evicted between rendering and opening
+        thumbnail = open(cache.get(source, width, fmt), 'rb')
+    response = FileResponse(thumbnail, content_type=f'image/{fmt}')
+    # the url names the content of the image, what it serves never changes
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+def _image_key(image_id):
+    # images are named after their SHA-256, uploads from before that
+    # after a uuid
+    if re.fullmatch(r'[0-9a-f]{64}', image_id):
+        return image_id
+    try:
+        return str(uuid.UUID(image_id))
+    except ValueError:
+        return None
+
+
+def _bulk_payload_error(data):
+    # bulk endpoints take a list of bounded length
+    if not isinstance(data, list):
+        return Response(
+            {'detail': _('Expected a list of items.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(data) > settings.RECIPE_API_MAX_BULK_SIZE:
+        return Response(
+            {'detail': _('At most %(max)d items per request.') % {
+                'max': settings.RECIPE_API_MAX_BULK_SIZE
+            }},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return None
+
+
+def _limit_param(request, default, maximum):
+    # ?limit= of the ranked endpoints, capped at the maximum
+    try:
+        return _positive_int(
+            request.query_params['limit'], strict=True, cutoff=maximum
+        )
+    except KeyError:
+        return default
+    except ValueError:
+        raise ValidationError({'limit': _('A valid integer is required.')})
+
+
+def _names_param(request, param, choices):
+    # comma separated ?fields= style names, in the order of the choices
+    value = request.query_params.get(param)
+    if not value:
+        return None
+    names = {name.strip() for name in value.split(',')}
+    if not names <= set(choices):
+        raise ValidationError({param: _(
+            'Must be a comma separated list of: %(choices)s.'
+        ) % {'choices': ', '.join(choices)}})
+    return tuple(name for name in choices if name in names)
+
+
+def _bulk_create_recipes(recipes, batch_size):
+    """
+    bulk insert recipes and set their ids on a backend that does not return
+    them
+    """
+    if connection.vendor == 'sqlite':
+        Recipe.objects.bulk_create(recipes, batch_size=batch_size)
+        # the first insert took SQLite's write lock for the rest of the
+        # transaction, so no other connection inserted in between and the
+        # rows hold the ids up to the last one this connection inserted
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT last_insert_rowid()')
+            last_id = cursor.fetchone()[0]
+        first_id = last_id - len(recipes) + 1
+        for pk, recipe in enumerate(recipes, start=first_id):
+            recipe.pk = pk
+        return
+    if not recipes:
+        return
+
+    # elsewhere other inserts may interleave, find the rows among the
+    # user's recipes newer than the last one before, by their values in
+    # insert order
+    user = recipes[0].user
+    last_id = Recipe.objects.filter(user=user).aggregate(
+        last_id=Max('id')
+    )['last_id'] or 0
+    Recipe.objects.bulk_create(recipes, batch_size=batch_size)
+    fields = ('title', 'time_minutes', 'price', 'link')
+    inserted = defaultdict(deque)
+    for pk, *values in Recipe.objects.filter(
+        user=user, id__gt=last_id
+    ).order_by('id').values_list('id', *fields):
+        inserted[tuple(values)].append(pk)
+    for recipe in recipes:
+        key = tuple(getattr(recipe, field) for field in fields)
+        recipe.pk = inserted[key].popleft()
+
+
+class BaseRecipeAttrViewSet(ConditionalGetMixin,
+                CachedListMixin,
+                FastListMixin,
+                viewsets.GenericViewSet,
                 mixins.ListModelMixin,
                 mixins.CreateModelMixin):
     """
     Base viewset for user owned recipe attributes
     """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = pagination.RecipeAttrCursorPagination
 
     def get_queryset(self):
         # return objects for the current authenticated user only
         assigned_only = bool(
             int(self.request.query_params.get('assigned_only', 0))
         )
-        queryset = self.queryset
+        queryset = self.queryset.filter(user=self.request.user)
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull =False)
+            # the maintained count makes this a plain column predicate
+            queryset = queryset.filter(recipe_count__gt=0)
 
-        return queryset.filter(user=self.request.user).order_by('-name').distinct()
+        return queryset.order_by('-name')
 
     def perform_create(self, serializer):
         """
         create a new object
         """
-        serializer.save(user=self.request.user)
+        try:
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            raise ValidationError({'name': [DUPLICATE_NAME]})
+
+    @action(
+        methods=['POST', 'PATCH', 'DELETE'], detail=False, url_path='bulk'
+    )
+    def bulk(self, request):
+        """
+        create (POST), rename (PATCH) or delete (DELETE, a list of ids) a
+        list of objects at once
+        """
+        error = _bulk_payload_error(request.data)
+        if error:
+            return error
+        if request.method == 'POST':
+            return self._bulk_create(request.data)
+        elif request.method == 'PATCH':
+            return self._bulk_rename(request.data)
+        return self._bulk_delete(request.data)
+
+    @action(methods=['GET'], detail=False)
+    def suggest(self, request):
+        """
+        complete a name from `?prefix=`, most used first
+        """
+        prefix = request.query_params.get('prefix', '')
+        if not prefix:
+            return Response(
+                {'prefix': _('This field is required.')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = _limit_param(
+            request,
+            settings.RECIPE_SUGGEST_LIMIT,
+            settings.RECIPE_SUGGEST_MAX_LIMIT
+        )
+        index = suggest.get_index(self.queryset.model, request.user.id)
+        return Response([
+            {'id': pk, 'name': name}
+            for pk, name in index.lookup(prefix, limit)
+        ])
+
+    def _bulk_create(self, data):
+        serializer = self.get_serializer(data=data, many=True)
+        if not serializer.is_valid():
+            # one entry per item, empty for the valid ones
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        model = self.queryset.model
+        user = self.request.user
+        names = list(dict.fromkeys(
+            item['name'] for item in serializer.validated_data
+        ))
+
+        with transaction.atomic():
+            new_names = conflict = None
+            while True:
+                existing = self._existing_names(names)
+                retried_names, new_names = new_names, [
+                    name for name in names if name not in existing
+                ]
+                if new_names == retried_names:
+                    # the conflict was not with a concurrent create
+                    raise conflict
+                try:
+                    with transaction.atomic():
+                        model.objects.bulk_create(
+                            [
+                                model(user=user, name=name)
+                                for name in new_names
+                            ],
+                            batch_size=settings.RECIPE_API_BULK_BATCH_SIZE
+                        )
+                    break
+                except IntegrityError as error:
+                    # a concurrent request created some of the names, they
+                    # are reported as existing on the next round
+                    conflict = error
+            # not every backend returns the new ids from a bulk insert, the
+            # insert went through whole so the names identify its rows
+            created = model.objects.filter(
+                user=user, name__in=new_names
+            ).order_by('id')
+            created = self.get_serializer(created, many=True).data
+        # bulk writes send no save signals
+        bump_generation(user.id)
+
+        return Response(
+            {'created': created, 'existing': sorted(existing)},
+            status=status.HTTP_201_CREATED
+        )
+
+    def _existing_names(self, names):
+        return set(self.queryset.model.objects.filter(
+            user=self.request.user, name__in=names
+        ).values_list('name', flat=True))
+
+    def _bulk_rename(self, data):
+        serializer = serializers.BulkRenameSerializer(data=data, many=True)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        model = self.queryset.model
+        user = self.request.user
+        renames = serializer.validated_data
+        objs = model.objects.filter(
+            user=user, id__in=[item['id'] for item in renames]
+        ).in_bulk()
+        # names kept by the user's objects this request does not rename
+        taken = set(model.objects.filter(
+            user=user, name__in=[item['name'] for item in renames]
+        ).exclude(id__in=list(objs)).values_list('name', flat=True))
+        ids = Counter(item['id'] for item in renames)
+        names = Counter(item['name'] for item in renames)
+        errors = []
+        for item in renames:
+            error = {}
+            if item['id'] not in objs:
+                error['id'] = [_('Not found.')]
+            elif ids[item['id']] > 1:
+                error['id'] = [GIVEN_TWICE]
+            if item['name'] in taken:
+                error['name'] = [DUPLICATE_NAME]
+            elif names[item['name']] > 1:
+                error['name'] = [GIVEN_TWICE]
+            errors.append(error)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        for item in renames:
+            obj = objs[item['id']]
+            obj.name = item['name']
+            obj.updated_at = now
+        try:
+            with transaction.atomic():
+                model.objects.bulk_update(
+                    objs.values(),
+                    ['name', 'updated_at'],
+                    batch_size=settings.RECIPE_API_BULK_BATCH_SIZE
+                )
+                search.get_backend().index(
+                    self.recipe_through.objects.filter(**{
+                        f'{self.recipe_through_column}__in': list(objs)
+                    }).values_list('recipe_id', flat=True).distinct()
+                )
+        except IntegrityError:
+            # a concurrent write took a name, or the renames swap names,
+            # which the constraint checks row by row
+            return Response(
+                {'detail': DUPLICATE_NAME},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        bump_generation(user.id)
 
+        return Response(
+            self.get_serializer(
+                sorted(objs.values(), key=lambda obj: obj.id), many=True
+            ).data,
+            status=status.HTTP_200_OK
+        )
+
+    def _bulk_delete(self, data):
+        serializer = serializers.BulkDeleteSerializer(data={'ids': data})
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors['ids'],
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        model = self.queryset.model
+        user = self.request.user
+        ids = serializer.validated_data['ids']
+        with transaction.atomic():
+            queryset = model.objects.filter(user=user, id__in=ids)
+            found = set(queryset.values_list('id', flat=True))
+            errors = {
+                index: [_('Not found.')]
+                for index, pk in enumerate(ids) if pk not in found
+            }
+            if errors:
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+            queryset.delete()
+        bump_generation(user.id)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
     # manage tags in the database
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    recipe_through = Recipe.tags.through
+    recipe_through_column = 'tag_id'
 
 
 class IngredientsViewSet(BaseRecipeAttrViewSet):
@@ -50,72 +414,426 @@ class IngredientsViewSet(BaseRecipeAttrViewSet):
     """
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    recipe_through = Recipe.ingredients.through
+    recipe_through_column = 'ingredient_id'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin,
+                CachedListMixin,
+                FastListMixin,
+                viewsets.ModelViewSet):
     """
     manage recieps in the database
     """
     queryset = Recipe.objects.all()
     serializer_class = serializers.RecipeSerializer
-    authentication_classes  = (TokenAuthentication,)
+    authentication_classes  = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
-
-    #private function
-    def __params_to_ints(self, qs):
-        # convert a list of string id into a list of ints
-        # our_string = '1,2,3,4'
-        return [int(str_id) for str_id in qs.split(',')]
+    filter_backends = (
+        filters.RecipeRelationFilter, filters.RecipeSearchFilter
+    )
+    pagination_class = pagination.RecipeCursorPagination
 
     def get_queryset(self):
         """
         retrieve the recipes for authenticated user
         """
-        # retrive get params for tags
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-        if tags:
-            tag_ids = self.__params_to_ints(tags)
-            # django sintax to filter on foreign keys
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ing_ids = self.__params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ing_ids)
-        #return this instead of the main query set
-        return queryset.filter(user = self.request.user).distinct()
+        # filtering by tags and ingredients happens in the filter backend
+        queryset = self.queryset.filter(user = self.request.user)
+        return self._optimize_queryset(queryset)
+
+    def _optimize_queryset(self, queryset):
+        """
+        load only what the current action serializes
+        """
+        if self.action in ('list', 'retrieve'):
+            # the columns of the requested fields and never the image or
+            # the owner. Each rendered relation is fetched in one query
+            # instead of once per recipe, in the id order the fast list
+            # path renders them in, with only the columns it renders
+            fields, expand = self.get_fieldset()
+            relations = serializers.EXPANDABLE_RELATIONS
+            prefetches = []
+            for name in fields:
+                if name not in relations:
+                    continue
+                columns = ('id',)
+                if name in expand:
+                    columns = relations[name].Meta.fields
+                related = Recipe._meta.get_field(name).related_model
+                prefetches.append(Prefetch(
+                    name,
+                    queryset=related.objects.only(*columns).order_by('id')
+                ))
+            return queryset.only(
+                'id', *(name for name in fields if name not in relations)
+            ).prefetch_related(*prefetches)
+        elif self.action == 'upload_image':
+            return queryset.only(
+                'id', 'image', 'image_status'
+            ).prefetch_related('renditions')
+        elif self.action in ('start_image_upload', 'image_upload',
+                'finalize_image_upload', 'similar'):
+            return queryset.only('id')
+        return queryset
+
+    def get_fieldset(self):
+        """
+        return the fields a read renders and the relations it nests
+
+        `?fields=id,title` picks the fields, `?expand=tags,ingredients`
+        nests the relations instead of listing their ids. A recipe detail
+        always nests them
+        """
+        all_fields = serializers.RecipeSerializer.Meta.fields
+        relations = tuple(serializers.EXPANDABLE_RELATIONS)
+        fields = _names_param(self.request, 'fields', all_fields)
+        expand = _names_param(self.request, 'expand', relations)
+        if self.action == 'retrieve':
+            expand = relations
+        fields = fields or all_fields
+        return fields, tuple(name for name in fields if name in (expand or ()))
 
     def get_serializer_class(self):
         """
         return approprieate serializer class
         """
-        if self.action == 'retrieve':
-            return serializers.RecipeDetailSerializer
+        if self.action in ('list', 'retrieve'):
+            fields, expand = self.get_fieldset()
+            if fields == self.serializer_class.Meta.fields:
+                if not expand:
+                    return self.serializer_class
+                if len(expand) == len(serializers.EXPANDABLE_RELATIONS):
+                    return serializers.RecipeDetailSerializer
+            return serializers.recipe_fieldset_serializer(fields, expand)
         elif self.action == 'upload_image':
             return serializers.RecipImageSerializer
+        elif self.action == 'import_recipes':
+            return serializers.RecipeImportSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
         # overide the create recipe
         serializer.save(user = self.request.user)
 
-    @action(methods=['POST'], detail=True, url_path='upload-image')
+    @action(
+        methods=['POST'], detail=False, url_path='import', url_name='import'
+    )
+    def import_recipes(self, request):
+        """
+        create a list of recipes with a fixed number of queries
+        """
+        error = _bulk_payload_error(request.data)
+        if error:
+            return error
+        serializer = self.get_serializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        items = serializer.validated_data
+        user = request.user
+        # resolve every referenced id with one query per relation
+        known = {
+            'tags': set(Tag.objects.filter(
+                user=user,
+                id__in={pk for item in items for pk in item.get('tags', ())}
+            ).values_list('id', flat=True)),
+            'ingredients': set(Ingredient.objects.filter(
+                user=user,
+                id__in={
+                    pk for item in items for pk in item.get('ingredients', ())
+                }
+            ).values_list('id', flat=True)),
+        }
+        errors = []
+        for item in items:
+            item_errors = {}
+            for field, ids in known.items():
+                missing = [pk for pk in item.get(field, ()) if pk not in ids]
+                if missing:
+                    item_errors[field] = [
+                        _('Invalid pk "%(pk)s" - object does not exist.') % {
+                            'pk': pk
+                        } for pk in missing
+                    ]
+            errors.append(item_errors)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        batch_size = settings.RECIPE_API_BULK_BATCH_SIZE
+        recipes = [
+            Recipe(
+                user=user,
+                **{
+                    key: value for key, value in item.items()
+                    if key not in ('tags', 'ingredients')
+                }
+            )
+            for item in items
+        ]
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                Recipe.objects.bulk_create(recipes, batch_size=batch_size)
+            else:
+                _bulk_create_recipes(recipes, batch_size)
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=pk)
+                for recipe, item in zip(recipes, items)
+                for pk in dict.fromkeys(item.get('tags', ()))
+            ], batch_size=batch_size)
+            Recipe.ingredients.through.objects.bulk_create([
+                Recipe.ingredients.through(
+                    recipe_id=recipe.pk, ingredient_id=pk
+                )
+                for recipe, item in zip(recipes, items)
+                for pk in dict.fromkeys(item.get('ingredients', ()))
+            ], batch_size=batch_size)
+            search.get_backend().index(recipe.pk for recipe in recipes)
+            for model, field in ((Tag, 'tags'), (Ingredient, 'ingredients')):
+                counts.adjust(model, Counter(
+                    pk for item in items
+                    for pk in dict.fromkeys(item.get(field, ()))
+                ))
+        # bulk writes send no save or m2m signals
+        bump_generation(user.id)
+
+        return Response(
+            {'ids': [recipe.pk for recipe in recipes]},
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(methods=['GET'], detail=False)
+    def match(self, request):
+        """
+        rank recipes by how many of their ingredients `?ingredients=`
+        covers, listing the ones still missing
+        """
+        value = request.query_params.get('ingredients')
+        if not value:
+            return Response(
+                {'ingredients': _('This field is required.')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        ingredient_ids = filters.params_to_ints('ingredients', value)
+        limit = _limit_param(
+            request,
+            settings.RECIPE_MATCH_LIMIT,
+            settings.RECIPE_MATCH_MAX_LIMIT
+        )
+        return Response(
+            matching.match_recipes(request.user, ingredient_ids, limit)
+        )
+
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk=None):
+        """
+        return the recipes sharing the most tags and ingredients with this
+        one, by `?metric=cosine` (default) or `jaccard` similarity
+        """
+        recipe = self.get_object()
+        metric = request.query_params.get('metric', 'cosine')
+        if metric not in similarity.METRICS:
+            return Response(
+                {'metric': _('Must be one of: cosine, jaccard.')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = _limit_param(
+            request,
+            settings.RECIPE_SIMILAR_LIMIT,
+            settings.RECIPE_SIMILAR_MAX_LIMIT
+        )
+        matches = similarity.get_index(request.user.id).similar(
+            recipe.id, limit, metric
+        )
+        titles = dict(Recipe.objects.filter(
+            id__in=[recipe_id for recipe_id, _ in matches]
+        ).values_list('id', 'title'))
+        return Response([
+            {'id': recipe_id, 'title': titles[recipe_id], 'score': score}
+            for recipe_id, score in matches if recipe_id in titles
+        ])
+
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """
+        stream the user's recipes as NDJSON (default) or ?output=csv
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {'output': _('Must be one of: ndjson, csv.')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        render, content_type = EXPORT_FORMATS[output]
+        recipes = export.iter_recipes(
+            self.filter_queryset(self.get_queryset()),
+            settings.RECIPE_EXPORT_CHUNK_SIZE
+        )
+        response = StreamingHttpResponse(
+            render(recipes), content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{output}"'
+        )
+        return response
+
+    @action(methods=['GET', 'POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """
-        upload an image to a recipe
+        upload an image to a recipe, or see its current image
+
+        the upload is processed after the 202, GET reports its image_status
         """
         recipe = self.get_object()
+        if request.method == 'GET':
+            return Response(self.get_serializer(recipe).data)
+
         serializer = self.get_serializer(
             recipe,
             data =request.data
         )
         if serializer.is_valid():
-            serializer.save()
+            # decoding, resizing and storing happen on the image queue
+            upload = serializer.validated_data['image']
+            images.queue_recipe_image(
+                recipe.id, images.stage_upload(upload), upload.name
+            )
             return Response(
-                serializer.data,
-                status = status.HTTP_200_OK
+                {'id': recipe.id, 'status': 'processing'},
+                status = status.HTTP_202_ACCEPTED
             )
         return Response(
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(
+        methods=['POST'], detail=True,
+        url_path='upload-image/sessions', url_name='upload-sessions'
+    )
+    def start_image_upload(self, request, pk=None):
+        """
+        start a resumable image upload, chunks follow with PATCH
+        """
+        recipe = self.get_object()
+        serializer = serializers.ImageUploadSessionSerializer(
+            data=request.data
+        )
+        serializer.is_valid(raise_exception=True)
+        try:
+            session = uploads.UploadSession.start(
+                recipe.id, **serializer.validated_data
+            )
+        except uploads.UploadError as error:
+            return Response(
+                {'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            {'upload_id': session.upload_id, 'offset': 0},
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(
+        methods=['GET', 'PATCH', 'DELETE'], detail=True,
+        url_path=r'upload-image/sessions/(?P<upload_id>[0-9a-f]{32})',
+        url_name='upload-session'
+    )
+    def image_upload(self, request, pk=None, upload_id=None):
+        """
+        report (GET), append a chunk to (PATCH) or abort (DELETE) an upload
+
+        a PATCH body is the raw chunk, its Upload-Offset header must equal
+        the current offset
+        """
+        session = self._get_upload_session(upload_id)
+        if request.method == 'DELETE':
+            try:
+                session.abort()
+            except uploads.UploadConflict as error:
+                return Response(
+                    {'detail': str(error)}, status=status.HTTP_409_CONFLICT
+                )
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if request.method == 'GET':
+            return Response({'offset': session.offset})
+
+        try:
+            offset = int(request.META['HTTP_UPLOAD_OFFSET'])
+            length = int(request.META['CONTENT_LENGTH'])
+        except (KeyError, ValueError):
+            return Response(
+                {'detail': _('Upload-Offset and Content-Length are required.')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            # read the body ourselves, never through request.data
+            offset = session.append(request.stream, offset, length)
+        except uploads.UploadConflict as error:
+            return Response(
+                {'detail': str(error), 'offset': session.offset},
+                status=status.HTTP_409_CONFLICT
+            )
+        except uploads.UploadError as error:
+            return Response(
+                {'detail': str(error), 'offset': session.offset},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({'offset': offset})
+
+    @action(
+        methods=['POST'], detail=True,
+        url_path=r'upload-image/sessions/(?P<upload_id>[0-9a-f]{32})/finalize',
+        url_name='upload-session-finalize'
+    )
+    def finalize_image_upload(self, request, pk=None, upload_id=None):
+        """
+        check a completed upload and hand it to the image queue
+        """
+        session = self._get_upload_session(upload_id)
+        try:
+            path, name = session.finish()
+        except uploads.UploadConflict as error:
+            return Response(
+                {'detail': str(error)}, status=status.HTTP_409_CONFLICT
+            )
+        except uploads.UploadError as error:
+            return Response(
+                {'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        images.queue_recipe_image(session.recipe_id, path, name)
+        return Response(
+            {'id': session.recipe_id, 'status': 'processing'},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    def _get_upload_session(self, upload_id):
+        # get_object makes sure the recipe belongs to the user
+        session = uploads.UploadSession(self.get_object().id, upload_id)
+        if not session.exists():
+            raise Http404
+        return session
+
+
+class RecipeStatsView(APIView):
+    """
+    aggregates of the user's recipe library
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        # keyed on the generation, so any write of the user recomputes it
+        user_id = request.user.id
+        key = f'recipe-api:stats:{user_id}:{get_generation(user_id)}'
+        data = cache.get(key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        data = serializers.RecipeStatsSerializer(
+            stats.recipe_stats(request.user)
+        ).data
+        cache.set(key, data, settings.RECIPE_API_CACHE_TIMEOUT)
+        return Response(data, headers={'X-Cache': 'MISS'})
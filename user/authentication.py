@@ -0,0 +1,173 @@
+import copy
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.lru import LRUCache
+from core.models import AuthToken
+from user import tokens
+
+
+token_cache = LRUCache(
+    maxsize=settings.TOKEN_AUTH_CACHE['MAXSIZE'],
+    ttl=settings.TOKEN_AUTH_CACHE['TTL']
+)
+
+
+def _token_cache_key(digest):
+    # only digests, never raw tokens, go into a shared cache
+    return f'auth-token:{digest}'
+
+
+def _user_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def _forget(cache_keys):
+    for cache_key in cache_keys:
+        token_cache.delete(cache_key)
+    shared = tokens.shared_cache()
+    if shared is not None and cache_keys:
+        shared.delete_many(cache_keys)
+
+
+def forget_tokens(*digests):
+    """
+    drop cached resolutions of the opaque tokens with the given digests
+    """
+    _forget([_token_cache_key(digest) for digest in digests])
+
+
+def forget_users(*user_ids):
+    """
+    drop the cached users signed tokens resolve to
+    """
+    _forget([_user_cache_key(user_id) for user_id in user_ids])
+
+
+def _current(cached, generation):
+    # entries are tagged with the revocations generation they were loaded
+    # in, one from before a revocation may hold the revoked token
+    if cached is None or cached[0] != generation:
+        return None
+    return cached[1]
+
+
+def _cached(cache_key, load, generation):
+    if generation is None:
+        # without a shared cache no worker hears of the others' revocations
+        return load()
+    entry = _current(token_cache.get(cache_key), generation)
+    if entry is None:
+        shared = tokens.shared_cache()
+        entry = _current(shared.get(cache_key), generation)
+        if entry is None:
+            entry = load()
+            shared.set(
+                cache_key, (generation, entry),
+                settings.TOKEN_AUTH_CACHE['TTL']
+            )
+        token_cache.set(cache_key, (generation, entry))
+    return entry
+
+
+def _check(user, token):
+    if token.expires <= timezone.now():
+        raise exceptions.AuthenticationFailed(_('Token has expired.'))
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+
+def cached_credentials(key):
+    """
+    return the (user, token) a valid key resolves to when this process
+    knows it without any query, else None
+
+    only the LRU, the revocation filter and the revocations generation in
+    the shared cache are consulted, never the database. Reading the
+    shared cache blocks, async code calls it through sync_to_async
+    """
+    generation = tokens.revocations_generation()
+    if tokens.is_signed(key):
+        token = tokens.unsign(key)
+        revoked = tokens.revoked_filter(generation, build=False)
+        if token is None or revoked is None or token.pk in revoked:
+            return None
+        user = _current(
+            token_cache.get(_user_cache_key(token.user_id)), generation
+        )
+        if user is None:
+            return None
+        entry = (user, token)
+    else:
+        entry = _current(
+            token_cache.get(_token_cache_key(tokens.digest(key))), generation
+        )
+        if entry is None:
+            return None
+    try:
+        _check(*entry)
+    except exceptions.AuthenticationFailed:
+        return None
+    return entry
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    authentication by expiring, revocable AuthTokens with cached lookups
+
+    opaque tokens resolve to their user through an in-process LRU and the
+    Django cache TOKEN_AUTH_CACHE['SHARED_CACHE'] names, so every worker
+    benefits from a lookup. Entries are only used in the revocations
+    generation they were loaded in, a revocation in any worker drops them
+    all. Saving a user evicts its entries, other workers' LRUs expire
+    after the TTL. Signed tokens are verified from their signature and the
+    revocation filter, only their user is looked up and cached the same
+    way. Without a shared cache nothing is cached, every request checks
+    the token in the database
+    """
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        generation = tokens.revocations_generation()
+        if tokens.is_signed(key):
+            user, token = self._signed_credentials(key, generation)
+        else:
+            user, token = _cached(
+                _token_cache_key(tokens.digest(key)),
+                lambda: self._opaque_credentials(key),
+                generation
+            )
+        _check(user, token)
+        # requests may modify their user, keep the cached one pristine
+        return (copy.copy(user), token)
+
+    def _opaque_credentials(self, key):
+        try:
+            token = self.model.objects.select_related('user').get(
+                digest=tokens.digest(key), revoked__isnull=True
+            )
+        except self.model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        return (token.user, token)
+
+    def _signed_credentials(self, key, generation):
+        token = tokens.unsign(key)
+        if token is None or tokens.is_revoked(token, generation):
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        user = _cached(
+            _user_cache_key(token.user_id),
+            lambda: self._load_user(token.user_id),
+            generation
+        )
+        return (user, token)
+
+    def _load_user(self, user_id):
+        try:
+            return get_user_model().objects.get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from user import passwords
+
+
+class PooledPasswordBackend(ModelBackend):
+    """
+    model backend verifying passwords in the password process pool
+
+    a hash made by a hasher other than the first of PASSWORD_HASHERS, or
+    with outdated parameters, is replaced on a successful login
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            passwords.verify(password, None)
+            return None
+        valid, upgraded = passwords.verify(password, user.password)
+        if not valid:
+            return None
+        if upgraded is not None:
+            user.password = upgraded
+            user.save(update_fields=['password'])
+        if self.user_can_authenticate(user):
+            return user
+        return None
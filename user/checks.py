@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from recipe.checks import PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches, deploy=True)
+def check_token_cache(app_configs, **kwargs):
+    """
+    warn when revocations can not reach every worker, or nothing caches
+    token lookups
+    """
+    alias = settings.TOKEN_AUTH_CACHE.get('SHARED_CACHE')
+    if alias is None:
+        return [Warning(
+            "TOKEN_AUTH_CACHE['SHARED_CACHE'] is not set.",
+            hint=(
+                'Every request checks its token in the database. Name a '
+                'cache all workers share to cache token lookups.'
+            ),
+            id='user.W001',
+        )]
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f"TOKEN_AUTH_CACHE['SHARED_CACHE'] names the process local "
+        f'cache {alias!r}.',
+        hint=(
+            'Revoked tokens stay valid in the workers that did not revoke '
+            'them. Name a cache all workers share such as memcached.'
+        ),
+        id='user.W002',
+    )]
@@ -0,0 +1,118 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from multiprocessing import get_context
+
+import django
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class VerifierBusy(Exception):
+    """
+    every verification slot stayed taken, or the hash stayed unchecked, for
+    PASSWORD_VERIFY_TIMEOUT
+    """
+
+
+@lru_cache(maxsize=None)
+def _hashers(paths):
+    return [import_string(path)() for path in paths]
+
+
+def check(password, encoded, hasher_paths):
+    """
+    return (whether the password matches the encoded hash, the password
+    hashed anew when the hash should be upgraded, else None)
+
+    the hashers are passed in rather than read from settings so workers
+    use the configuration of the process asking. A missing hash is
+    compared anyway, unknown users take as long as wrong passwords
+    """
+    hashers = _hashers(tuple(hasher_paths))
+    preferred = hashers[0]
+    if encoded is None:
+        preferred.encode(password, preferred.salt())
+        return False, None
+    algorithm = encoded.split('$', 1)[0]
+    for hasher in hashers:
+        if hasher.algorithm == algorithm:
+            break
+    else:
+        return False, None
+    if not hasher.verify(password, encoded):
+        return False, None
+    if hasher is preferred and not hasher.must_update(encoded):
+        return True, None
+    return True, preferred.encode(password, preferred.salt())
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = None
+
+
+def _get_slots():
+    global _slots
+    with _pool_lock:
+        # made on first use like the pool, importing needs no settings
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(
+                settings.PASSWORD_VERIFY_MAX_PENDING
+            )
+        return _slots
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawned, forking a process running threads may copy held locks
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_VERIFY_WORKERS,
+                mp_context=get_context('spawn'),
+                initializer=django.setup,
+            )
+        return _pool
+
+
+def _reset_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def verify(password, encoded):
+    """
+    check the password against the encoded hash in the process pool
+
+    at most PASSWORD_VERIFY_WORKERS hashes are computed at once however
+    many requests log in, and at most PASSWORD_VERIFY_MAX_PENDING requests
+    wait for one, others give up with VerifierBusy rather than queue. So
+    do requests whose hash a worker did not check in time. With no workers
+    configured the hash is checked in the calling thread
+    """
+    hasher_paths = list(settings.PASSWORD_HASHERS)
+    if not settings.PASSWORD_VERIFY_WORKERS:
+        return check(password, encoded, hasher_paths)
+    slots = _get_slots()
+    if not slots.acquire(timeout=settings.PASSWORD_VERIFY_TIMEOUT):
+        raise VerifierBusy
+    try:
+        pool = _get_pool()
+        future = pool.submit(check, password, encoded, hasher_paths)
+        try:
+            return future.result(timeout=settings.PASSWORD_VERIFY_TIMEOUT)
+        except TimeoutError:
+            # a worker is stuck or far behind, don't hold the request for it
+            future.cancel()
+            raise VerifierBusy
+        except BrokenProcessPool:
+            # a worker died, start over with a fresh pool next time
+            _reset_pool(pool)
+            raise
+    finally:
+        slots.release()
@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model, authenticate
 from django.utils.translation import ugettext_lazy as _
 
-from rest_framework import serializers
+from rest_framework import exceptions, serializers
+
+from core.models import AuthToken
+from user.passwords import VerifierBusy
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -34,20 +38,46 @@ class AuthTokenSerializer(serializers.Serializer):
         style = {'input_type':'password'},
         trim_whitespace = False
     )
+    # a new login from the same device replaces its token
+    device = serializers.CharField(
+        max_length=255, required=False, allow_blank=True, default=''
+    )
 
     def validate(self, attrs):
         # validate and authenticate the user
         email = attrs.get('email')
         password = attrs.get('password')
 
-        user = authenticate(
-            request=self.context.get('request'),
-            username = email,
-            password = password
-        )
+        try:
+            user = authenticate(
+                request=self.context.get('request'),
+                username = email,
+                password = password
+            )
+        except VerifierBusy:
+            # every password worker is taken, ask the client to come back
+            raise exceptions.Throttled(
+                wait=settings.PASSWORD_VERIFY_TIMEOUT
+            )
         if not user:
             msg = _('Unable to authenticate with provided credentials')
             raise serializers.ValidationError(msg, code='authentication')
 
         attrs['user'] = user
         return attrs
+
+
+class AuthTokenListSerializer(serializers.ModelSerializer):
+    """
+    serialize the active tokens of a user's devices
+    """
+    current = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AuthToken
+        fields = ('id', 'device', 'created', 'expires', 'current')
+        read_only_fields = fields
+
+    def get_current(self, token):
+        auth = self.context['request'].auth
+        return auth is not None and auth.pk == token.pk
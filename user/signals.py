@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import AuthToken
+from user import tokens
+from user.authentication import forget_tokens, forget_users
+
+
+@receiver(post_delete, sender=AuthToken)
+def forget_deleted_token(sender, instance, **kwargs):
+    # a deleted opaque token must stop authenticating right away, in the
+    # other workers too unless it expired anyway
+    if instance.digest:
+        forget_tokens(instance.digest)
+        if instance.expires > timezone.now():
+            tokens.bump_revocations()
+
+
+def _credentials(instance):
+    # read the raw values, the attributes would load deferred fields
+    return (
+        instance.__dict__.get('is_active'), instance.__dict__.get('password')
+    )
+
+
+@receiver(post_init, sender=settings.AUTH_USER_MODEL)
+def remember_credentials(sender, instance, **kwargs):
+    instance._stored_credentials = _credentials(instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_user_tokens(sender, instance, created, **kwargs):
+    # covers deactivation and password changes, and keeps the cached user
+    # from serving stale profile data
+    credentials = _credentials(instance)
+    changed = credentials != instance._stored_credentials
+    instance._stored_credentials = credentials
+    if created:
+        return
+    forget_tokens(*AuthToken.objects.filter(
+        user=instance, digest__isnull=False
+    ).values_list('digest', flat=True))
+    forget_users(instance.pk)
+    # other workers drop their cached tokens too when the user may no
+    # longer use them, not for the last_login saved by every login
+    if changed:
+        tokens.bump_revocations()
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_deleted_user(sender, instance, **kwargs):
+    # signed tokens carry the user id, stop resolving it to the cached user
+    # in every worker
+    forget_users(instance.pk)
+    tokens.bump_revocations()
@@ -0,0 +1,172 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import AuthToken
+from user import tokens
+from user.authentication import _token_cache_key, token_cache
+from user.checks import check_token_cache
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """
+    test token to user resolutions are cached and invalidated
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@londonapp.com',
+            'password123',
+            name='Test'
+        )
+        self.token, key = tokens.issue(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+
+    def test_token_lookup_cached(self):
+        """
+        test the token is only looked up on the first request
+        """
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_deleted_token_rejected(self):
+        """
+        test a deleted token stops authenticating
+        """
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """
+        test deactivating the user evicts its cached tokens
+        """
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_evicts_user(self):
+        """
+        test changing the password drops the cached resolution
+        """
+        self.client.get(ME_URL)
+        self.user.set_password('newpass123')
+        self.user.save()
+
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+    @override_settings(TOKEN_AUTH_CACHE={
+        'MAXSIZE': 10, 'TTL': 60, 'SHARED_CACHE': 'default'
+    })
+    def test_shared_cache_tier(self):
+        """
+        test a resolution cached by another worker is reused
+        """
+        cache.clear()
+        self.client.get(ME_URL)
+        # a fresh worker only has the shared cache
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.token.delete()
+        token_cache.clear()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoked_in_other_worker_rejected(self):
+        """
+        test a token this worker cached stops authenticating once another
+        worker revokes it
+        """
+        self.client.get(ME_URL)
+        # what another worker's revoke leaves behind for this one
+        AuthToken.objects.filter(pk=self.token.pk).update(
+            revoked=timezone.now()
+        )
+        tokens.bump_revocations()
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_in_other_worker_rejected(self):
+        """
+        test a token another worker cached stops authenticating once the
+        user is deactivated
+        """
+        self.client.get(ME_URL)
+        cache_key = _token_cache_key(self.token.digest)
+        other_worker_entry = token_cache.get(cache_key)
+
+        self.user.is_active = False
+        self.user.save()
+        # saving only evicts this worker's entry
+        token_cache.set(cache_key, other_worker_entry)
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_keeps_cached_tokens(self):
+        """
+        test saving the last login doesn't drop every worker's tokens
+        """
+        generation = tokens.revocations_generation()
+        self.user.last_login = timezone.now()
+        self.user.save()
+
+        self.assertEqual(tokens.revocations_generation(), generation)
+
+    @override_settings(TOKEN_AUTH_CACHE={
+        'MAXSIZE': 10, 'TTL': 60, 'SHARED_CACHE': None
+    })
+    def test_without_shared_cache(self):
+        """
+        test nothing is cached when revocations can't reach every worker
+        """
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                res = self.client.get(ME_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        AuthToken.objects.filter(pk=self.token.pk).update(
+            revoked=timezone.now()
+        )
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_shared_cache_checked_on_deploy(self):
+        self.assertEqual(check_token_cache(None)[0].id, 'user.W002')
+        for shared, expected in ((None, ['user.W001']), ('memcached', [])):
+            with self.settings(
+                TOKEN_AUTH_CACHE={'SHARED_CACHE': shared},
+                CACHES={'memcached': {'BACKEND': (
+                    'django.core.cache.backends.memcached.MemcachedCache'
+                )}}
+            ):
+                self.assertEqual(
+                    [warning.id for warning in check_token_cache(None)],
+                    expected
+                )
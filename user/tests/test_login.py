@@ -0,0 +1,153 @@
+from concurrent.futures import Future
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user import passwords
+
+
+TOKEN_URL = reverse('user:token')
+
+
+@override_settings(PASSWORD_VERIFY_WORKERS=0)
+class LoginTests(TestCase):
+    """
+    test password verification and throttling of the token endpoint
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'login@test.com', 'password123'
+        )
+        self.client = APIClient()
+
+    def login(self, email='login@test.com', password='password123'):
+        return self.client.post(
+            TOKEN_URL, {'email': email, 'password': password}
+        )
+
+    def test_new_passwords_use_preferred_hasher(self):
+        self.assertTrue(self.user.password.startswith('argon2$'))
+
+    def test_outdated_hash_upgraded_on_login(self):
+        """
+        test a hash of a hasher other than the first is replaced
+        """
+        self.user.password = make_password(
+            'password123', hasher='pbkdf2_sha256'
+        )
+        self.user.save()
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('argon2$'))
+        self.assertTrue(self.user.check_password('password123'))
+
+    def test_wrong_password_keeps_hash(self):
+        encoded = make_password('password123', hasher='pbkdf2_sha256')
+        self.user.password = encoded
+        self.user.save()
+
+        res = self.login(password='wrong')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, encoded)
+
+    def test_unknown_email_still_hashes(self):
+        with patch.object(
+            passwords, 'check', wraps=passwords.check
+        ) as check:
+            res = self.login(email='nobody@test.com')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIsNone(check.call_args[0][1])
+
+    def test_inactive_user_rejected(self):
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(LOGIN_THROTTLE_RATE='3/min')
+    def test_login_throttled_per_email(self):
+        """
+        test a flood against one email is rejected before hashing
+        """
+        for _ in range(3):
+            self.login(password='wrong')
+
+        with patch.object(passwords, 'check') as check:
+            res = self.login(email='LOGIN@test.com')
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        check.assert_not_called()
+
+        get_user_model().objects.create_user('other@test.com', 'password123')
+        res = self.login(email='other@test.com')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_busy_verifier_throttles(self):
+        with patch.object(
+            passwords, 'verify', side_effect=passwords.VerifierBusy
+        ):
+            res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+class PasswordPoolTests(TestCase):
+
+    @override_settings(PASSWORD_VERIFY_WORKERS=1)
+    def test_verify_in_worker_process(self):
+        """
+        test hashes are checked and upgraded by the pool workers
+        """
+        encoded = make_password('secret', hasher='pbkdf2_sha256')
+
+        self.assertEqual(passwords.verify('wrong', encoded), (False, None))
+        valid, upgraded = passwords.verify('secret', encoded)
+        self.assertTrue(valid)
+        self.assertTrue(upgraded.startswith('argon2$'))
+        self.assertEqual(passwords.verify('secret', upgraded), (True, None))
+
+    def test_unusable_password_never_matches(self):
+        hashers = ['django.contrib.auth.hashers.Argon2PasswordHasher']
+        self.assertEqual(
+            passwords.check('', make_password(None), hashers), (False, None)
+        )
+
+    @override_settings(
+        PASSWORD_VERIFY_WORKERS=1, PASSWORD_VERIFY_MAX_PENDING=0,
+        PASSWORD_VERIFY_TIMEOUT=0
+    )
+    def test_slots_read_from_settings_on_first_use(self):
+        """
+        test the waiting limit comes from the settings in effect when the
+        first login is verified, not when the module was imported
+        """
+        with patch.object(passwords, '_slots', None):
+            with self.assertRaises(passwords.VerifierBusy):
+                passwords.verify('secret', make_password('secret'))
+
+    @override_settings(PASSWORD_VERIFY_WORKERS=1, PASSWORD_VERIFY_TIMEOUT=0.01)
+    def test_unanswered_verify_times_out(self):
+        """
+        test a login whose hash no worker checks in time is turned away
+        """
+        future = Future()
+        pool = Mock(**{'submit.return_value': future})
+        with patch.object(passwords, '_get_pool', return_value=pool):
+            with self.assertRaises(passwords.VerifierBusy):
+                passwords.verify('secret', make_password('secret'))
+        self.assertTrue(future.cancelled())
@@ -0,0 +1,233 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.bloom import BloomFilter
+from core.models import AuthToken
+from user import tokens
+from user.authentication import token_cache
+
+
+TOKEN_URL = reverse('user:token')
+TOKENS_URL = reverse('user:token-list')
+ME_URL = reverse('user:me')
+
+
+def token_detail_url(token_id):
+    return reverse('user:token-detail', args=[token_id])
+
+
+class TokenLifecycleTests(TestCase):
+    """
+    test issuing, expiring and revoking device tokens
+    """
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'tokens@test.com', 'password123'
+        )
+        self.client = APIClient()
+
+    def login(self, device=''):
+        res = self.client.post(TOKEN_URL, {
+            'email': 'tokens@test.com',
+            'password': 'password123',
+            'device': device,
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data['token']
+
+    def get_me(self, key):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+        return self.client.get(ME_URL)
+
+    def test_only_digest_stored(self):
+        key = self.login()
+
+        token = AuthToken.objects.get(user=self.user)
+        self.assertEqual(token.digest, tokens.digest(key))
+        self.assertGreater(token.expires, timezone.now())
+
+    def test_expired_token_rejected(self):
+        key = self.login()
+        AuthToken.objects.update(expires=timezone.now() - timedelta(1))
+        token_cache.clear()
+
+        res = self.get_me(key)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_device_login_replaces_its_token(self):
+        """
+        test a device's new token revokes its previous one only
+        """
+        phone = self.login('phone')
+        laptop = self.login('laptop')
+        self.assertEqual(self.get_me(phone).status_code, status.HTTP_200_OK)
+
+        new_phone = self.login('phone')
+
+        self.assertEqual(
+            self.get_me(phone).status_code, status.HTTP_401_UNAUTHORIZED
+        )
+        self.assertEqual(self.get_me(new_phone).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_me(laptop).status_code, status.HTTP_200_OK)
+
+    def test_list_and_revoke_devices(self):
+        phone = self.login('phone')
+        laptop = self.login('laptop')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {phone}')
+
+        res = self.client.get(TOKENS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(token['device'], token['current']) for token in res.data],
+            [('laptop', False), ('phone', True)]
+        )
+
+        res = self.client.delete(token_detail_url(res.data[0]['id']))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            self.get_me(laptop).status_code, status.HTTP_401_UNAUTHORIZED
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {phone}')
+        res = self.client.get(TOKENS_URL)
+        self.assertEqual([token['device'] for token in res.data], ['phone'])
+
+    def test_cannot_revoke_other_users_token(self):
+        other = get_user_model().objects.create_user(
+            'other@test.com', 'password123'
+        )
+        token, other_key = tokens.issue(other)
+        key = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+
+        res = self.client.delete(token_detail_url(token.pk))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.get_me(other_key).status_code, status.HTTP_200_OK)
+
+    def test_purge_expired_tokens(self):
+        expired, _ = tokens.issue(self.user, 'old')
+        AuthToken.objects.filter(pk=expired.pk).update(
+            expires=timezone.now() - timedelta(1)
+        )
+        active, _ = tokens.issue(self.user, 'new')
+        out = StringIO()
+
+        call_command('purge_auth_tokens', stdout=out)
+
+        self.assertIn('Deleted 1 tokens', out.getvalue())
+        self.assertEqual(
+            list(AuthToken.objects.values_list('pk', flat=True)), [active.pk]
+        )
+
+
+@override_settings(AUTH_TOKEN_SIGNED=True)
+class SignedTokenTests(TestCase):
+    """
+    test signed tokens verify without looking the token up
+    """
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'signed@test.com', 'password123'
+        )
+        self.token, self.key = tokens.issue(self.user, 'phone')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.key}')
+
+    def test_signed_token_authenticates(self):
+        self.assertIsNone(self.token.digest)
+        # the revocation filter and the user on the first request
+        with self.assertNumQueries(2):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_tampered_token_rejected(self):
+        key_id, pk, user_id, expires, signature = self.key.split('.')
+        other = get_user_model().objects.create_user(
+            'other@test.com', 'password123'
+        )
+        forged = '.'.join([key_id, pk, str(other.pk), expires, signature])
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {forged}')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_non_ascii_token_rejected(self):
+        self.assertIsNone(tokens.unsign('1.2.3.4.\u00e9'))
+        self.assertIsNone(tokens.unsign(self.key[:-1] + '\u00e9'))
+        self.client.credentials(HTTP_AUTHORIZATION='Token 1.2.3.4.\u00e9')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_unknown_key_id_rejected(self):
+        with self.settings(AUTH_TOKEN_SIGNING_KEYS={'2': 'rotated'}):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoked_token_rejected(self):
+        self.client.get(ME_URL)
+        tokens.revoke(AuthToken.objects.filter(pk=self.token.pk))
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoked_in_other_worker_rejected(self):
+        self.client.get(ME_URL)
+        AuthToken.objects.filter(pk=self.token.pk).update(
+            revoked=timezone.now()
+        )
+        tokens.bump_revocations()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_token_rejected(self):
+        token = AuthToken.objects.create(
+            user=self.user, expires=timezone.now() - timedelta(seconds=1)
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {tokens.sign(token)}'
+        )
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class BloomFilterTests(SimpleTestCase):
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(i)
+
+        self.assertTrue(all(i in bloom for i in range(1000)))
+        false_positives = sum(i in bloom for i in range(1000, 11000))
+        self.assertLess(false_positives, 300)
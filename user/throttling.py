@@ -0,0 +1,26 @@
+import hashlib
+
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginRateThrottle(SimpleRateThrottle):
+    """
+    limit login attempts per email address
+
+    throttles run before the serializer, a flood against one account is
+    turned away without hashing anything
+    """
+    scope = 'login'
+
+    def get_rate(self):
+        return settings.LOGIN_THROTTLE_RATE
+
+    def get_cache_key(self, request, view):
+        data = request.data
+        email = data.get('email') if hasattr(data, 'get') else None
+        if not isinstance(email, str) or not email:
+            return None
+        # the same account however the address is cased
+        ident = hashlib.sha256(email.strip().lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
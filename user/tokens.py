@@ -0,0 +1,220 @@
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone as django_timezone
+
+from core.bloom import BloomFilter
+from core.models import AuthToken
+
+
+_REVOCATIONS_KEY = 'auth-token:revocations'
+
+
+def digest(key):
+    """
+    return the stored digest of an opaque token key
+    """
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def is_signed(key):
+    # opaque keys are url safe base64, which has no dots
+    return '.' in key
+
+
+def _signature(key_id, payload):
+    mac = hmac.new(
+        settings.AUTH_TOKEN_SIGNING_KEYS[key_id].encode(),
+        payload.encode(),
+        hashlib.sha256
+    )
+    return base64.urlsafe_b64encode(mac.digest()).rstrip(b'=').decode()
+
+
+def sign(token):
+    """
+    return the signed key of the token, its claims followed by their
+    HMAC under the current signing key
+    """
+    key_id = settings.AUTH_TOKEN_SIGNING_KEY_ID
+    expires = int(token.expires.timestamp())
+    payload = f'{key_id}.{token.pk}.{token.user_id}.{expires}'
+    return f'{payload}.{_signature(key_id, payload)}'
+
+
+def unsign(key):
+    """
+    return an unsaved token with the claims of a signed key, None when
+    the key was not signed by one of the signing keys
+    """
+    # compare_digest only takes ASCII strings, and int() reads any digits
+    if not key.isascii():
+        return None
+    try:
+        payload, signature = key.rsplit('.', 1)
+        key_id, pk, user_id, expires = payload.split('.')
+        expected = _signature(key_id, payload)
+        pk, user_id, expires = int(pk), int(user_id), int(expires)
+    except (KeyError, ValueError):
+        return None
+    if not hmac.compare_digest(signature, expected):
+        return None
+    return AuthToken(
+        pk=pk,
+        user_id=user_id,
+        expires=datetime.fromtimestamp(expires, timezone.utc)
+    )
+
+
+def issue(user, device=''):
+    """
+    return a new (token, key) for the user's device, revoking the token
+    the device had before
+
+    the key is signed when AUTH_TOKEN_SIGNED is set, otherwise opaque and
+    only its digest is stored
+    """
+    # whole seconds, as signed keys carry it
+    expires = django_timezone.now().replace(microsecond=0) + timedelta(
+        seconds=settings.AUTH_TOKEN_TTL
+    )
+    with transaction.atomic():
+        revoke(AuthToken.objects.filter(
+            user=user, device=device, revoked__isnull=True
+        ))
+        if settings.AUTH_TOKEN_SIGNED:
+            token = AuthToken.objects.create(
+                user=user, device=device, expires=expires
+            )
+            key = sign(token)
+        else:
+            key = secrets.token_urlsafe(32)
+            token = AuthToken.objects.create(
+                user=user, device=device, expires=expires, digest=digest(key)
+            )
+    return token, key
+
+
+def revoke(tokens):
+    """
+    revoke the tokens of the queryset, return how many were
+
+    signed tokens are only rejected once revoked, deleting their row
+    alone leaves them valid until they expire
+    """
+    # authentication resolves keys with this module
+    from user.authentication import forget_tokens
+
+    rows = list(tokens.filter(revoked__isnull=True).values_list(
+        'pk', 'digest'
+    ))
+    if not rows:
+        return 0
+    AuthToken.objects.filter(pk__in=[pk for pk, _ in rows]).update(
+        revoked=django_timezone.now()
+    )
+    forget_tokens(*(key for _, key in rows if key))
+    # and again once committed, a process may have rebuilt its filter or
+    # cached a token before the revocations were visible to it
+    bump_revocations()
+    transaction.on_commit(bump_revocations)
+    return len(rows)
+
+
+def shared_cache():
+    """
+    return the cache every worker sees, TOKEN_AUTH_CACHE['SHARED_CACHE'],
+    or None when there is none
+    """
+    alias = settings.TOKEN_AUTH_CACHE.get('SHARED_CACHE')
+    return caches[alias] if alias else None
+
+
+def bump_revocations():
+    """
+    invalidate every worker's revocation filter and cached tokens
+    """
+    shared = shared_cache()
+    if shared is None:
+        return
+    try:
+        shared.incr(_REVOCATIONS_KEY)
+    except ValueError:
+        shared.set(_REVOCATIONS_KEY, time.time_ns(), None)
+
+
+def revocations_generation():
+    """
+    return the generation of the revocations, changed by every one in any
+    worker, None without a shared cache to keep it in
+    """
+    shared = shared_cache()
+    if shared is None:
+        return None
+    generation = shared.get(_REVOCATIONS_KEY)
+    if generation is None:
+        # seeded from the clock like the recipe generations, a counter
+        # lost to eviction never repeats a value seen before
+        shared.add(_REVOCATIONS_KEY, time.time_ns(), None)
+        generation = shared.get(_REVOCATIONS_KEY)
+    return generation
+
+
+# (revocations generation, BloomFilter of revoked unexpired token ids)
+_revoked = (None, None)
+_revoked_lock = threading.Lock()
+
+
+def revoked_filter(generation, build=True):
+    """
+    return the filter of revoked token ids as of the revocations
+    generation, rebuilt from the database when a revocation happened
+    since, or None then when build is False
+
+    there is no filter without a generation, no worker would hear of the
+    revocations made in the others
+    """
+    global _revoked
+    if generation is None:
+        return None
+    if _revoked[0] == generation:
+        return _revoked[1]
+    if not build:
+        return None
+    with _revoked_lock:
+        if _revoked[0] != generation:
+            ids = list(AuthToken.objects.filter(
+                revoked__isnull=False, expires__gt=django_timezone.now()
+            ).values_list('pk', flat=True))
+            revoked = BloomFilter(
+                max(settings.AUTH_TOKEN_REVOCATION_CAPACITY, 2 * len(ids)),
+                settings.AUTH_TOKEN_REVOCATION_ERROR_RATE
+            )
+            for pk in ids:
+                revoked.add(pk)
+            _revoked = (generation, revoked)
+        return _revoked[1]
+
+
+def is_revoked(token, generation):
+    """
+    return whether a signed token was revoked
+
+    the in-memory filter of the revocations generation clears almost
+    every token without a query, only tokens it may hold are checked in
+    the database, as every token is without a shared cache
+    """
+    revoked = revoked_filter(generation)
+    if revoked is not None and token.pk not in revoked:
+        return False
+    return not AuthToken.objects.filter(
+        pk=token.pk, revoked__isnull=True
+    ).exists()
@@ -9,4 +9,9 @@ urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
     path('me/', views.ManageUserView.as_view(), name='me'),
+    path('tokens/', views.ListAuthTokenView.as_view(), name='token-list'),
+    path(
+        'tokens/<int:pk>/', views.RevokeAuthTokenView.as_view(),
+        name='token-detail'
+    ),
 ]
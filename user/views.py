@@ -1,8 +1,16 @@
-from user.serializers import UserSerializer, AuthTokenSerializer
-from rest_framework import generics
-from rest_framework.authtoken.views import ObtainAuthToken
+from django.utils import timezone
+from rest_framework import generics, permissions
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
-from rest_framework import authentication, permissions
+from rest_framework.views import APIView
+
+from core.models import AuthToken
+from user import tokens
+from user.authentication import CachedTokenAuthentication
+from user.serializers import (
+    AuthTokenListSerializer, AuthTokenSerializer, UserSerializer
+)
+from user.throttling import LoginRateThrottle
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -10,20 +18,59 @@ class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
 
 
-class CreateTokenView(ObtainAuthToken):
-    # create a new auth token for user
+class CreateTokenView(APIView):
+    # create a new auth token for the user's device
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = (LoginRateThrottle,)
+    permission_classes = ()
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(
+            data=request.data, context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        token, key = tokens.issue(
+            serializer.validated_data['user'],
+            serializer.validated_data['device']
+        )
+        return Response({
+            'token': key,
+            'expires': token.expires,
+        })
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
         return self.request.user
 
 
+class AuthTokenMixin:
+    # the user's active device tokens
+    serializer_class = AuthTokenListSerializer
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        return AuthToken.objects.filter(
+            user=self.request.user,
+            revoked__isnull=True,
+            expires__gt=timezone.now()
+        ).order_by('-created', '-id')
+
+
+class ListAuthTokenView(AuthTokenMixin, generics.ListAPIView):
+    """List the devices the user is logged in on"""
+    pagination_class = None
+
+
+class RevokeAuthTokenView(AuthTokenMixin, generics.DestroyAPIView):
+    """Log one of the user's devices out"""
 
+    def perform_destroy(self, instance):
+        tokens.revoke(AuthToken.objects.filter(pk=instance.pk))